@@ -1,6 +1,6 @@
 """配置管理模块"""
 
-from .settings import ProfileConfig, APIConfig, ShufflingStrategy
+from .settings import ProfileConfig, APIConfig, DatabaseConfig, ShufflingStrategy
 
-__all__ = ['ProfileConfig', 'APIConfig', 'ShufflingStrategy']
+__all__ = ['ProfileConfig', 'APIConfig', 'DatabaseConfig', 'ShufflingStrategy']
 
@@ -6,7 +6,7 @@
 import json
 import os
 from typing import List, Dict, Optional
-from pydantic import BaseModel, Field, field_validator, model_validator
+from pydantic import BaseModel, Field, PrivateAttr, field_validator, model_validator
 from loguru import logger
 
 
@@ -28,6 +28,63 @@ class APIConfig(BaseModel):
         return v
 
 
+class DatabaseConfig(BaseModel):
+    """SQLite 性能参数（每个新连接建立时以 PRAGMA 形式应用）"""
+    
+    journal_mode: str = Field(default="WAL", description="日志模式（WAL 下读不阻塞写；网络盘上可改为 DELETE）")
+    synchronous: str = Field(default="NORMAL", description="同步级别（WAL 下 NORMAL 只在检查点时 fsync）")
+    cache_size_mb: int = Field(default=64, ge=1, le=4096, description="每个连接的页缓存大小（MB）")
+    mmap_size_mb: int = Field(default=256, ge=0, le=65536, description="内存映射读取大小（MB，0 表示关闭）")
+    temp_store: str = Field(default="MEMORY", description="临时表和排序的存放位置")
+    busy_timeout_ms: int = Field(default=5000, ge=0, le=600000, description="遇到锁时的等待时间（毫秒）")
+    
+    @field_validator('journal_mode')
+    @classmethod
+    def validate_journal_mode(cls, v):
+        """验证日志模式"""
+        v = v.upper()
+        valid_modes = ['WAL', 'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY']
+        if v not in valid_modes:
+            raise ValueError(f"日志模式必须是以下之一: {', '.join(valid_modes)}")
+        return v
+    
+    @field_validator('synchronous')
+    @classmethod
+    def validate_synchronous(cls, v):
+        """验证同步级别"""
+        v = v.upper()
+        valid_levels = ['OFF', 'NORMAL', 'FULL', 'EXTRA']
+        if v not in valid_levels:
+            raise ValueError(f"同步级别必须是以下之一: {', '.join(valid_levels)}")
+        return v
+    
+    @field_validator('temp_store')
+    @classmethod
+    def validate_temp_store(cls, v):
+        """验证临时存储位置"""
+        v = v.upper()
+        valid_stores = ['DEFAULT', 'FILE', 'MEMORY']
+        if v not in valid_stores:
+            raise ValueError(f"临时存储位置必须是以下之一: {', '.join(valid_stores)}")
+        return v
+    
+    def pragmas(self) -> List[tuple]:
+        """
+        转换为 PRAGMA 列表
+        
+        Returns:
+            [(名称, 值), ...]，按执行顺序排列
+        """
+        return [
+            ("journal_mode", self.journal_mode),
+            ("synchronous", self.synchronous),
+            ("cache_size", -self.cache_size_mb * 1024),  # 负数表示以 KiB 为单位
+            ("mmap_size", self.mmap_size_mb * 1024 * 1024),
+            ("temp_store", self.temp_store),
+            ("busy_timeout", self.busy_timeout_ms),
+        ]
+
+
 class ColumnSetting(BaseModel):
     """列设置"""
     
@@ -77,10 +134,15 @@ class ShufflingStrategy(BaseModel):
         return self
 
 
+# 影响编译后生成计划的配置字段
+_PLAN_FIELDS = {'column_settings', 'numbering_groups', 'shuffling_strategies', 'column_images', 'bold_keywords'}
+
+
 class ProfileConfig(BaseModel):
     """用户配置（根配置）"""
     
     api_config: APIConfig = Field(default_factory=APIConfig, description="API 配置")
+    database_config: DatabaseConfig = Field(default_factory=DatabaseConfig, description="SQLite 性能参数")
     template_path: Optional[str] = Field(default=None, description="Word 模板路径")
     column_settings: List[ColumnSetting] = Field(default_factory=list, description="列设置")
     image_paths: Dict[str, str] = Field(default_factory=dict, description="图片文件夹路径映射")
@@ -98,18 +160,25 @@ class ProfileConfig(BaseModel):
     # 生成设置
     strict_unique: bool = Field(default=True, description="严格去重")
     output_directory: str = Field(default="output", description="输出目录")
+    generation_seed: Optional[int] = Field(default=None, ge=0, description="生成随机种子（None=每次随机，固定后可复现同一批文档）")
+    profiling_enabled: bool = Field(default=False, description="统计各生成阶段耗时（输出 generation_profile.json）")
+    usage_balancing_enabled: bool = Field(default=False, description="混排时优先选用历史使用次数少的内容（跨批次均衡曝光）")
+    usage_balancing_choices: int = Field(default=2, ge=1, le=8, description="均衡抽取时每次比较的候选数（越大越偏向最少使用）")
+    usage_flush_interval: float = Field(default=30.0, ge=0, description="使用次数定期写入数据库的间隔（秒，0=只在批次结束时写入）")
     
     # 内容质量控制（查重评分）
     quality_check_enabled: bool = Field(default=True, description="启用内容质量检查")
     quality_threshold_premium: float = Field(default=0.2, ge=0.0, le=1.0, description="优质内容阈值（重复率 < 20%）")
     quality_threshold_standard: float = Field(default=0.5, ge=0.0, le=1.0, description="中等内容阈值（重复率 <= 50%）")
     quality_generate_report: bool = Field(default=True, description="生成质量报告 CSV")
+    quality_report_details: str = Field(default="none", description="质量明细输出格式：none / sqlite / parquet（含 SimHash、最相似文档、各阶段耗时）")
     
     # SEO 关键词密度检查
     target_keywords: List[str] = Field(default_factory=list, description="SEO 目标关键词列表")
     seo_density_min: float = Field(default=0.01, ge=0.0, le=1.0, description="关键词密度最小值（默认 1%）")
     seo_density_max: float = Field(default=0.03, ge=0.0, le=1.0, description="关键词密度最大值（默认 3%）")
     seo_check_enabled: bool = Field(default=True, description="启用 SEO 密度检查")
+    seo_density_targeting: bool = Field(default=True, description="混排时按密度范围挑选内容组合（需启用 SEO 密度检查并设置关键词）")
     
     # 全局历史查重设置
     dedup_enabled: bool = Field(default=False, description="启用历史查重")
@@ -119,6 +188,18 @@ class ProfileConfig(BaseModel):
     dedup_cross_project: bool = Field(default=False, description="跨项目查重（False=仅当前项目）")
     dedup_current_project: str = Field(default="default", description="当前项目名称")
     
+    # 已编译的生成计划缓存：(列数, 配置签名, GenerationPlan)
+    _plan_cache: Optional[tuple] = PrivateAttr(default=None)
+    
+    @field_validator('quality_report_details')
+    @classmethod
+    def validate_quality_report_details(cls, v):
+        """验证质量明细输出格式"""
+        valid_formats = ['none', 'sqlite', 'parquet']
+        if v not in valid_formats:
+            raise ValueError(f"质量明细输出格式必须是以下之一: {', '.join(valid_formats)}")
+        return v
+    
     @field_validator('template_path')
     @classmethod
     def validate_template_path(cls, v):
@@ -202,6 +283,30 @@ class ProfileConfig(BaseModel):
                 return setting.type
         return 'Body'
     
+    def compile_plan(self, column_count: int):
+        """
+        获取编译后的生成计划（列类型数组、序号分组数组、混排策略分组、关键词匹配器、列图片）
+        
+        结果会被缓存；相关配置被修改（包括直接修改列表/字典内容）后自动重新编译，
+        已交给生成流程的旧计划不受影响。
+        
+        Args:
+            column_count: 数据列数
+            
+        Returns:
+            GenerationPlan 实例（不可变）
+        """
+        from ..core.generation_plan import GenerationPlan
+        
+        signature = json.dumps(self.model_dump(include=_PLAN_FIELDS), ensure_ascii=False, sort_keys=True)
+        cached = self._plan_cache
+        if cached and cached[0] == column_count and cached[1] == signature:
+            return cached[2]
+        
+        plan = GenerationPlan(self, column_count)
+        self._plan_cache = (column_count, signature, plan)
+        return plan
+    
     def set_column_type(self, col_index: int, col_type: str, col_name: str = ""):
         """
         设置列类型
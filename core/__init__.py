@@ -2,9 +2,14 @@
 
 from .spintax_parser import SpintaxParser
 from .document_generator import DocumentGenerator
+from .generation_engine import GenerationEngine
 from .shuffle_engine import ShuffleEngine
 from .image_processor import ImageProcessor
-from .generation_worker import GenerationWorker
 
-__all__ = ['SpintaxParser', 'DocumentGenerator', 'ShuffleEngine', 'ImageProcessor', 'GenerationWorker']
+# 工作线程依赖 PyQt6（命令行无界面运行时可不安装）
+try:
+    from .generation_worker import GenerationWorker
+except ImportError:
+    GenerationWorker = None
 
+__all__ = ['SpintaxParser', 'DocumentGenerator', 'GenerationEngine', 'ShuffleEngine', 'ImageProcessor', 'GenerationWorker']
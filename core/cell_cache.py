@@ -0,0 +1,90 @@
+"""
+单元格预处理缓存（单次生成运行内有效）
+同一批次中几百个单元格会被成千上万篇文档重复使用，拆分段落、序号检测、Spintax 编译
+对同一文本只做一次，之后每篇文档只需要计数和生成序号前缀。
+"""
+
+from typing import Dict, Optional, Tuple
+from loguru import logger
+
+from .smart_numbering import SmartNumbering
+from .spintax_parser import SpintaxParser, SpintaxTemplate
+
+
+class CellEntry:
+    """一个单元格文本的预处理结果（不可变，文档之间共享）"""
+
+    __slots__ = ("paragraphs", "numbering")
+
+    def __init__(self, content: str):
+        """
+        Args:
+            content: 单元格文本（Spintax 已展开）
+        """
+        # 按换行拆分段落，丢弃空段落
+        self.paragraphs: Tuple[str, ...] = tuple(p for p in content.split('\n') if p.strip())
+        # 每个段落的 (序号类型, 去掉序号后的正文)，没有序号时类型为 None
+        self.numbering: Tuple[Tuple[Optional[str], str], ...] = tuple(
+            (style, cleaned)
+            for cleaned, style in map(SmartNumbering.detect_and_clean, self.paragraphs)
+        )
+
+
+class CellCache:
+    """按单元格文本缓存预处理结果"""
+
+    # 展开后的 Spintax 变体可能很多，超过上限后不再新增缓存项（仍然正常计算）
+    MAX_ENTRIES = 50000
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        """
+        Args:
+            max_entries: 最大缓存条数
+        """
+        self.max_entries = max_entries
+        self._entries: Dict[str, CellEntry] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def entry(self, content: str) -> CellEntry:
+        """
+        获取单元格文本的预处理结果
+
+        Args:
+            content: 单元格文本（Spintax 已展开）
+
+        Returns:
+            CellEntry
+        """
+        cached = self._entries.get(content)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        cached = CellEntry(content)
+        if len(self._entries) < self.max_entries:
+            self._entries[content] = cached
+        return cached
+
+    @staticmethod
+    def template(cell: str) -> SpintaxTemplate:
+        """
+        获取单元格的编译后 Spintax 模板
+
+        Args:
+            cell: 原始单元格文本
+
+        Returns:
+            SpintaxTemplate
+        """
+        return SpintaxParser.compile(cell)
+
+    def log_summary(self):
+        """输出命中率统计"""
+        total = self.hits + self.misses
+        if total:
+            logger.info(
+                f"单元格缓存: {len(self._entries)} 条, 命中 {self.hits}/{total} "
+                f"({self.hits / total * 100:.1f}%)"
+            )
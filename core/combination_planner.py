@@ -0,0 +1,215 @@
+"""
+混排组合空间规划
+计算混排模式可生成的不同文档总数（组合空间），并把每篇文档规划为空间中互不相同的一个点：
+用运行种子派生的伪随机排列把文档序号映射为组合编号，再按混合进制解码出每列的内容。
+
+组合空间 = 未参与策略的各列（内容数 × Spintax 变体数）
+        × 每个策略（保留组的所有选法，每种选法乘以被保留列的内容组合数）
+策略只决定保留/删除哪些列，保留组的顺序不影响文档内容，因此不单独计数。
+"""
+
+import math
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Dict, List
+from loguru import logger
+
+from .spintax_parser import SpintaxParser
+from ..config.settings import ProfileConfig
+
+
+@dataclass
+class DocumentPlan:
+    """一篇文档的规划结果"""
+    cells: List[str]  # 每列选中的原始内容（被策略删除的列为空）
+    spintax_ranks: Dict[int, int] = field(default_factory=dict)  # {列索引: Spintax 变体编号}
+
+
+class _StrategyPlan:
+    """单个混排策略的组合编号表（带权重的 k 组合）"""
+    
+    def __init__(self, groups, keep_count: int, column_weights: List[int]):
+        self.groups = groups
+        self.keep_count = keep_count
+        self.group_weights = [math.prod(column_weights[col] for col in group) for group in groups]
+        
+        # table[i][j]：从第 i 组起（含）选 j 组时的组合数（各组合按组权重加权）
+        group_count = len(groups)
+        table = [[0] * (self.keep_count + 1) for _ in range(group_count + 1)]
+        table[group_count][0] = 1
+        for i in range(group_count - 1, -1, -1):
+            table[i][0] = 1
+            for j in range(1, self.keep_count + 1):
+                table[i][j] = table[i + 1][j] + self.group_weights[i] * table[i + 1][j - 1]
+        self.table = table
+        self.size = table[0][self.keep_count]
+    
+    def unrank(self, rank: int) -> List[tuple]:
+        """
+        解码保留的组
+        
+        Returns:
+            [(组序号, 组内内容编号), ...]
+        """
+        kept = []
+        remaining = self.keep_count
+        for i in range(len(self.groups)):
+            if remaining == 0:
+                break
+            rest = self.table[i + 1][remaining - 1]
+            included = self.group_weights[i] * rest
+            if rank < included:
+                group_rank, rank = divmod(rank, rest)
+                kept.append((i, group_rank))
+                remaining -= 1
+            else:
+                rank -= included
+        return kept
+
+
+class CombinationPlanner:
+    """混排模式组合空间规划器"""
+    
+    def __init__(self, config: ProfileConfig, columns_data: List[List[str]]):
+        """
+        初始化规划器
+        
+        Args:
+            config: 配置对象
+            columns_data: 按列组织的有效内容
+        """
+        # 同一列中重复出现的内容只算一种（否则不同编号可能得到相同文档）
+        columns_data = [list(dict.fromkeys(col_data)) for col_data in columns_data]
+        self.columns_data = columns_data
+        column_count = len(columns_data)
+        
+        # 每列每个内容的编号起点（内容按 Spintax 变体数展开）
+        self._offsets: List[List[int]] = []
+        self._spintax: List[List[bool]] = []
+        self.column_weights: List[int] = []
+        for col_data in columns_data:
+            offsets = []
+            flags = []
+            total = 0
+            for item in col_data:
+                offsets.append(total)
+                has_spintax = SpintaxParser.has_spintax(item)
+                flags.append(has_spintax)
+                total += SpintaxParser.calculate_variations(item) if has_spintax else 1
+            self._offsets.append(offsets)
+            self._spintax.append(flags)
+            self.column_weights.append(max(total, 1))
+        
+        # 混排策略：直接使用编译后生成计划中的分组（与逐列抽取时应用的策略完全一致）
+        self.supported = True
+        self.strategies: List[_StrategyPlan] = []
+        strategy_columns = set()
+        for strategy in config.compile_plan(column_count).strategies:
+            if strategy_columns.intersection(strategy.columns):
+                # 多个策略涉及同一列时，后面的策略可能删除前面保留的列，无法独立计数
+                logger.info(f"混排策略 '{strategy.name}' 与其它策略共用列，组合规划不可用，改为随机抽取")
+                self.supported = False
+            strategy_columns.update(strategy.columns)
+            self.strategies.append(_StrategyPlan(strategy.groups, strategy.keep_count, self.column_weights))
+        
+        # 未参与任何策略的列独立组合（不完整分组中的列总是被删除，不计入空间）
+        self.free_columns = [col for col in range(column_count) if col not in strategy_columns]
+        
+        self.size = math.prod(self.column_weights[col] for col in self.free_columns)
+        for strategy_plan in self.strategies:
+            self.size *= strategy_plan.size
+    
+    def unrank(self, rank: int) -> DocumentPlan:
+        """
+        解码编号为 rank 的文档规划（不同编号对应不同的内容组合）
+        
+        Args:
+            rank: 组合编号（0 <= rank < size）
+        
+        Returns:
+            DocumentPlan
+        """
+        plan = DocumentPlan(cells=[""] * len(self.columns_data))
+        
+        # 混合进制：先解码策略（低位），再解码自由列
+        for strategy_plan in reversed(self.strategies):
+            rank, strategy_rank = divmod(rank, strategy_plan.size)
+            for group_idx, group_rank in strategy_plan.unrank(strategy_rank):
+                self._unrank_columns(strategy_plan.groups[group_idx], group_rank, plan)
+        
+        self._unrank_columns(self.free_columns, rank, plan)
+        return plan
+    
+    def _unrank_columns(self, columns: List[int], rank: int, plan: DocumentPlan):
+        """按混合进制解码若干列的内容与 Spintax 变体"""
+        for col in reversed(columns):
+            rank, digit = divmod(rank, self.column_weights[col])
+            offsets = self._offsets[col]
+            if not offsets:
+                continue
+            item_idx = bisect_right(offsets, digit) - 1
+            plan.cells[col] = self.columns_data[col][item_idx]
+            if self._spintax[col][item_idx]:
+                plan.spintax_ranks[col] = digit - offsets[item_idx]
+    
+    def dedup_capacity(self, similarity_threshold: float) -> int:
+        """
+        估算在查重阈值下最多能生成多少篇互不重复的文档（上限估计）
+        
+        两篇文档只有在不同内容占全文比例超过 (1 - 阈值) 时才不算重复，
+        由此得到至少需要不同的列数 d；按 Singleton 界，文档数不超过
+        内容数最少的 (n - d + 1) 列的内容数之积。Spintax 变体改动很小，不计入。
+        
+        Args:
+            similarity_threshold: 相似度阈值 (0-1)
+        
+        Returns:
+            文档数上限
+        """
+        columns = [col_data for col_data in self.columns_data if col_data]
+        if not columns:
+            return 1
+        
+        # 每列平均长度占全文的比例
+        lengths = [sum(len(item) for item in col_data) / len(col_data) for col_data in columns]
+        total_length = sum(lengths) or 1
+        shares = sorted((length / total_length for length in lengths), reverse=True)
+        
+        # 至少需要不同的列数（按占比最大的列估计，得到最宽松的要求）
+        required_diff = 1 - similarity_threshold
+        min_distance = len(shares)
+        covered = 0.0
+        for i, share in enumerate(shares):
+            covered += share
+            if covered > required_diff:
+                min_distance = i + 1
+                break
+        
+        counts = sorted(len(col_data) for col_data in columns)
+        return math.prod(counts[:len(counts) - min_distance + 1])
+    
+    def check_capacity(self, count: int, config: ProfileConfig):
+        """
+        在生成前检查请求数量是否超过组合空间 / 查重容量，超过时给出警告
+        
+        启用 SEO 密度定向时只有密度窗口内的组合可用，实际容量小于这里的估计
+        （组合空间与查重容量都按全部组合计算）。
+        
+        Args:
+            count: 请求生成的文档数量
+            config: 配置对象
+        """
+        logger.info(f"混排组合空间: {self.size} 种不同组合，本批次需要 {count} 篇")
+        if count > self.size:
+            logger.warning(
+                f"⚠ 请求数量 {count} 超过组合空间 {self.size}，"
+                f"将有 {count - self.size} 篇文档与其它文档内容组合相同"
+            )
+        
+        if config.dedup_enabled:
+            capacity = self.dedup_capacity(config.dedup_similarity_threshold)
+            if count > capacity:
+                logger.warning(
+                    f"⚠ 在相似度阈值 {config.dedup_similarity_threshold * 100:.0f}% 下，"
+                    f"约最多只能生成 {capacity} 篇互不重复的文档，超出部分很可能查重重试失败"
+                )
@@ -10,6 +10,7 @@ import numpy as np
 from typing import List, Dict, Tuple, Optional
 from loguru import logger
 import os
+import random
 import tempfile
 
 class ComparisonTableImageGenerator:
@@ -236,7 +237,8 @@ class ComparisonTableImageGenerator:
         style_config: Optional[Dict] = None,
         insert_config: Optional[Dict] = None,
         output_path: Optional[str] = None,
-        selected_parameter_ids: Optional[List[int]] = None
+        selected_parameter_ids: Optional[List[int]] = None,
+        rng: Optional[random.Random] = None
     ) -> str:
         """
         根据类目ID和提及的品牌生成对比表
@@ -249,6 +251,7 @@ class ComparisonTableImageGenerator:
             insert_config: 插入策略配置
             output_path: 输出路径
             selected_parameter_ids: 选中的参数ID列表（None表示全部）
+            rng: 随机数生成器（用于保底竞品抽取，默认使用全局 random）
         
         Returns:
             生成的图片路径
@@ -294,8 +297,8 @@ class ComparisonTableImageGenerator:
                 own_brand_name = insert_config['own_brand_name']
                 for brand in all_brands:
                     if brand['name'] == own_brand_name:
-                        own_brand = brand
-                        brand['is_own'] = 1  # 临时标记
+                        # 临时标记（复制一份：表格数据是共享的只读缓存）
+                        own_brand = dict(brand, is_own=1)
                         logger.info(f"找到我方品牌（按名称）: {brand['name']}")
                         break
             
@@ -307,9 +310,10 @@ class ComparisonTableImageGenerator:
                 logger.warning(f"未找到我方品牌: {insert_config.get('own_brand_name')}")
             
             # 3. 添加文章中提及的竞品
+            own_brand_id = own_brand['id'] if own_brand else None
             competitor_brands = []
             for brand in all_brands:
-                if brand['is_own'] != 1 and brand['name'] in mentioned_brands:
+                if brand['is_own'] != 1 and brand['id'] != own_brand_id and brand['name'] in mentioned_brands:
                     competitor_brands.append(brand)
                     logger.info(f"✓ 竞品已加入（文章提及）: {brand['name']}")
             
@@ -318,12 +322,11 @@ class ComparisonTableImageGenerator:
             if len(competitor_brands) < fallback_count:
                 remaining_brands = [
                     b for b in all_brands 
-                    if b['is_own'] != 1 and b not in competitor_brands
+                    if b['is_own'] != 1 and b['id'] != own_brand_id and b not in competitor_brands
                 ]
                 # 随机选择
-                import random
                 needed = fallback_count - len(competitor_brands)
-                additional = random.sample(
+                additional = (rng or random).sample(
                     remaining_brands,
                     min(needed, len(remaining_brands))
                 )
@@ -0,0 +1,237 @@
+"""
+关键词密度定向规划
+混排时在规划阶段就按 SEO 密度窗口（seo_density_min ~ seo_density_max）挑选内容组合，
+而不是生成 docx 之后才在质量报告里标出"不足"/"堆砌"，再由人工删掉重做。
+
+做法：用单元格统计（字数、关键词字符数，可按列累加）估算规划结果的密度，
+不在窗口内时贪心替换某一列的内容——每一步在所有"可替换列 × 候选内容"中
+选出替换后最接近窗口的一项（落入窗口的候选有多个时随机取一个，保持多样性），
+直到进入窗口或无法再改进。混排策略删除的列和 AI 标题列不参与替换。
+
+替换会让规划离开组合排列中的点，因此记录本进程已规划的组合：与已规划文档相同的
+规划必须替换（即使密度已在窗口内），替换后与已规划文档内容相同的候选不可选，
+保证每篇文档仍是组合空间中不同的点（只在同一进程内比较，分片之间不比较）。
+"""
+
+from operator import mul
+from typing import Dict, List, Sequence, Set
+import numpy as np
+from loguru import logger
+
+from .cell_cache import CellCache
+from .quality_checker import CELL_SEPARATOR, TextStats
+from ..utils.tracing import trace_counters
+
+
+class DensityTargeter:
+    """按关键词密度窗口修正混排规划"""
+    
+    def __init__(self, config, columns_data: List[List[str]], cell_cache: CellCache):
+        """
+        初始化密度规划器
+        
+        Args:
+            config: ProfileConfig 实例
+            columns_data: 按列组织的有效内容
+            cell_cache: 单元格预处理缓存（复用编译后的 Spintax 模板）
+        """
+        self.cell_cache = cell_cache
+        self.density_min = config.seo_density_min
+        self.density_max = config.seo_density_max
+        
+        # 含换行的关键词可能跨列，无法按列估算（只在评分阶段统计）
+        self.keywords = tuple(k for k in config.target_keywords if k and CELL_SEPARATOR not in k)
+        self._keyword_lengths = tuple(len(k) for k in self.keywords)
+        self._stats: Dict[str, TextStats] = {}
+        
+        # 每列候选内容及其代表性统计（含 Spintax 的内容取第一个变体估算）
+        self.columns_data = [list(dict.fromkeys(col_data)) for col_data in columns_data]
+        self._candidate_words: List[np.ndarray] = []
+        self._candidate_keyword_lengths: List[np.ndarray] = []
+        for col_data in self.columns_data:
+            stats_list = [self.stats(self._representative(item)) for item in col_data]
+            self._candidate_words.append(np.array([self._words(s) for s in stats_list], dtype=np.int64))
+            self._candidate_keyword_lengths.append(np.array([self._keyword_length(s) for s in stats_list], dtype=np.int64))
+        self._item_index = [{item: idx for idx, item in enumerate(col_data)} for col_data in self.columns_data]
+        
+        # 已规划的组合：完整规划（单元格 + Spintax 编号），以及按列分组的
+        # {除该列外的单元格: 该列已用过的内容}，用于排除替换后与已规划文档相同的候选
+        self._planned: Set[tuple] = set()
+        self._siblings: List[Dict[tuple, Set[str]]] = [{} for _ in self.columns_data]
+        
+        logger.info(
+            f"SEO 密度定向规划已启用: 窗口 {self.density_min:.1%} - {self.density_max:.1%}, "
+            f"关键词 {list(self.keywords)}"
+        )
+    
+    def stats(self, content: str) -> TextStats:
+        """获取文本统计（带缓存）"""
+        stats = self._stats.get(content)
+        if stats is None:
+            stats = self._stats[content] = TextStats(content, self.keywords)
+        return stats
+    
+    def _representative(self, item: str) -> str:
+        """候选内容用于估算的文本（含 Spintax 时取编号 0 的变体）"""
+        template = self.cell_cache.template(item)
+        return template.unrank(0) if template.has_groups else item
+    
+    @staticmethod
+    def _words(stats: TextStats) -> int:
+        """单段文本的字数（不含跨段单词衔接修正）"""
+        return stats.chinese_chars + stats.english_words
+    
+    def _keyword_length(self, stats: TextStats) -> int:
+        """单段文本中关键词的总字符数"""
+        return sum(map(mul, self._keyword_lengths, stats.keyword_counts))
+    
+    def _distance(self, density):
+        """密度到窗口的距离（窗口内为 0，支持 numpy 数组）"""
+        return np.maximum(self.density_min - density, 0) + np.maximum(density - self.density_max, 0)
+    
+    def materialise(self, row: Sequence[str], spintax_ranks: Dict[int, int], rng) -> List[str]:
+        """
+        确定每个含 Spintax 单元格的变体编号，并返回展开后的文本
+        
+        编号写入 spintax_ranks，物化阶段会按同一编号展开，保证估算的就是最终文本。
+        
+        Args:
+            row: 规划出的原始单元格
+            spintax_ranks: {列索引: 变体编号}（会被补全）
+            rng: 本文档的随机数生成器
+        
+        Returns:
+            展开后的各列文本
+        """
+        return [self._materialise_cell(col_idx, cell, spintax_ranks, rng) for col_idx, cell in enumerate(row)]
+    
+    def _materialise_cell(self, col_idx: int, cell: str, spintax_ranks: Dict[int, int], rng) -> str:
+        """展开一个单元格（没有指定变体编号时随机确定一个并记录）"""
+        if not cell:
+            return ""
+        template = self.cell_cache.template(cell)
+        if not template.has_groups:
+            return cell
+        if col_idx not in spintax_ranks:
+            spintax_ranks[col_idx] = rng.randrange(template.variations)
+        return template.unrank(spintax_ranks[col_idx])
+    
+    @staticmethod
+    def _plan_key(row: Sequence[str], spintax_ranks: Dict[int, int]) -> tuple:
+        """规划的唯一标识（单元格 + Spintax 变体编号）"""
+        return tuple(row), tuple(sorted(spintax_ranks.items()))
+    
+    @staticmethod
+    def _masked(row: Sequence[str], col_idx: int) -> tuple:
+        """除某一列外的单元格"""
+        return tuple(row[:col_idx]) + tuple(row[col_idx + 1:])
+    
+    def _record(self, row: Sequence[str], spintax_ranks: Dict[int, int]):
+        """记录一篇文档的最终规划"""
+        self._planned.add(self._plan_key(row, spintax_ranks))
+        for col_idx, cell in enumerate(row[:len(self._siblings)]):
+            if cell:
+                self._siblings[col_idx].setdefault(self._masked(row, col_idx), set()).add(cell)
+    
+    def _taken_candidates(self, row: Sequence[str], col_idx: int) -> List[int]:
+        """替换该列后与已规划文档单元格相同的候选序号"""
+        taken = self._siblings[col_idx].get(self._masked(row, col_idx), ())
+        item_index = self._item_index[col_idx]
+        return [item_index[item] for item in taken if item in item_index]
+    
+    def accepts(self, row: List[str], spintax_ranks: Dict[int, int], rng) -> bool:
+        """
+        规划是否可以不经替换直接使用：密度在窗口内，且与已规划的文档不同
+        
+        Args:
+            row: 规划出的原始单元格
+            spintax_ranks: {列索引: 变体编号}（会被补全）
+            rng: 本文档的随机数生成器
+        
+        Returns:
+            是否可以直接使用
+        """
+        cells = self.materialise(row, spintax_ranks, rng)
+        if self._plan_key(row, spintax_ranks) in self._planned:
+            return False
+        total_words, keyword_length = self._totals(cells)
+        density = keyword_length / total_words if total_words else 0.0
+        return float(self._distance(density)) == 0
+    
+    def _totals(self, cells: Sequence[str]):
+        """全文字数和关键词总字符数（与评分阶段按列统计的口径一致）"""
+        stats_list = [self.stats(content) for content in cells if content]
+        total_words = TextStats.total_words(stats_list)
+        keyword_length = sum(self._keyword_length(s) for s in stats_list)
+        return total_words, keyword_length
+    
+    def target(self, row: List[str], spintax_ranks: Dict[int, int], rng,
+               locked_columns: Sequence[int] = ()) -> bool:
+        """
+        把一篇文档的规划修正到密度窗口内（原地修改 row 和 spintax_ranks），并记录最终规划
+        
+        与已规划文档相同的规划总会被替换；替换只选择与已规划文档都不同的候选。
+        
+        Args:
+            row: 规划出的原始单元格
+            spintax_ranks: {列索引: 变体编号}
+            rng: 本文档的随机数生成器
+            locked_columns: 不允许替换的列（如 AI 标题列）
+        
+        Returns:
+            最终密度是否在窗口内
+        """
+        cells = self.materialise(row, spintax_ranks, rng)
+        total_words, keyword_length = self._totals(cells)
+        duplicate = self._plan_key(row, spintax_ranks) in self._planned
+        
+        # 可替换的列：有内容（未被混排策略删除）且该列有其它候选
+        columns = [
+            col_idx for col_idx, cell in enumerate(row)
+            if cell and col_idx not in locked_columns
+            and col_idx < len(self.columns_data) and len(self.columns_data[col_idx]) > 1
+        ]
+        
+        replaced = False
+        for _ in range(len(columns) + 1):
+            density = keyword_length / total_words if total_words else 0.0
+            current_distance = float(self._distance(density))
+            if current_distance == 0 and not duplicate:
+                trace_counters.count("density.repaired" if replaced else "density.in_window")
+                self._record(row, spintax_ranks)
+                return True
+            
+            # 所有 (列, 候选) 替换后的估算距离（与已规划文档重复时任何可用候选都比不替换好）
+            limit = np.inf if duplicate else current_distance
+            best_distance = limit
+            choices = []
+            for col_idx in columns:
+                current = self.stats(cells[col_idx])
+                words = total_words - self._words(current) + self._candidate_words[col_idx]
+                lengths = keyword_length - self._keyword_length(current) + self._candidate_keyword_lengths[col_idx]
+                distances = self._distance(np.divide(
+                    lengths, words, out=np.zeros(len(words), dtype=float), where=words > 0
+                ))
+                distances[self._taken_candidates(row, col_idx)] = np.inf
+                column_best = float(distances.min())
+                if column_best < best_distance:
+                    best_distance = column_best
+                    choices = []
+                if column_best == best_distance and column_best < limit:
+                    choices.extend((col_idx, int(idx)) for idx in np.flatnonzero(distances == column_best))
+            
+            if not choices:
+                break
+            
+            col_idx, item_idx = choices[rng.randrange(len(choices))]
+            row[col_idx] = self.columns_data[col_idx][item_idx]
+            spintax_ranks.pop(col_idx, None)
+            cells[col_idx] = self._materialise_cell(col_idx, row[col_idx], spintax_ranks, rng)
+            total_words, keyword_length = self._totals(cells)
+            replaced = True
+            duplicate = False
+        
+        trace_counters.count("density.duplicate" if duplicate else "density.missed")
+        self._record(row, spintax_ranks)
+        return False
+
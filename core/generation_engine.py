@@ -0,0 +1,166 @@
+"""
+文档批量生成引擎
+不依赖 Qt 的生成核心：界面工作线程、命令行批处理与 DocumentGenerator 共用同一条流水线
+"""
+
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+from loguru import logger
+
+from .generation_profiler import create_profiler
+from .generation_stages import DEFAULT_STAGES, DocumentJob, GenerationContext, GenerationStage
+from .seeding import resolve_run_seed, make_doc_rng, shard_indices
+from ..config.settings import ProfileConfig
+from ..utils.tracing import trace_counters
+
+
+# 进度回调：(当前序号, 总数, 详细信息)
+ProgressCallback = Callable[[int, int, str], None]
+
+
+class GenerationEngine:
+    """文档批量生成引擎（分阶段流水线）"""
+    
+    def __init__(self, config: ProfileConfig, stages: Optional[Sequence[GenerationStage]] = None):
+        """
+        初始化生成引擎
+        
+        Args:
+            config: 配置对象
+            stages: 自定义阶段列表（默认：规划 → 物化 → 序号 → 评分/查重 → 构建 → 写入 → 报告）
+        """
+        self.config = config
+        self.stages: List[GenerationStage] = list(stages) if stages else [cls() for cls in DEFAULT_STAGES]
+        
+        # 本批次生成的文件路径（generate 返回后可读取）
+        self.generated_files: List[str] = []
+        # 最近一次运行的上下文
+        self.context: Optional[GenerationContext] = None
+    
+    def generate(
+        self,
+        grid_data: List[List[str]],
+        save_dir: str,
+        mode: str,
+        count: int,
+        progress_callback: Optional[ProgressCallback] = None,
+        title_queue: Optional[List[str]] = None,
+        title_format: str = "H1",
+        seed: Optional[int] = None,
+        shard: Optional[Tuple[int, int]] = None,
+        columns_data: Optional[List[List[str]]] = None
+    ) -> int:
+        """
+        批量生成文档
+        
+        Args:
+            grid_data: 网格数据（按行）
+            save_dir: 保存目录
+            mode: 生成模式 ("row" 或 "shuffle")
+            count: 生成数量（混排模式，整个逻辑批次的数量；按行模式忽略）
+            progress_callback: 进度回调函数 (current, total, detail)
+            title_queue: AI 标题队列（混排模式下依次替换第一列）
+            title_format: AI 标题使用的列格式
+            seed: 运行种子（默认取配置中的 generation_seed）
+            shard: (分片索引, 分片总数)，只生成属于该分片的文档
+                （文档内容与单机一致；评级与查重重试只在分片内比较，见 core.seeding）
+            columns_data: 可选，直接传入按列组织的数据（混排模式）
+        
+        Returns:
+            生成的文档数量
+        """
+        total = len(grid_data) if mode == "row" else count
+        
+        context = GenerationContext(
+            config=self.config,
+            save_dir=save_dir,
+            mode=mode,
+            count=total,
+            # 运行种子：每篇文档的随机选择只由 (种子, 文档序号) 决定，可复现
+            run_seed=resolve_run_seed(seed if seed is not None else self.config.generation_seed),
+            grid_data=grid_data,
+            shard=shard,
+            columns_data=columns_data,
+            title_queue=list(title_queue or []),
+            title_format=title_format,
+            profiler=create_profiler(self.config.profiling_enabled)
+        )
+        self.context = context
+        self.generated_files = context.generated_files
+        
+        profiler = context.profiler
+        generated = 0
+        # 热路径只计数不逐条写日志，运行结束时汇总本批次的事件次数
+        counters_before = trace_counters.snapshot()
+        try:
+            for stage in self.stages:
+                with profiler.span(f"{stage.name}.setup"):
+                    stage.setup(context)
+            
+            for index in shard_indices(total, shard):
+                # 更新进度
+                if progress_callback:
+                    progress_callback(index + 1, total, self._progress_detail(context, index))
+                
+                job = self._run_document(context, index)
+                if job:
+                    generated += 1
+                    profiler.document_done()
+                    logger.info(f"已生成文档 {generated}/{total}: {job.filename}")
+        finally:
+            for stage in self.stages:
+                with profiler.span(f"{stage.name}.finish"):
+                    stage.finish(context)
+            
+            trace_counters.log_summary("本批次事件统计", counters_before)
+            
+            if profiler.enabled:
+                profiler.log_summary()
+                profiler.save_json(context.output_path("generation_profile", ".json"))
+        
+        return generated
+    
+    def _run_document(self, context: GenerationContext, index: int) -> Optional[DocumentJob]:
+        """
+        让一篇文档依次通过所有阶段
+        
+        某个阶段拒绝（如历史查重命中）时，用新的随机子流重新走一遍流水线。
+        
+        Returns:
+            成功时返回文档任务，超过最大重试次数返回 None
+        """
+        for attempt in range(context.max_attempts):
+            # 首次尝试使用文档本身的随机流，重试时使用独立子流
+            rng = make_doc_rng(context.run_seed, index, f"retry{attempt}" if attempt else "")
+            job = DocumentJob(index=index, attempt=attempt, rng=rng)
+            
+            if context.profiler.enabled or context.collect_timings:
+                accepted = self._process_timed(job, context)
+            else:
+                accepted = all(stage.process(job, context) for stage in self.stages)
+            
+            if accepted:
+                return job
+        
+        logger.error(f"✗ 文档 {index + 1} 超过最大重试次数，跳过")
+        return None
+    
+    def _process_timed(self, job: DocumentJob, context: GenerationContext) -> bool:
+        """依次执行各阶段并记录每个阶段的耗时（同时记入文档任务，供质量明细使用）"""
+        profiler = context.profiler
+        for stage in self.stages:
+            start = time.perf_counter()
+            accepted = stage.process(job, context)
+            elapsed = time.perf_counter() - start
+            profiler.record(stage.name, elapsed)
+            job.timings[stage.name] = elapsed
+            if not accepted:
+                return False
+        return True
+    
+    @staticmethod
+    def _progress_detail(context: GenerationContext, index: int) -> str:
+        """生成进度详情文本"""
+        if context.mode == "row":
+            return f"正在生成第 {index + 1} 个文档..."
+        return f"正在生成第 {index + 1} 个文档（{'AI标题' if context.use_ai_titles else '混排'}模式）..."
@@ -0,0 +1,242 @@
+"""
+编译后的生成计划
+生成热路径中原本每篇文档都要重复做的配置解析（线性查找列类型、重建序号分组映射、
+把策略列号转换为 0-based 并分组、逐个关键词 find），在批次开始时由 ProfileConfig
+一次性编译为不可变的 GenerationPlan，之后各阶段只做数组下标访问。
+
+计划只依赖配置和列数；配置发生任何修改后，ProfileConfig.compile_plan 会重新编译。
+"""
+
+import re
+from typing import Iterator, List, Sequence, Tuple
+from loguru import logger
+
+from ..utils.tracing import trace_counters
+
+
+# 未设置类型的列默认按正文处理（与 ProfileConfig.get_column_type 一致）
+DEFAULT_COLUMN_TYPE = 'Body'
+
+
+class KeywordMatcher:
+    """
+    多关键词匹配器（所有关键词编译为一个正则交替式）
+    
+    匹配规则与逐个关键词 find 取最近位置一致：从左到右扫描，
+    同一位置有多个关键词命中时取列表中靠前的关键词，匹配之间不重叠。
+    """
+    
+    __slots__ = ("keywords", "_pattern")
+    
+    def __init__(self, keywords: Sequence[str]):
+        """
+        Args:
+            keywords: 关键词列表（空字符串和重复项会被忽略）
+        """
+        self.keywords: Tuple[str, ...] = tuple(dict.fromkeys(k for k in keywords if k))
+        self._pattern = re.compile('|'.join(map(re.escape, self.keywords))) if self.keywords else None
+    
+    def __bool__(self) -> bool:
+        return self._pattern is not None
+    
+    def finditer(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        依次返回关键词命中的位置
+        
+        Args:
+            text: 待匹配文本
+        
+        Returns:
+            (起始位置, 结束位置) 迭代器
+        """
+        if self._pattern is None or not text:
+            return iter(())
+        return (match.span() for match in self._pattern.finditer(text))
+
+
+class CompiledStrategy:
+    """编译后的混排策略（列号已转换为 0-based 并按列数过滤、分组）"""
+    
+    __slots__ = ("name", "columns", "groups", "keep_count", "shuffle_order")
+    
+    def __init__(self, name: str, columns: Tuple[int, ...], groups: Tuple[Tuple[int, ...], ...],
+                 keep_count: int, shuffle_order: bool):
+        self.name = name
+        self.columns = columns  # 策略涉及的有效列（不完整分组中的列总是被删除）
+        self.groups = groups  # 完整的分组
+        self.keep_count = min(keep_count, len(groups))
+        self.shuffle_order = shuffle_order
+    
+    def apply(self, row: List[str], rng):
+        """
+        随机保留若干组，删除（置空）其余列（原地修改）
+        
+        Args:
+            row: 行数据
+            rng: 随机数生成器
+        """
+        kept_groups = rng.sample(self.groups, self.keep_count)
+        if self.shuffle_order:
+            rng.shuffle(kept_groups)
+        
+        kept_columns = set()
+        for group in kept_groups:
+            kept_columns.update(group)
+        
+        for col in self.columns:
+            if col not in kept_columns:
+                row[col] = ""
+        
+        trace_counters.count("strategy.applied")
+        logger.trace("策略 '{}': 保留组 {}", self.name, kept_groups)
+
+
+class GenerationPlan:
+    """不可变的生成计划（批次开始时编译一次，由各阶段共享）"""
+    
+    __slots__ = ("column_count", "column_types", "numbering_groups", "strategies", "bold_matcher", "column_images")
+    
+    def __init__(self, config, column_count: int):
+        """
+        编译生成计划（一般通过 ProfileConfig.compile_plan 获取，带缓存）
+        
+        Args:
+            config: ProfileConfig 实例
+            column_count: 数据列数
+        """
+        set_attr = super().__setattr__
+        set_attr("column_count", column_count)
+        
+        # 列类型数组（同一列有多条设置时以第一条为准）
+        column_types = [DEFAULT_COLUMN_TYPE] * column_count
+        assigned = set()
+        for setting in config.column_settings:
+            if setting.col_index < column_count and setting.col_index not in assigned:
+                column_types[setting.col_index] = setting.type
+                assigned.add(setting.col_index)
+        set_attr("column_types", tuple(column_types))
+        
+        set_attr("numbering_groups", self._compile_numbering_groups(config, column_count))
+        set_attr("strategies", self._compile_strategies(config, column_count))
+        set_attr("bold_matcher", KeywordMatcher(config.bold_keywords))
+        
+        # 列图片数组（没有图片的列为空元组）
+        set_attr("column_images", tuple(
+            tuple(config.column_images.get(col_idx) or ()) for col_idx in range(column_count)
+        ))
+        
+        logger.debug(
+            "生成计划已编译: {} 列, {} 个混排策略, {} 个加粗关键词",
+            column_count, len(self.strategies), len(self.bold_matcher.keywords)
+        )
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("GenerationPlan 不可修改，请修改配置后重新编译")
+    
+    def column_type(self, col_idx: int) -> str:
+        """
+        获取列类型
+        
+        Args:
+            col_idx: 列索引
+        
+        Returns:
+            列类型（超出范围的列为 'Body'）
+        """
+        if col_idx < self.column_count:
+            return self.column_types[col_idx]
+        return DEFAULT_COLUMN_TYPE
+    
+    def numbering_group(self, col_idx: int) -> int:
+        """
+        获取列所属的序号分组
+        
+        Args:
+            col_idx: 列索引
+        
+        Returns:
+            分组索引（-1 表示不属于任何分组）
+        """
+        if col_idx < self.column_count:
+            return self.numbering_groups[col_idx]
+        return -1
+    
+    def images(self, col_idx: int) -> Tuple[str, ...]:
+        """
+        获取列的图片路径列表
+        
+        Args:
+            col_idx: 列索引
+        
+        Returns:
+            图片路径元组（可能为空）
+        """
+        if col_idx < self.column_count:
+            return self.column_images[col_idx]
+        return ()
+    
+    def apply_strategies(self, row: Sequence[str], rng) -> List[str]:
+        """
+        依次应用所有混排策略
+        
+        Args:
+            row: 行数据（不会被修改）
+            rng: 随机数生成器
+        
+        Returns:
+            应用策略后的新行数据
+        """
+        result = list(row)
+        for strategy in self.strategies:
+            strategy.apply(result, rng)
+        return result
+    
+    @staticmethod
+    def _compile_numbering_groups(config, column_count: int) -> Tuple[int, ...]:
+        """编译列到序号分组的映射数组"""
+        groups = [-1] * column_count
+        if config.numbering_groups:
+            # 使用用户配置的序号分组（后出现的分组覆盖前面的）
+            for group_idx, group_columns in enumerate(config.numbering_groups):
+                for col in group_columns:
+                    if 0 <= col < column_count:
+                        groups[col] = group_idx
+        else:
+            # 没有配置序号分组时使用混排策略作为分组依据（兼容旧逻辑，直接使用策略中的列号）
+            for strategy_idx, strategy in enumerate(config.shuffling_strategies):
+                for col in strategy.columns:
+                    if 0 <= col < column_count:
+                        groups[col] = strategy_idx
+        return tuple(groups)
+    
+    @staticmethod
+    def _compile_strategies(config, column_count: int) -> Tuple[CompiledStrategy, ...]:
+        """把混排策略的 1-based 列号转换为 0-based，并按列数过滤、分组"""
+        strategies = []
+        for strategy in config.shuffling_strategies:
+            columns = [col - 1 for col in strategy.columns if col > 0]
+            valid_columns = tuple(col for col in columns if col < column_count)
+            if len(valid_columns) != len(columns):
+                logger.warning(f"策略 '{strategy.name}' 部分列索引超出范围，过滤后: {list(valid_columns)}")
+            if not valid_columns:
+                logger.warning(f"策略 '{strategy.name}' 没有有效的列索引，跳过")
+                continue
+            
+            # 只保留完整的组
+            chunks = (
+                valid_columns[i:i + strategy.group_size]
+                for i in range(0, len(valid_columns), strategy.group_size)
+            )
+            groups = tuple(group for group in chunks if len(group) == strategy.group_size)
+            if not groups:
+                logger.warning(f"策略 '{strategy.name}' 无法形成完整分组，跳过")
+                continue
+            
+            logger.debug(
+                "策略 '{}': 原始列号 {} -> 分组 {}, 保留组数={}",
+                strategy.name, strategy.columns, groups, strategy.keep_count
+            )
+            strategies.append(CompiledStrategy(
+                strategy.name, valid_columns, groups, strategy.keep_count, strategy.shuffle_order
+            ))
+        return tuple(strategies)
@@ -0,0 +1,149 @@
+"""
+生成耗时统计
+按阶段记录每篇文档的耗时（单调时钟），汇总为 p50 / p95 / 总耗时
+"""
+
+import json
+import math
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List
+from loguru import logger
+
+
+class GenerationProfiler:
+    """生成阶段耗时统计器"""
+    
+    enabled = True
+    
+    def __init__(self):
+        # {阶段名: [每次耗时(秒)...]}
+        self._spans: Dict[str, List[float]] = defaultdict(list)
+        self._documents = 0
+        self._start = time.perf_counter()
+    
+    def record(self, name: str, seconds: float):
+        """
+        记录一次耗时
+        
+        Args:
+            name: 阶段名称（子阶段用 "阶段.子项"，如 "build.image"）
+            seconds: 耗时（秒）
+        """
+        self._spans[name].append(seconds)
+    
+    @contextmanager
+    def span(self, name: str):
+        """
+        计时上下文
+        
+        Args:
+            name: 阶段名称
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._spans[name].append(time.perf_counter() - start)
+    
+    def document_done(self):
+        """一篇文档生成完成"""
+        self._documents += 1
+    
+    @staticmethod
+    def _percentile(sorted_values: List[float], percent: float) -> float:
+        """最近秩法求百分位数（输入已排序）"""
+        if not sorted_values:
+            return 0.0
+        rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+        return sorted_values[rank - 1]
+    
+    def summary(self) -> Dict:
+        """
+        汇总统计
+        
+        Returns:
+            {"documents", "wall_time", "stages": {阶段名: {count, total, mean, p50, p95, max}}}
+        """
+        stages = {}
+        for name, values in self._spans.items():
+            ordered = sorted(values)
+            total = sum(ordered)
+            stages[name] = {
+                "count": len(ordered),
+                "total": round(total, 6),
+                "mean": round(total / len(ordered), 6),
+                "p50": round(self._percentile(ordered, 50), 6),
+                "p95": round(self._percentile(ordered, 95), 6),
+                "max": round(ordered[-1], 6),
+            }
+        
+        return {
+            "documents": self._documents,
+            "wall_time": round(time.perf_counter() - self._start, 6),
+            "stages": stages,
+        }
+    
+    def log_summary(self):
+        """把汇总结果写入日志（界面日志面板可见），按总耗时降序"""
+        summary = self.summary()
+        logger.info(
+            f"⏱ 生成耗时统计: {summary['documents']} 篇文档, 总耗时 {summary['wall_time']:.3f}s"
+        )
+        ordered = sorted(summary["stages"].items(), key=lambda item: item[1]["total"], reverse=True)
+        for name, stats in ordered:
+            logger.info(
+                f"  {name:<20} 次数={stats['count']:<6} 总计={stats['total'] * 1000:.1f}ms "
+                f"p50={stats['p50'] * 1000:.2f}ms p95={stats['p95'] * 1000:.2f}ms"
+            )
+    
+    def save_json(self, output_path: str):
+        """
+        保存为 JSON 文件
+        
+        Args:
+            output_path: 输出路径
+        """
+        try:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+            logger.info(f"生成耗时统计已保存: {output_path}")
+        except Exception as e:
+            logger.error(f"保存生成耗时统计失败: {e}")
+
+
+class NullProfiler:
+    """未启用统计时使用的空实现（所有调用都是空操作）"""
+    
+    enabled = False
+    
+    _NULL_SPAN = nullcontext()
+    
+    def record(self, name: str, seconds: float):
+        pass
+    
+    def span(self, name: str):
+        return self._NULL_SPAN
+    
+    def document_done(self):
+        pass
+    
+    def log_summary(self):
+        pass
+    
+    def save_json(self, output_path: str):
+        pass
+
+
+def create_profiler(enabled: bool):
+    """
+    根据开关创建统计器
+    
+    Args:
+        enabled: 是否启用
+    
+    Returns:
+        GenerationProfiler 或 NullProfiler
+    """
+    return GenerationProfiler() if enabled else NullProfiler()
@@ -0,0 +1,1029 @@
+"""
+文档生成流水线阶段
+规划 → 物化文本 → 序号处理 → 评分/查重 → 构建 docx → 写入 → 质量报告
+
+每个阶段在批次开始时执行一次 setup（准备缓存、编译配置），
+之后对每篇文档执行 process；阶段可以整体替换。
+"""
+
+import os
+import random
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from docx import Document
+from docx.shared import Pt, RGBColor, Inches, Cm
+from docx.oxml.ns import qn
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from loguru import logger
+
+from .cell_cache import CellCache
+from .combination_planner import CombinationPlanner
+from .density_planner import DensityTargeter
+from .generation_plan import GenerationPlan, KeywordMatcher
+from .generation_profiler import NullProfiler
+from .quality_checker import QualityChecker, QualityReport, QualityScore
+from .quality_report_sinks import create_detail_sink
+from .seeding import IndexPermutation, make_run_rng
+from .smart_numbering import SmartNumbering
+from .usage_rotation import UsageBalancedRotation
+from ..config.settings import ProfileConfig
+from ..utils.tracing import trace_counters
+
+
+@dataclass
+class GenerationContext:
+    """批次级上下文（所有阶段共享）"""
+    config: ProfileConfig
+    save_dir: str
+    mode: str  # "row" 或 "shuffle"
+    count: int  # 逻辑批次的文档总数
+    run_seed: int
+    grid_data: List[List[str]]
+    shard: Optional[Tuple[int, int]] = None
+    columns_data: Optional[List[List[str]]] = None
+    title_queue: List[str] = field(default_factory=list)
+    title_format: str = "H1"
+    
+    # 查重失败时每篇文档的最大尝试次数（由评分阶段设置）
+    max_attempts: int = 1
+    # 历史查重器（由评分阶段创建，写入阶段记录指纹）
+    deduplicator: Any = None
+    # 跨批次均衡轮换（由规划阶段创建，写入阶段记录实际写出的文档用到的内容）
+    usage_rotation: Any = None
+    # 列类型覆盖（AI 标题模式下第一列使用 AI 指定的格式）
+    column_type_overrides: Dict[int, str] = field(default_factory=dict)
+    # 本批次生成的文件路径
+    generated_files: List[str] = field(default_factory=list)
+    # 耗时统计器（未启用时为空实现）
+    profiler: Any = field(default_factory=NullProfiler)
+    # 单元格预处理缓存（段落拆分、序号检测只对同一文本做一次）
+    cell_cache: CellCache = field(default_factory=CellCache)
+    # 编译后的生成计划（列类型、序号分组、混排策略等，本批次内不变）
+    plan: Optional[GenerationPlan] = None
+    # 是否记录每篇文档各阶段的耗时（质量明细需要；耗时统计器启用时总是记录）
+    collect_timings: bool = False
+    
+    def __post_init__(self):
+        if self.plan is None:
+            if self.columns_data is not None:
+                column_count = len(self.columns_data)
+            else:
+                column_count = max((len(row) for row in self.grid_data), default=0)
+            self.plan = self.config.compile_plan(column_count)
+    
+    @property
+    def use_ai_titles(self) -> bool:
+        """是否为标题驱动模式"""
+        return self.mode == "shuffle" and len(self.title_queue) > 0
+    
+    def output_path(self, stem: str, suffix: str) -> str:
+        """
+        批次级输出文件路径（与文档同目录）
+        
+        分片运行时各自写独立的文件，避免多个分片写入同一目录时互相覆盖
+        （合并方式见 core.seeding 模块说明）。
+        
+        Args:
+            stem: 文件名主体，如 "quality_report"
+            suffix: 扩展名，如 ".csv"
+        
+        Returns:
+            文件路径
+        """
+        if self.shard:
+            stem = f"{stem}_{self.shard[0] + 1}of{self.shard[1]}"
+        return str(Path(self.save_dir) / f"{stem}{suffix}")
+    
+    def get_column_type(self, col_idx: int) -> str:
+        """获取列类型（优先使用本批次的覆盖设置）"""
+        if col_idx in self.column_type_overrides:
+            return self.column_type_overrides[col_idx]
+        return self.plan.column_type(col_idx)
+
+
+@dataclass
+class ColumnBlock:
+    """一列物化后的内容"""
+    col_idx: int
+    col_type: str
+    content: str  # 该列物化后的完整文本
+    paragraphs: List[str] = field(default_factory=list)
+    # 每个段落的 (序号类型, 去掉序号后的正文)，与 paragraphs 一一对应（来自单元格缓存）
+    numbering: Tuple[Tuple[Optional[str], str], ...] = ()
+    insert_image: bool = False  # 是否在段落之后插入列图片
+    check_comparison: bool = False  # 是否检查对比表插入
+
+
+@dataclass
+class DocumentJob:
+    """单篇文档在流水线中的状态"""
+    index: int  # 文档全局序号（从0开始）
+    attempt: int
+    rng: random.Random
+    row: List[str] = field(default_factory=list)  # 规划出的原始单元格
+    spintax_ranks: Dict[int, int] = field(default_factory=dict)  # 规划指定的 Spintax 变体编号 {列索引: 编号}
+    cells: List[str] = field(default_factory=list)  # 物化后的单元格
+    blocks: List[ColumnBlock] = field(default_factory=list)
+    full_text: str = ""
+    title: str = ""
+    filename: str = ""
+    doc: Any = None
+    score: Optional[QualityScore] = None  # 批内质量评分（未启用质量检查时为 None）
+    fingerprint: Optional[Tuple[int, str]] = None  # 历史查重使用的 (SimHash, MD5)
+    timings: Dict[str, float] = field(default_factory=dict)  # {阶段名: 耗时(秒)}
+
+
+class GenerationStage:
+    """流水线阶段基类"""
+    
+    name = "stage"
+    
+    def setup(self, context: GenerationContext):
+        """批次开始时调用一次"""
+    
+    def process(self, job: DocumentJob, context: GenerationContext) -> bool:
+        """
+        处理一篇文档
+        
+        Returns:
+            False 表示拒绝本次结果（引擎会用新的随机流重试）
+        """
+        return True
+    
+    def finish(self, context: GenerationContext):
+        """批次结束时调用一次（无论成功与否）"""
+
+
+class PlanStage(GenerationStage):
+    """规划：确定每篇文档使用的单元格"""
+    
+    name = "plan"
+    # 密度定向时沿排列探测的组合数（超过后改为替换列内容）
+    density_probes = 8
+    
+    def setup(self, context: GenerationContext):
+        self.rotation = None
+        self.density_targeter = None
+        if context.mode == "row":
+            return
+        
+        # 按列获取数据（每列只保留有效内容）
+        if context.columns_data is None:
+            context.columns_data = self.get_column_data(context.grid_data)
+        logger.info(f"获取列数据：共 {len(context.columns_data)} 列")
+        for idx, col_data in enumerate(context.columns_data):
+            logger.debug(f"列 {idx + 1}: {len(col_data)} 个有效内容")
+        
+        # 跨批次均衡轮换：按历史使用次数选内容（与组合规划二选一）
+        if context.config.usage_balancing_enabled:
+            from ..database.usage_manager import CellUsageManager
+            self.rotation = UsageBalancedRotation(
+                context.columns_data,
+                CellUsageManager(),
+                choices=context.config.usage_balancing_choices,
+                flush_interval=context.config.usage_flush_interval
+            )
+            context.usage_rotation = self.rotation
+        
+        # SEO 密度定向：规划时就把文档调整到密度范围内，而不是生成后才在报告中标出
+        config = context.config
+        if (config.seo_density_targeting and config.seo_check_enabled
+                and config.quality_check_enabled and config.target_keywords):
+            self.density_targeter = DensityTargeter(config, context.columns_data, context.cell_cache)
+        
+        # 组合规划：每篇文档取组合空间中不同的点，查重重试只作为兜底
+        self.planner = CombinationPlanner(context.config, context.columns_data)
+        self.permutation = None
+        if self.planner.supported and self.rotation is None:
+            self.planner.check_capacity(context.count, context.config)
+            if self.density_targeter:
+                logger.info("SEO 密度定向只使用密度窗口内的组合，实际可用的组合数少于上述估计")
+            # 排列只取决于运行种子，分片执行时各分片得到同一排列
+            self.permutation = IndexPermutation(self.planner.size, make_run_rng(context.run_seed, "plan"))
+    
+    def process(self, job: DocumentJob, context: GenerationContext) -> bool:
+        if context.mode == "row":
+            job.row = list(context.grid_data[job.index])
+            return True
+        
+        # 标题驱动逻辑：如果有 AI 标题队列，替换第一列内容
+        ai_title = None
+        if context.use_ai_titles and job.index < len(context.title_queue):
+            ai_title = context.title_queue[job.index]
+            # 第一列使用 AI 指定的格式
+            context.column_type_overrides[0] = context.title_format
+            logger.info(f"文档 {job.index + 1}: 使用 AI 标题 '{ai_title}' (格式: {context.title_format})")
+        
+        if self.permutation is not None and job.attempt == 0:
+            self._plan_combination(job, context, ai_title)
+        else:
+            # 查重拒绝后的重试（或无法规划、启用均衡轮换时）改为逐列抽取
+            job.row = self._select_row(context, job.rng)
+            self._set_title(job, ai_title)
+        
+        # 按关键词密度修正组合（AI 标题列保持不变；替换后的组合与已规划的文档都不同）
+        if self.density_targeter:
+            self.density_targeter.target(job.row, job.spintax_ranks, job.rng, locked_columns=(0,) if ai_title else ())
+        
+        return True
+    
+    def _plan_combination(self, job: DocumentJob, context: GenerationContext, ai_title: Optional[str]):
+        """
+        从组合排列中取本文档的组合
+        
+        文档 i 使用排列位置 i（超出组合空间时按排列顺序循环）。启用密度定向时，
+        位置 i 的组合不在密度窗口内则依次探测位置 i + count、i + 2*count……
+        这些位置不属于本批次的任何其它文档；与本进程已规划的组合相同的位置同样跳过。
+        都不在窗口内时退回位置 i 的组合，由密度定向替换列内容。
+        """
+        size = self.planner.size
+        positions = [job.index % size]
+        if self.density_targeter:
+            positions.extend(range(job.index + context.count, size, context.count)[:self.density_probes - 1])
+        
+        for position in positions:
+            self._unrank(job, position, ai_title)
+            if self.density_targeter is None or self.density_targeter.accepts(job.row, job.spintax_ranks, job.rng):
+                return
+        
+        if len(positions) > 1:
+            self._unrank(job, positions[0], ai_title)
+    
+    def _unrank(self, job: DocumentJob, position: int, ai_title: Optional[str]):
+        """取排列中某个位置的组合"""
+        plan = self.planner.unrank(self.permutation[position])
+        job.row = plan.cells
+        job.spintax_ranks = plan.spintax_ranks
+        self._set_title(job, ai_title)
+    
+    @staticmethod
+    def _set_title(job: DocumentJob, ai_title: Optional[str]):
+        """用 AI 标题替换第一列内容"""
+        if ai_title is None:
+            return
+        if job.row:
+            job.row[0] = ai_title
+        else:
+            job.row = [ai_title]
+        job.spintax_ranks.pop(0, None)
+    
+    def finish(self, context: GenerationContext):
+        # 本批次的使用次数（写入阶段记录）一次性写入数据库
+        if self.rotation:
+            self.rotation.flush()
+    
+    @staticmethod
+    def get_column_data(grid_data: List[List[str]]) -> List[List[str]]:
+        """
+        按列获取数据（每列只保留去除首尾空白后的有效内容）
+        
+        Args:
+            grid_data: 网格数据（按行）
+        
+        Returns:
+            列数据列表 [[col1_data...], [col2_data...], ...]
+        """
+        column_count = max((len(row) for row in grid_data), default=0)
+        columns_data = [[] for _ in range(column_count)]
+        
+        for row in grid_data:
+            for col_idx, cell in enumerate(row):
+                if cell and str(cell).strip():
+                    columns_data[col_idx].append(str(cell).strip())
+        
+        return columns_data
+    
+    def _select_row(self, context: GenerationContext, rng: random.Random) -> List[str]:
+        """从每列独立随机选择内容，并应用混排策略"""
+        processed_row = []
+        for col_idx, col_data in enumerate(context.columns_data):
+            if self.rotation:
+                # 均衡轮换：优先选历史使用次数少的内容
+                processed_row.append(self.rotation.choose(col_idx, rng))
+            elif col_data:
+                # 该列有内容，随机选择一个
+                processed_row.append(rng.choice(col_data))
+            else:
+                # 该列为空
+                processed_row.append("")
+        
+        # 应用混排策略（删除某些列）
+        if context.plan.strategies:
+            processed_row = context.plan.apply_strategies(processed_row, rng)
+        
+        return processed_row
+    
+    @staticmethod
+    def apply_column_shuffling_strategies(config: ProfileConfig, row_data: list, rng=None) -> list:
+        """
+        应用混排策略（只保留/删除指定列，不改变内容）
+        
+        Args:
+            config: 配置对象
+            row_data: 行数据
+            rng: 本文档的随机数生成器（None 时使用全局 random）
+        
+        Returns:
+            应用策略后的行数据
+        """
+        # 策略分组由编译后的生成计划提供（按列数缓存，配置修改后自动重新编译）
+        return config.compile_plan(len(row_data)).apply_strategies(row_data, rng or random)
+
+
+class MaterialiseStage(GenerationStage):
+    """物化文本：展开 Spintax，按列类型拆分段落"""
+    
+    name = "materialise"
+    
+    def process(self, job: DocumentJob, context: GenerationContext) -> bool:
+        job.cells = []
+        job.blocks = []
+        
+        for col_idx, cell in enumerate(job.row):
+            content = cell or ""
+            if content:
+                template = context.cell_cache.template(content)
+                if col_idx in job.spintax_ranks:
+                    content = template.unrank(job.spintax_ranks[col_idx])
+                elif template.has_groups:
+                    content = template.render(job.rng)
+            job.cells.append(content)
+            
+            has_content = bool(content and content.strip())
+            col_type = context.get_column_type(col_idx) if has_content else ""
+            
+            if context.mode == "row" and (not has_content or col_type == 'Ignore'):
+                # 按行模式：空列和忽略列整列跳过
+                continue
+            
+            block = ColumnBlock(col_idx=col_idx, col_type=col_type, content=content)
+            if has_content and col_type != 'Ignore':
+                # 将内容按换行符分割成多个段落（连同序号检测结果取自缓存）
+                entry = context.cell_cache.entry(content)
+                block.paragraphs = list(entry.paragraphs)
+                block.numbering = entry.numbering
+                block.insert_image = True
+            # 混排模式下无论列是否为空都检查对比表
+            block.check_comparison = True
+            job.blocks.append(block)
+        
+        job.full_text = "\n".join([str(content) for content in job.cells if content])
+        job.title = job.cells[0] if job.cells else f"文档{job.index + 1}"
+        return True
+    
+    def finish(self, context: GenerationContext):
+        context.cell_cache.log_summary()
+
+
+class NumberingStage(GenerationStage):
+    """序号处理：按格式（按行模式）或按序号分组（混排模式）独立计数"""
+    
+    name = "number"
+    
+    def setup(self, context: GenerationContext):
+        self.plan = context.plan
+        logger.debug("序号分组映射: {}", self.plan.numbering_groups)
+    
+    def process(self, job: DocumentJob, context: GenerationContext) -> bool:
+        if context.mode == "row":
+            self._renumber_by_style(job)
+        else:
+            self._renumber_by_group(job)
+        return True
+    
+    @staticmethod
+    def _paragraph_numbering(block: ColumnBlock):
+        """段落的序号检测结果（优先使用缓存，段落被其它阶段改动过时重新检测）"""
+        if len(block.numbering) == len(block.paragraphs):
+            return block.numbering
+        return [
+            (style, cleaned)
+            for cleaned, style in map(SmartNumbering.detect_and_clean, block.paragraphs)
+        ]
+    
+    def _renumber_by_style(self, job: DocumentJob):
+        """按行模式：整篇文档中每种序号格式独立计数"""
+        style_counters = {}
+        
+        for block in job.blocks:
+            for i, (detected_style, cleaned_text) in enumerate(self._paragraph_numbering(block)):
+                para_text = block.paragraphs[i]
+                
+                if not detected_style:
+                    # 没有检测到序号：保持原样
+                    logger.trace("[{}] 无序号，保持原样: '{}'", block.col_type, para_text[:40])
+                    continue
+                
+                # 检测到序号：清洗并重新编号
+                if detected_style not in style_counters:
+                    style_counters[detected_style] = 1
+                
+                current_number = style_counters[detected_style]
+                processed_content = SmartNumbering.generate_prefix(current_number, detected_style) + cleaned_text
+                # 每段都会走到这里，只输出采样的样例
+                if trace_counters.sampled("numbering.renumbered"):
+                    logger.debug(
+                        "[{}] 重编号样例: {}, 样式={}, 原文='{}', 结果='{}'",
+                        block.col_type, current_number, detected_style, para_text[:40], processed_content[:40]
+                    )
+                
+                block.paragraphs[i] = processed_content
+                style_counters[detected_style] += 1
+    
+    def _renumber_by_group(self, job: DocumentJob):
+        """混排模式：只对序号分组内的列重新编号，每组每种格式独立计数"""
+        # {分组索引: {序号样式: 计数器}}
+        group_counters = {}
+        
+        for block in job.blocks:
+            for i, (detected_style, cleaned_text) in enumerate(self._paragraph_numbering(block)):
+                para_text = block.paragraphs[i]
+                
+                if not detected_style:
+                    logger.trace("[{}][列{}] 无序号，保持原样: '{}'", block.col_type, block.col_idx + 1, para_text[:40])
+                    continue
+                
+                # 确定该列属于哪个序号分组（-1 表示不属于任何分组）
+                group_idx = self.plan.numbering_group(block.col_idx)
+                if group_idx == -1:
+                    trace_counters.count("numbering.outside_group")
+                    logger.trace("[{}][列{}] 不在序号分组内，保持原样: '{}'", block.col_type, block.col_idx + 1, para_text[:40])
+                    continue
+                
+                # 在序号分组内，强制重新编号
+                current_counters = group_counters.setdefault(group_idx, {})
+                if detected_style not in current_counters:
+                    current_counters[detected_style] = 1
+                
+                current_number = current_counters[detected_style]
+                
+                # 强制使用计数器值重新生成序号前缀（修复原序号为1时的问题）
+                new_prefix = SmartNumbering.generate_prefix(current_number, detected_style)
+                processed_content = new_prefix + cleaned_text
+                
+                if trace_counters.sampled("numbering.renumbered"):
+                    logger.debug(
+                        "[{}][列{}][分组{}] 重编号样例: {}, 样式={}, 原文='{}', 结果='{}'",
+                        block.col_type, block.col_idx + 1, group_idx + 1, current_number, detected_style,
+                        para_text[:40], processed_content[:40]
+                    )
+                
+                block.paragraphs[i] = processed_content
+                current_counters[detected_style] += 1
+
+
+class ScoreStage(GenerationStage):
+    """评分/查重：历史 SimHash 查重（可拒绝重试）+ 批内质量评分"""
+    
+    name = "score"
+    
+    def setup(self, context: GenerationContext):
+        config = context.config
+        self.quality_checker = None
+        self.project_name = config.get_dedup_project_name()
+        
+        if config.quality_check_enabled:
+            self.quality_checker = QualityChecker(
+                threshold_premium=config.quality_threshold_premium,
+                threshold_standard=config.quality_threshold_standard,
+                seo_keywords=config.target_keywords if config.seo_check_enabled else [],
+                seo_density_min=config.seo_density_min,
+                seo_density_max=config.seo_density_max
+            )
+            logger.info("质量检查已启用")
+            if config.seo_check_enabled and config.target_keywords:
+                logger.info(f"SEO 密度检查已启用，目标关键词: {config.target_keywords}")
+        
+        # 历史查重（跨批次 SimHash 指纹），只在混排模式下可通过重试换内容
+        if config.dedup_enabled and context.mode == "shuffle":
+            context.deduplicator = self._create_deduplicator(config)
+            context.max_attempts = config.dedup_max_retries
+    
+    def process(self, job: DocumentJob, context: GenerationContext) -> bool:
+        if context.deduplicator:
+            with context.profiler.span("score.dedup"):
+                # 指纹只计算一次，写入阶段和质量明细复用
+                job.fingerprint = context.deduplicator.calculate_content_fingerprint(job.full_text)
+                is_duplicate, dup_info = context.deduplicator.check_duplicate(
+                    text=job.full_text,
+                    source_project=self.project_name,
+                    fingerprint=job.fingerprint
+                )
+            if is_duplicate:
+                similarity = dup_info.get('similarity_percent', 100)
+                logger.warning(
+                    f"⚠ 检测到重复内容 (相似度: {similarity:.1f}%), "
+                    f"重试 {job.attempt + 1}/{context.max_attempts}"
+                )
+                return False
+        
+        if context.mode == "row":
+            base_name = f"文档_{job.index + 1:04d}.docx"
+        else:
+            base_name = f"{'AI标题文档' if context.use_ai_titles else '混排文档'}_{job.index + 1:04d}.docx"
+        
+        job.filename = base_name
+        if not self.quality_checker:
+            return True
+        
+        # 创建文档指纹并检查质量（报告在文档写入成功后由报告阶段记录）
+        fingerprint = self.quality_checker.create_fingerprint(job.cells)
+        job.score = score = self.quality_checker.check_quality(fingerprint, job.full_text, cells=job.cells, label=base_name)
+        job.filename = f"[{score.rating}]_{base_name}"
+        if trace_counters.sampled("score.checked"):
+            logger.debug(
+                "质量检查样例 {}: 重复率={:.2%}, 评级={}, 对比数={}, SEO密度={:.2%}",
+                base_name, score.max_similarity, score.rating, score.compared_count, score.keyword_density
+            )
+        return True
+    
+    @staticmethod
+    def _create_deduplicator(config: ProfileConfig):
+        """创建历史查重器"""
+        from ..database.db_manager import DatabaseManager
+        from ..database.fingerprint_manager import FingerprintManager
+        from .simhash_deduplicator import ContentDeduplicator
+        
+        dedup_config = {
+            'enabled': True,
+            'max_distance': config.get_dedup_max_distance(),
+            'max_retries': config.dedup_max_retries,
+            'retention_days': config.dedup_retention_days,
+        }
+        logger.info(f"✓ 历史查重已启用: 相似度阈值 {config.dedup_similarity_threshold*100:.0f}%, 最大重试 {config.dedup_max_retries} 次")
+        return ContentDeduplicator(FingerprintManager(DatabaseManager()), dedup_config)
+
+
+class BuildStage(GenerationStage):
+    """构建 docx：段落样式、加粗关键词、列图片、对比表"""
+    
+    name = "build"
+    
+    def setup(self, context: GenerationContext):
+        self.config = context.config
+        self.plan = context.plan
+        
+        # 模板只检查一次（None 表示使用空白文档）
+        template_path = self.config.template_path
+        self.template_path = template_path if template_path and os.path.exists(template_path) else None
+        if self.template_path:
+            logger.info(f"基于模板创建 Word: {self.template_path}")
+        
+        # 对比表管理器在首次使用时创建，整批共用
+        self._comparison_db = None
+        self._comparison_generator = None
+    
+    def process(self, job: DocumentJob, context: GenerationContext) -> bool:
+        doc = Document(self.template_path)
+        
+        for block in job.blocks:
+            for para_text in block.paragraphs:
+                self._add_styled_paragraph(doc, para_text, block.col_type)
+            
+            # 插入该列的图片（如果有）- 在该列所有段落之后
+            if block.insert_image:
+                with context.profiler.span("build.image"):
+                    self._insert_column_image(doc, block.col_idx, job.rng)
+            
+            # 检查是否需要插入对比表图片
+            if block.check_comparison:
+                with context.profiler.span("build.comparison"):
+                    self._check_and_insert_comparison_table(doc, block.col_idx, block.content, job.cells, job.rng)
+        
+        job.doc = doc
+        return True
+    
+    def _add_styled_paragraph(self, doc, text: str, col_type: str):
+        """
+        按列类型添加段落并应用样式
+        
+        Args:
+            doc: Document 对象
+            text: 段落文本
+            col_type: 列类型
+        """
+        if col_type in ('H1', 'H2', 'H3', 'H4'):
+            p = doc.add_paragraph(text)
+            self._apply_heading_style(p, level=int(col_type[1]))
+        elif col_type == 'List':
+            p = doc.add_paragraph(text, style='List Bullet')
+            self._apply_body_style(p)
+        elif col_type == 'Body':
+            p = doc.add_paragraph(text)
+            self._apply_body_style(p)
+        else:
+            return
+        
+        # 应用加粗关键词
+        if col_type in ['Body', 'List'] and self.plan.bold_matcher:
+            self._apply_bold_keywords(p, self.plan.bold_matcher)
+    
+    def _insert_column_image(self, doc, col_idx: int, rng=None):
+        """为指定列插入随机图片
+        
+        Args:
+            doc: Document对象
+            col_idx: 列索引
+            rng: 本文档的随机数生成器（None 时使用全局 random）
+        """
+        from PIL import Image
+        
+        # 检查该列是否有图片组
+        image_paths = self.plan.images(col_idx)
+        if not image_paths:
+            return
+        
+        # 随机选择一张图片
+        img_path = (rng or random).choice(image_paths)
+        img_file = Path(img_path)
+        
+        if not img_file.exists():
+            logger.warning(f"图片文件不存在: {img_path}")
+            return
+        
+        try:
+            # 添加图片段落
+            paragraph = doc.add_paragraph()
+            paragraph.alignment = 1  # 居中对齐
+            run = paragraph.add_run()
+            
+            # 获取图片原始尺寸
+            with Image.open(str(img_file)) as img:
+                img_width, img_height = img.size
+                aspect_ratio = img_height / img_width
+            
+            # Word A4 文档可用宽度约为 16cm（左右边距各2.54cm，总宽21cm）
+            # 设置图片宽度为可用宽度的 90%，即 14.4cm
+            max_width = Cm(14.4)
+            
+            # 插入图片，自动按比例调整高度
+            picture = run.add_picture(str(img_file), width=max_width)
+            
+            # 提取文件名（去掉后缀）作为 Alt Text
+            alt_text = img_file.stem
+            
+            # 设置图片的 Alt Text（替代文本），这是 SEO 的关键部分
+            docPr = picture._inline.docPr
+            docPr.set('descr', alt_text)  # 设置描述（Alt Text）
+            docPr.set('title', alt_text)  # 同时设置标题
+            
+            trace_counters.count("build.image")
+            logger.debug("列 {} 插入图片: {}, Alt Text: {}, 宽度: 14.4cm", col_idx + 1, img_file.name, alt_text)
+        
+        except Exception as e:
+            logger.error(f"插入图片失败: {img_path}, 错误: {e}")
+    
+    def _check_and_insert_comparison_table(self, doc, col_idx: int, current_content: str, row_data: list, rng=None):
+        """检查并插入对比表图片（支持多任务）
+        
+        Args:
+            doc: Document对象
+            col_idx: 列索引
+            current_content: 当前列的内容
+            row_data: 整行数据（用于提取品牌）
+            rng: 本文档的随机数生成器
+        """
+        try:
+            # 初始化管理器（整批共用）
+            if self._comparison_db is None:
+                from .comparison_image_generator import ComparisonTableImageGenerator
+                from ..database.comparison_db_manager import ComparisonDBManager
+                self._comparison_db = ComparisonDBManager()
+                self._comparison_generator = ComparisonTableImageGenerator()
+            
+            comparison_db = self._comparison_db
+            comparison_generator = self._comparison_generator
+            
+            # 加载全局配置
+            global_config = comparison_db.get_config('insert_strategy')
+            if not global_config:
+                logger.debug("未找到全局配置")
+                return
+            
+            # 获取所有类目
+            categories = comparison_db.get_all_categories()
+            if not categories:
+                logger.warning("未找到对比表类目")
+                return
+            
+            # 使用第一个类目
+            category = categories[0]
+            
+            # 获取该类目下的所有任务（按排序）
+            tasks = comparison_db.get_tasks_by_category(category.id)
+            if not tasks:
+                logger.debug("该类目下没有任务")
+                return
+            
+            # 提取文章中的品牌（所有任务共用）
+            full_text = " ".join([str(c) for c in row_data if c])
+            mentioned_brands = self._extract_mentioned_brands(comparison_db, full_text)
+            
+            # 遍历所有任务，检查是否需要插入
+            for task in tasks:
+                should_insert = False
+                insert_reason = ""
+                
+                # 判断是否需要插入
+                if task.insert_mode == 'column':
+                    # 按列插入
+                    if col_idx == task.insert_column - 1:
+                        should_insert = True
+                        insert_reason = f"任务'{task.task_name}': 按列插入（列{col_idx}）"
+                
+                elif task.insert_mode == 'anchor':
+                    # 智能锚点
+                    if task.insert_anchor_text and task.insert_anchor_text in current_content:
+                        should_insert = True
+                        insert_reason = f"任务'{task.task_name}': 锚点匹配（'{task.insert_anchor_text}'）"
+                
+                if not should_insert:
+                    continue
+                
+                logger.info(f"✓ 触发对比表插入: {insert_reason}")
+                
+                # 获取任务的参数选择
+                selected_param_ids = comparison_db.get_task_parameters(task.id)
+                if not selected_param_ids:
+                    logger.warning(f"任务'{task.task_name}'未选择任何参数，跳过")
+                    continue
+                
+                # 获取任务的样式配置
+                style_config = task.get_style_dict()
+                if not style_config:
+                    # 使用默认样式
+                    style_config = {
+                        'header_bg_color': '#4472C4',
+                        'header_text_color': '#FFFFFF',
+                        'own_brand_bg_color': '#FFF2CC',
+                        'border_width': 1.5,
+                        'image_width': 15,
+                        'dpi': 300,
+                        'font_name': 'Microsoft YaHei',
+                        'font_size': 10
+                    }
+                
+                # 生成图片
+                image_path = comparison_generator.generate_from_category(
+                    db_manager=comparison_db,
+                    category_id=category.id,
+                    mentioned_brands=mentioned_brands,
+                    style_config=style_config,
+                    insert_config=global_config,
+                    selected_parameter_ids=selected_param_ids,
+                    rng=rng
+                )
+                
+                # 插入图片
+                if image_path and os.path.exists(image_path):
+                    paragraph = doc.add_paragraph()
+                    run = paragraph.add_run()
+                    
+                    image_width = style_config.get('image_width', 15)
+                    run.add_picture(image_path, width=Inches(image_width / 2.54))
+                    
+                    paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+                    logger.info(f"✓ 对比表图片已插入: {task.task_name}")
+                else:
+                    logger.warning(f"对比表图片生成失败: {task.task_name}")
+        
+        except ImportError as e:
+            logger.debug(f"对比表功能不可用: {e}")
+        except Exception as e:
+            logger.error(f"插入对比表失败: {e}")
+            import traceback
+            logger.error(traceback.format_exc())
+    
+    def _extract_mentioned_brands(self, comparison_db, text: str) -> list:
+        """提取文章中提及的品牌（仅完整匹配）
+        
+        Args:
+            comparison_db: 数据库管理器
+            text: 文档文本
+        
+        Returns:
+            品牌名称列表
+        """
+        mentioned_brands = []
+        
+        categories = comparison_db.get_all_categories()
+        for category in categories:
+            brands = comparison_db.get_brands_by_category(category.id)
+            for brand in brands:
+                brand_name = brand.name
+                
+                # 仅完整匹配（精确匹配完整品牌名）
+                if brand_name in text:
+                    mentioned_brands.append(brand_name)
+                    logger.trace("品牌完整匹配: {}", brand_name)
+        
+        logger.debug("识别到的品牌: {}", mentioned_brands if mentioned_brands else '无')
+        return mentioned_brands
+    
+    def _apply_heading_style(self, paragraph, level: int):
+        """应用标题样式
+        
+        Args:
+            paragraph: 段落对象
+            level: 标题级别 (1-4)
+        """
+        # 字号映射（中国公文标准）
+        font_sizes = {
+            1: 24,  # 小一号
+            2: 18,  # 小二号
+            3: 16,  # 小三号
+            4: 14   # 四号
+        }
+        
+        font_size = font_sizes.get(level, 16)
+        
+        # 设置段落格式
+        paragraph_format = paragraph.paragraph_format
+        paragraph_format.line_spacing = 1.5  # 1.5倍行距
+        paragraph_format.space_after = Pt(10)  # 段后10pt
+        
+        # 如果段落为空，添加一个run
+        if not paragraph.runs:
+            paragraph.add_run()
+        
+        # 对每个run应用样式
+        for run in paragraph.runs:
+            run.font.name = 'Microsoft YaHei'
+            run.font.size = Pt(font_size)
+            run.font.bold = True
+            run.font.color.rgb = RGBColor(0, 0, 0)  # 黑色
+            
+            # 强制设置中文字体
+            run._element.rPr.rFonts.set(qn('w:eastAsia'), 'Microsoft YaHei')
+    
+    def _apply_body_style(self, paragraph):
+        """应用正文样式"""
+        # 设置段落格式
+        paragraph_format = paragraph.paragraph_format
+        paragraph_format.line_spacing = 1.5  # 1.5倍行距
+        paragraph_format.space_after = Pt(10)  # 段后10pt
+        
+        # 如果段落为空，添加一个run
+        if not paragraph.runs:
+            paragraph.add_run()
+        
+        # 对每个run应用样式
+        for run in paragraph.runs:
+            run.font.name = 'Microsoft YaHei'
+            run.font.size = Pt(12)  # 小四号
+            run.font.bold = False
+            run.font.color.rgb = RGBColor(0, 0, 0)  # 黑色
+            
+            # 强制设置中文字体
+            run._element.rPr.rFonts.set(qn('w:eastAsia'), 'Microsoft YaHei')
+    
+    def _apply_bold_keywords(self, paragraph, matcher: KeywordMatcher):
+        """应用加粗关键词
+        
+        Args:
+            paragraph: 段落对象
+            matcher: 加粗关键词匹配器（来自生成计划）
+        """
+        if not matcher or not paragraph.text:
+            return
+        
+        # 获取原始文本
+        original_text = paragraph.text
+        
+        # 清空段落的所有runs
+        for run in paragraph.runs:
+            run.text = ''
+        
+        # 重新构建段落，对关键词加粗（一次扫描找出所有不重叠的命中）
+        current_pos = 0
+        for start, end in matcher.finditer(original_text):
+            # 添加关键词之前的普通文本
+            if start > current_pos:
+                self._add_body_run(paragraph, original_text[current_pos:start])
+            
+            # 添加加粗的关键词
+            self._add_body_run(paragraph, original_text[start:end], bold=True)
+            current_pos = end
+        
+        # 添加剩余的普通文本
+        if current_pos < len(original_text):
+            self._add_body_run(paragraph, original_text[current_pos:])
+    
+    @staticmethod
+    def _add_body_run(paragraph, text: str, bold: bool = False):
+        """添加一个正文格式的 run"""
+        run = paragraph.add_run(text)
+        run.font.name = 'Microsoft YaHei'
+        run.font.size = Pt(12)
+        if bold:
+            run.font.bold = True
+        run.font.color.rgb = RGBColor(0, 0, 0)
+        run._element.rPr.rFonts.set(qn('w:eastAsia'), 'Microsoft YaHei')
+
+
+class WriteStage(GenerationStage):
+    """写入：保存 docx，并把通过查重的内容指纹和用到的内容写入历史库"""
+    
+    name = "write"
+    
+    def setup(self, context: GenerationContext):
+        Path(context.save_dir).mkdir(parents=True, exist_ok=True)
+        self.project_name = context.config.get_dedup_project_name() or "default"
+    
+    def process(self, job: DocumentJob, context: GenerationContext) -> bool:
+        filepath = Path(context.save_dir) / job.filename
+        with context.profiler.span("write.save"):
+            job.doc.save(str(filepath))
+        context.generated_files.append(str(filepath))
+        
+        # 保存成功后，将指纹写入数据库
+        if context.deduplicator:
+            with context.profiler.span("write.fingerprint"):
+                context.deduplicator.add_content_fingerprint(
+                    text=job.full_text,
+                    source_project=self.project_name,
+                    document_path=job.filename,
+                    fingerprint=job.fingerprint
+                )
+        
+        # 只统计实际写出的文档：查重拒绝的尝试不计入使用次数
+        if context.usage_rotation:
+            context.usage_rotation.record(job.row)
+        return True
+
+
+class ReportStage(GenerationStage):
+    """质量报告：文档写入成功后逐条追加（缓冲写入、定期落盘），可选输出列式明细"""
+    
+    name = "report"
+    
+    # 每多少篇文档落盘一次
+    FLUSH_EVERY = 50
+    
+    def setup(self, context: GenerationContext):
+        config = context.config
+        self.report = None
+        self._simhash_engine = None
+        if not (config.quality_check_enabled and config.quality_generate_report):
+            return
+        
+        detail_sink = create_detail_sink(config.quality_report_details, context.output_path("quality_report", ""))
+        self.report = QualityReport(
+            output_path=context.output_path("quality_report", ".csv"),
+            flush_every=self.FLUSH_EVERY,
+            detail_sink=detail_sink
+        )
+        if detail_sink is not None:
+            # 明细包含各阶段耗时与 SimHash（未启用历史查重时在这里计算）
+            context.collect_timings = True
+            from .simhash_deduplicator import SimHashEngine
+            self._simhash_engine = SimHashEngine()
+    
+    def process(self, job: DocumentJob, context: GenerationContext) -> bool:
+        if self.report is None or job.score is None:
+            return True
+        
+        score = job.score
+        details = None
+        if self.report.detail_sink is not None:
+            if job.fingerprint:
+                simhash = job.fingerprint[0]
+            else:
+                simhash = self._simhash_engine.calculate_simhash(job.full_text)
+            details = {
+                "simhash": f"{simhash:016x}",
+                "matched_document": score.matched_document,
+                "attempt": job.attempt,
+                **{f"{stage}_ms": seconds * 1000 for stage, seconds in job.timings.items()}
+            }
+        
+        self.report.add_record(
+            filename=job.filename,
+            title=job.title[:50],  # 限制长度
+            max_similarity=score.max_similarity,
+            rating=score.rating,
+            timestamp=datetime.now(),
+            keyword_density=score.keyword_density,
+            density_rating=score.density_rating,
+            seo_suggestion=score.seo_suggestion,
+            details=details
+        )
+        return True
+    
+    def finish(self, context: GenerationContext):
+        if self.report is None:
+            return
+        
+        self.report.close()
+        
+        # 统计信息
+        stats = self.report.get_statistics()
+        logger.info(f"查重统计: 优质={stats['查重_优质']}, 中等={stats['查重_中等']}, 高重复={stats['查重_高重复']}")
+        if context.config.seo_check_enabled and context.config.target_keywords:
+            logger.info(f"SEO统计: 完美={stats['SEO_完美']}, 不足={stats['SEO_不足']}, 堆砌={stats['SEO_堆砌']}")
+
+
+# 默认阶段顺序
+DEFAULT_STAGES = (PlanStage, MaterialiseStage, NumberingStage, ScoreStage, BuildStage, WriteStage, ReportStage)
@@ -1,11 +1,15 @@
 """
 文档生成工作线程
 用于在后台执行文档生成任务，避免阻塞UI
+
+线程本身只负责把生成引擎的进度转发为 Qt 信号，生成逻辑全部在 GenerationEngine 中。
 """
 
 from PyQt6.QtCore import QThread, pyqtSignal
 from loguru import logger
-from typing import List
+from typing import List, Optional, Sequence
+
+from .generation_engine import GenerationEngine
 
 
 class GenerationWorker(QThread):
@@ -19,33 +23,39 @@ class GenerationWorker(QThread):
     
     def __init__(
         self,
-        grid_data: List[List[str]],
+        grid_data: Sequence[List[str]],
         save_dir: str,
         mode: str,
         count: int,
-        config,
-        generate_func,
-        parent=None
+        engine: GenerationEngine,
+        title_queue: Optional[List[str]] = None,
+        title_format: str = "H1",
+        parent=None,
+        columns_data: Optional[List[List[str]]] = None
     ):
         """
         初始化工作线程
         
         Args:
-            grid_data: 网格数据
+            grid_data: 网格数据（按行，可以是工作区快照的只读行序列）
             save_dir: 保存目录
             mode: 生成模式 ("row" 或 "shuffle")
             count: 生成数量
-            config: 配置对象
-            generate_func: 生成函数引用
+            engine: 生成引擎
+            title_queue: AI 标题队列（混排模式）
+            title_format: AI 标题使用的列格式
             parent: 父对象
+            columns_data: 可选，按列组织的有效内容（工作区快照已缓存，省去按行转置）
         """
         super().__init__(parent)
         self.grid_data = grid_data
+        self.columns_data = columns_data
         self.save_dir = save_dir
         self.mode = mode
         self.count = count
-        self.config = config
-        self.generate_func = generate_func
+        self.engine = engine
+        self.title_queue = title_queue
+        self.title_format = title_format
         self._is_cancelled = False
         
         logger.debug(f"GenerationWorker初始化: mode={mode}, count={count}")
@@ -56,25 +66,28 @@ class GenerationWorker(QThread):
             self.status_changed.emit("正在初始化...")
             logger.info(f"开始生成文档: mode={self.mode}, count={self.count}")
             
-            # 调用生成函数（带进度回调）
-            generated_count = self.generate_func(
+            # 调用生成引擎（带进度回调）
+            generated_count = self.engine.generate(
                 grid_data=self.grid_data,
                 save_dir=self.save_dir,
                 mode=self.mode,
                 count=self.count,
-                progress_callback=self._on_progress
+                progress_callback=self._on_progress,
+                title_queue=self.title_queue,
+                title_format=self.title_format,
+                columns_data=self.columns_data
             )
             
-            if self._is_cancelled:
-                self.generation_complete.emit(False, "生成已取消", 0)
-                logger.info("生成任务被取消")
-            else:
-                self.generation_complete.emit(
-                    True,
-                    f"成功生成 {generated_count} 个文档",
-                    generated_count
-                )
-                logger.info(f"生成任务完成: {generated_count} 个文档")
+            self.generation_complete.emit(
+                True,
+                f"成功生成 {generated_count} 个文档",
+                generated_count
+            )
+            logger.info(f"生成任务完成: {generated_count} 个文档")
+        
+        except InterruptedError:
+            self.generation_complete.emit(False, "生成已取消", len(self.engine.generated_files))
+            logger.info("生成任务被取消")
         
         except Exception as e:
             error_msg = f"生成失败: {str(e)}"
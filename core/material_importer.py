@@ -0,0 +1,451 @@
+"""
+素材批量导入
+从 Excel / CSV / 文件夹（.docx / .txt）流式读取素材，按批处理：
+1. MD5 精确查重：与素材库（idx_content_hash 索引）及本次已导入内容完全相同的跳过
+2. 在进程池中为剩余素材计算 SimHash（数据量小或单核时在当前进程计算）
+3. SimHash 近似查重：与素材库或本次已导入内容海明距离不超过阈值的仍然导入，
+   但加上"近似重复"标签并记入导入结果，便于人工复核
+4. 剩余素材每批一个事务 executemany 写入
+
+SimHash 随素材一起入库（materials.simhash），旧素材缺少指纹时在第一次批量导入时补算。
+"""
+
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from loguru import logger
+
+from .simhash_deduplicator import SimHashEngine, SimHashIndex, similarity_to_distance
+from ..database.db_manager import DatabaseManager
+from ..database.models import Material
+
+
+# 每批读取、查重、写入（一个事务）的素材条数
+IMPORT_BATCH_SIZE = 5000
+# 提交给进程池的每个任务包含的素材条数
+SIMHASH_CHUNK_SIZE = 1000
+# 近似重复的相似度阈值（64 位指纹下约等于海明距离 3）
+NEAR_DUPLICATE_SIMILARITY = 0.95
+# 未指定分类且无法从文件推断时使用的分类
+DEFAULT_CATEGORY = "导入素材"
+# 近似重复素材追加的标签
+NEAR_DUPLICATE_TAG = "近似重复"
+# 导入结果中保留的近似重复明细条数（全部计数，只保留前若干条明细供界面展示）
+NEAR_DUPLICATE_SAMPLES = 200
+
+TABLE_SUFFIXES = (".xlsx", ".xlsm", ".csv")
+TEXT_SUFFIXES = (".docx", ".txt")
+
+# 表头别名（不区分英文大小写）
+HEADER_ALIASES = {
+    "category": ("分类", "类别", "分类名称", "category"),
+    "content": ("内容", "素材", "文本", "素材内容", "content", "text"),
+    "tags": ("标签", "tags", "tag"),
+}
+
+MaterialRow = Tuple[str, str, Optional[str]]  # (分类, 内容, 标签)
+ProgressCallback = Callable[[int, str], None]
+
+
+@dataclass
+class NearDuplicate:
+    """一条近似重复素材"""
+    
+    category: str
+    content: str
+    matched_id: Optional[int]  # 素材库中最相似素材的 ID（与本次导入的另一条相似时为 None）
+    distance: int  # 海明距离
+
+
+@dataclass
+class ImportResult:
+    """批量导入结果"""
+    
+    total: int = 0  # 读取到的有效素材条数
+    inserted: int = 0  # 写入条数（含近似重复）
+    exact_duplicates: int = 0  # 内容完全相同而跳过的条数
+    near_duplicate_count: int = 0  # 标记为近似重复的条数
+    near_duplicates: List[NearDuplicate] = field(default_factory=list)  # 近似重复明细（前若干条）
+    failed: int = 0  # 写入失败的条数
+    elapsed: float = 0.0  # 耗时（秒）
+    
+    def summary(self) -> str:
+        """一行文字摘要"""
+        return (
+            f"读取 {self.total} 条，导入 {self.inserted} 条，跳过重复 {self.exact_duplicates} 条，"
+            f"近似重复 {self.near_duplicate_count} 条"
+            + (f"，失败 {self.failed} 条" if self.failed else "")
+            + f"，耗时 {self.elapsed:.1f} 秒"
+        )
+
+
+# ==================== 读取 ====================
+
+def _cell_text(value) -> str:
+    """单元格值转文本（空值为空字符串）"""
+    return "" if value is None else str(value).strip()
+
+
+def _header_columns(cells: Sequence[str]) -> Optional[Dict[str, int]]:
+    """
+    识别表头
+    
+    Args:
+        cells: 第一行各单元格文本
+    
+    Returns:
+        {"category"/"content"/"tags": 列索引}；不是表头（没有内容列）时返回 None
+    """
+    columns = {}
+    for col_idx, cell in enumerate(cells):
+        name = cell.lower()
+        for key, aliases in HEADER_ALIASES.items():
+            if key not in columns and name in aliases:
+                columns[key] = col_idx
+    return columns if "content" in columns else None
+
+
+def iter_table_rows(rows: Iterable[Sequence], default_category: str) -> Iterator[MaterialRow]:
+    """
+    把表格行转为素材
+    
+    首行能识别出"内容"列时按表头取列；否则没有表头，单列表格整列为内容，
+    多列表格按 分类、内容、标签 的顺序取前三列。
+    
+    Args:
+        rows: 表格行（单元格值序列）
+        default_category: 没有分类列或分类为空时使用的分类
+    
+    Yields:
+        (分类, 内容, 标签)
+    """
+    columns = None
+    for row in rows:
+        cells = [_cell_text(value) for value in row]
+        if not any(cells):
+            continue
+        
+        if columns is None:
+            columns = _header_columns(cells)
+            if columns is not None:
+                continue
+            columns = {"content": 0} if len(cells) == 1 else {"category": 0, "content": 1, "tags": 2}
+        
+        def get(key: str) -> str:
+            col_idx = columns.get(key)
+            return cells[col_idx] if col_idx is not None and col_idx < len(cells) else ""
+        
+        content = get("content")
+        if content:
+            yield get("category") or default_category, content, get("tags") or None
+
+
+def iter_excel_rows(file_path: str) -> Iterator[MaterialRow]:
+    """
+    流式读取 Excel（openpyxl 只读模式，不把整个工作簿载入内存）
+    
+    工作簿有多个工作表时，没有分类列的工作表以工作表名为分类；否则以文件名为分类。
+    """
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        worksheets = workbook.worksheets
+        for worksheet in worksheets:
+            default_category = worksheet.title if len(worksheets) > 1 else Path(file_path).stem
+            yield from iter_table_rows(worksheet.iter_rows(values_only=True), default_category)
+    finally:
+        workbook.close()
+
+
+def iter_csv_rows(file_path: str) -> Iterator[MaterialRow]:
+    """流式读取 CSV（兼容带 BOM 的 UTF-8，没有分类列时以文件名为分类）"""
+    with open(file_path, encoding="utf-8-sig", newline="") as f:
+        yield from iter_table_rows(csv.reader(f), Path(file_path).stem)
+
+
+def _split_paragraphs(lines: Iterable[str]) -> Iterator[str]:
+    """按空行把文本切分为素材（连续的非空行合并为一条）"""
+    block = []
+    for line in lines:
+        line = line.strip()
+        if line:
+            block.append(line)
+        elif block:
+            yield "\n".join(block)
+            block = []
+    if block:
+        yield "\n".join(block)
+
+
+def _read_text_lines(file_path: Path) -> List[str]:
+    """读取 .txt / .docx 的文本行（docx 每个段落一行）"""
+    if file_path.suffix.lower() == ".docx":
+        from docx import Document
+        return [paragraph.text for paragraph in Document(str(file_path)).paragraphs]
+    
+    for encoding in ("utf-8-sig", "gb18030"):
+        try:
+            return file_path.read_text(encoding=encoding).splitlines()
+        except UnicodeDecodeError:
+            continue
+    raise ValueError(f"无法识别文件编码: {file_path}")
+
+
+def iter_folder_rows(folder_path: str) -> Iterator[MaterialRow]:
+    """
+    读取文件夹（含子文件夹）中的 .docx / .txt，按空行切分为素材，
+    以文件所在文件夹名为分类
+    """
+    root = Path(folder_path)
+    for file_path in sorted(root.rglob("*")):
+        if file_path.suffix.lower() not in TEXT_SUFFIXES or file_path.name.startswith("~$"):
+            continue
+        try:
+            lines = _read_text_lines(file_path)
+        except Exception as e:
+            logger.warning(f"读取文件失败，已跳过: {file_path} ({e})")
+            continue
+        category = file_path.parent.name or DEFAULT_CATEGORY
+        for content in _split_paragraphs(lines):
+            yield category, content, None
+
+
+def iter_material_rows(path: str) -> Iterator[MaterialRow]:
+    """
+    按路径类型选择读取方式
+    
+    Args:
+        path: Excel / CSV 文件，或包含 .docx / .txt 的文件夹，或单个 .docx / .txt 文件
+    
+    Yields:
+        (分类, 内容, 标签)
+    """
+    file_path = Path(path)
+    if file_path.is_dir():
+        yield from iter_folder_rows(path)
+        return
+    
+    suffix = file_path.suffix.lower()
+    if suffix == ".csv":
+        yield from iter_csv_rows(path)
+    elif suffix in TABLE_SUFFIXES:
+        yield from iter_excel_rows(path)
+    elif suffix in TEXT_SUFFIXES:
+        for content in _split_paragraphs(_read_text_lines(file_path)):
+            yield file_path.parent.name or DEFAULT_CATEGORY, content, None
+    else:
+        raise ValueError(f"不支持的文件类型: {path}")
+
+
+def _batched(items: Iterable, size: int) -> Iterator[List]:
+    """按固定大小分批"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ==================== 指纹 ====================
+
+_engine = SimHashEngine()
+
+
+def simhash_texts(texts: Sequence[str]) -> List[int]:
+    """
+    计算一组文本的 SimHash（进程池任务，必须是模块级函数）
+    
+    Args:
+        texts: 文本列表
+    
+    Returns:
+        SimHash 整数列表
+    """
+    return _engine.calculate_simhashes(texts)
+
+
+# ==================== 导入 ====================
+
+class MaterialImporter:
+    """素材批量导入器"""
+    
+    def __init__(self, db_manager: DatabaseManager, similarity_threshold: float = NEAR_DUPLICATE_SIMILARITY,
+                 max_workers: Optional[int] = None, batch_size: int = IMPORT_BATCH_SIZE):
+        """
+        Args:
+            db_manager: 数据库管理器
+            similarity_threshold: 近似重复的相似度阈值
+            max_workers: 计算指纹的进程数（默认 CPU 核数 - 1，最多 4；不足 1 时在当前进程计算）
+            batch_size: 每批处理（一个事务）的素材条数
+        """
+        self.db_manager = db_manager
+        self.max_distance = similarity_to_distance(similarity_threshold)
+        if max_workers is None:
+            max_workers = min(4, (os.cpu_count() or 1) - 1)
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+    
+    def import_path(self, path: str, progress: ProgressCallback = None,
+                    cancelled: Callable[[], bool] = None) -> ImportResult:
+        """
+        导入 Excel / CSV 文件或文件夹
+        
+        Args:
+            path: 文件或文件夹路径
+            progress: 进度回调 (已处理条数, 说明)
+            cancelled: 取消检查函数，返回 True 时在当前批次完成后停止
+        
+        Returns:
+            ImportResult
+        """
+        return self.import_rows(iter_material_rows(path), progress, cancelled)
+    
+    def import_rows(self, rows: Iterable[MaterialRow], progress: ProgressCallback = None,
+                    cancelled: Callable[[], bool] = None) -> ImportResult:
+        """
+        导入素材行
+        
+        Args:
+            rows: (分类, 内容, 标签) 迭代器
+            progress: 进度回调 (已处理条数, 说明)
+            cancelled: 取消检查函数，返回 True 时在当前批次完成后停止
+        
+        Returns:
+            ImportResult
+        """
+        start = time.perf_counter()
+        result = ImportResult()
+        try:
+            if progress:
+                progress(0, "正在加载素材库指纹...")
+            index = self._load_library_index()
+            seen_hashes = set()
+            
+            for batch in _batched(rows, self.batch_size):
+                self._import_batch(batch, index, seen_hashes, result)
+                if progress:
+                    progress(result.total, f"已处理 {result.total} 条，导入 {result.inserted} 条")
+                if cancelled and cancelled():
+                    logger.info("批量导入已取消")
+                    break
+        finally:
+            self._shutdown_executor()
+        
+        result.elapsed = time.perf_counter() - start
+        logger.info(f"素材批量导入完成: {result.summary()}")
+        return result
+    
+    def _simhashes(self, texts: List[str]) -> List[int]:
+        """计算一批文本的 SimHash（批次够大且有多个核心时使用进程池）"""
+        if self.max_workers < 1 or len(texts) <= SIMHASH_CHUNK_SIZE:
+            return simhash_texts(texts)
+        
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        chunks = [texts[i:i + SIMHASH_CHUNK_SIZE] for i in range(0, len(texts), SIMHASH_CHUNK_SIZE)]
+        return [simhash for chunk in self._executor.map(simhash_texts, chunks) for simhash in chunk]
+    
+    def _shutdown_executor(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+    
+    def _load_library_index(self) -> SimHashIndex:
+        """读取素材库已有的 SimHash 建立近似查找索引（缺少指纹的素材补算并写回）"""
+        index = SimHashIndex(self.max_distance)
+        missing: List[Tuple[int, str]] = []
+        
+        def backfill():
+            simhashes = self._simhashes([content for _, content in missing])
+            updates = []
+            for (material_id, _), simhash in zip(missing, simhashes):
+                if simhash:
+                    index.add(simhash, material_id)
+                updates.append((material_id, str(simhash)))
+            self.db_manager.update_material_simhashes(updates)
+            missing.clear()
+        
+        backfilled = 0
+        for material_id, simhash, content in self.db_manager.iter_material_simhashes():
+            if simhash is not None:
+                if simhash != "0":
+                    index.add(int(simhash), material_id)
+                continue
+            missing.append((material_id, content))
+            if len(missing) >= self.batch_size:
+                backfilled += len(missing)
+                backfill()
+        if missing:
+            backfilled += len(missing)
+            backfill()
+        
+        if backfilled:
+            logger.info(f"已为 {backfilled} 条旧素材补算 SimHash")
+        return index
+    
+    def _import_batch(self, batch: List[MaterialRow], index: SimHashIndex, seen_hashes: set,
+                      result: ImportResult):
+        """
+        查重并写入一批素材
+        
+        本批的 MD5 和 SimHash 先记在批内，写入成功后才并入 seen_hashes 和素材库索引，
+        写入失败时后续批次不会把没有入库的素材当作已存在。
+        """
+        result.total += len(batch)
+        
+        # 精确查重（MD5 很快，在当前进程计算）
+        content_hashes = [Material._generate_hash(content) for _, content, _ in batch]
+        existing = self.db_manager.find_existing_hashes(set(content_hashes))
+        batch_hashes = set()
+        unique = []
+        for row, content_hash in zip(batch, content_hashes):
+            if content_hash in existing or content_hash in seen_hashes or content_hash in batch_hashes:
+                result.exact_duplicates += 1
+                continue
+            batch_hashes.add(content_hash)
+            unique.append((row, content_hash))
+        
+        # 近似查重（只为精确查重后剩下的素材计算 SimHash）
+        simhashes = self._simhashes([content for (_, content, _), _ in unique])
+        batch_index = SimHashIndex(self.max_distance)
+        survivors = []
+        for ((category, content, tags), content_hash), simhash in zip(unique, simhashes):
+            match = None
+            if simhash:
+                # 距离相同时优先报告素材库中的已有素材
+                matches = [m for m in (index.find(simhash), batch_index.find(simhash)) if m is not None]
+                match = min(matches, key=lambda m: m[1], default=None)
+            if match is not None:
+                matched_id, distance = match
+                result.near_duplicate_count += 1
+                if len(result.near_duplicates) < NEAR_DUPLICATE_SAMPLES:
+                    result.near_duplicates.append(NearDuplicate(category, content, matched_id, distance))
+                tags = f"{tags},{NEAR_DUPLICATE_TAG}" if tags else NEAR_DUPLICATE_TAG
+            if simhash:
+                # 本次导入的素材还没有 ID，后续与它相似的素材记为 matched_id=None
+                batch_index.add(simhash, None)
+            
+            survivors.append({
+                "category": category, "content": content, "tags": tags,
+                "content_hash": content_hash, "simhash": str(simhash),
+            })
+        
+        inserted = self.db_manager.bulk_insert_materials(survivors)
+        result.inserted += inserted
+        result.failed += len(survivors) - inserted
+        
+        # 批量插入在一个事务中完成（全部成功或全部失败）
+        if survivors and inserted == len(survivors):
+            seen_hashes.update(batch_hashes)
+            for simhash in simhashes:
+                if simhash:
+                    index.add(simhash, None)
@@ -2,12 +2,24 @@
 内容质量检查器
 基于 Jaccard 相似度的查重和评分系统
 """
-from typing import List, Set, Tuple, Dict
+import csv
+import re
+from collections import Counter
+from typing import List, Optional, Set, Tuple, Dict
 from dataclasses import dataclass
 from datetime import datetime
 from loguru import logger
 
 
+# 字数统计时忽略的标点符号和空白字符
+_IGNORED_CHARS_RE = re.compile(r'[，。！？、；："（）《》【】\s]+')
+_CHINESE_CHAR_RE = re.compile(r'[\u4e00-\u9fff]')
+_ENGLISH_WORD_RE = re.compile(r'[a-zA-Z]+')
+
+# 生成流程中全文由各列内容以换行连接
+CELL_SEPARATOR = "\n"
+
+
 @dataclass
 class QualityScore:
     """质量评分结果"""
@@ -15,6 +27,7 @@ class QualityScore:
     rating: str  # 评级：优质/中等/高重复
     rating_en: str  # 英文评级：Premium/Standard/Repetitive
     compared_count: int  # 对比文档数量
+    matched_document: str = ""  # 重复率最高的批内文档（没有对比对象时为空）
     
     # SEO 密度评分
     keyword_density: float = 0.0  # 关键词密度（0-1）
@@ -22,9 +35,61 @@ class QualityScore:
     seo_suggestion: str = ""  # SEO 建议
 
 
+class TextStats:
+    """
+    一段文本的字数与关键词统计
+    
+    忽略标点和空白后，中文字数、英文单词数、关键词次数都可以按段相加：
+    唯一的例外是前一段以英文字母结尾、后一段以英文字母开头时两个单词会连成一个，
+    合并时按首尾字母修正。
+    """
+    
+    __slots__ = ("chinese_chars", "english_words", "starts_with_letter", "ends_with_letter", "empty", "keyword_counts")
+    
+    def __init__(self, text: str, keywords: Tuple[str, ...] = ()):
+        """
+        Args:
+            text: 文本内容
+            keywords: 需要统计次数的关键词
+        """
+        stripped = _IGNORED_CHARS_RE.sub('', text)
+        self.chinese_chars = len(_CHINESE_CHAR_RE.findall(stripped))
+        self.english_words = len(_ENGLISH_WORD_RE.findall(stripped))
+        self.empty = not stripped
+        self.starts_with_letter = bool(stripped) and stripped[0].isascii() and stripped[0].isalpha()
+        self.ends_with_letter = bool(stripped) and stripped[-1].isascii() and stripped[-1].isalpha()
+        self.keyword_counts: Tuple[int, ...] = tuple(text.count(keyword) for keyword in keywords)
+    
+    @staticmethod
+    def total_words(stats_list: List['TextStats']) -> int:
+        """
+        多段文本连接后的总字数（与对连接后的全文调用 count_chinese_words 结果相同）
+        
+        Args:
+            stats_list: 按顺序排列的各段统计
+        
+        Returns:
+            字数（中文字符数 + 英文单词数）
+        """
+        total = 0
+        previous_ends_with_letter = False
+        for stats in stats_list:
+            if stats.empty:
+                # 只有标点/空白的段落被整体忽略，不影响前后单词的衔接
+                continue
+            total += stats.chinese_chars + stats.english_words
+            if previous_ends_with_letter and stats.starts_with_letter:
+                total -= 1
+            previous_ends_with_letter = stats.ends_with_letter
+        return total
+
+
 class QualityChecker:
     """内容质量检查器"""
     
+    # 单元格统计缓存上限（与单元格预处理缓存一致）
+    MAX_CACHED_CELLS = 50000
+    
     def __init__(self, 
                  threshold_premium: float = 0.2,
                  threshold_standard: float = 0.5,
@@ -44,12 +109,19 @@ class QualityChecker:
         self.threshold_premium = threshold_premium
         self.threshold_standard = threshold_standard
         self.history_fingerprints: List[Set[str]] = []  # 已生成文档的指纹集合
+        self.history_labels: List[str] = []  # 与指纹一一对应的文档名称
         
         # SEO 相关
         self.seo_keywords = seo_keywords or []
         self.seo_density_min = seo_density_min
         self.seo_density_max = seo_density_max
         
+        # 不含换行的关键词不会跨越两列，可按列累加；含换行的关键词只能在全文中统计
+        self._cell_keywords = tuple(k for k in self.seo_keywords if k and CELL_SEPARATOR not in k)
+        self._joined_keywords = tuple(k for k in self.seo_keywords if k and CELL_SEPARATOR in k)
+        # 每个单元格文本的统计结果（同一批次内重复使用）
+        self._cell_stats: Dict[str, TextStats] = {}
+        
         logger.info(f"质量检查器初始化: 优质阈值={threshold_premium}, 中等阈值={threshold_standard}")
         if self.seo_keywords:
             logger.info(f"SEO 关键词: {self.seo_keywords}, 密度范围: {seo_density_min:.1%} - {seo_density_max:.1%}")
@@ -57,6 +129,7 @@ class QualityChecker:
     def reset(self):
         """重置历史记录（开始新的批次生成时调用）"""
         self.history_fingerprints.clear()
+        self.history_labels.clear()
         logger.info("质量检查器历史记录已清空")
     
     @staticmethod
@@ -93,19 +166,34 @@ class QualityChecker:
         Returns:
             字数（中文字符数 + 英文单词数）
         """
-        import re
-        
         # 移除标点符号和空白字符
-        text = re.sub(r'[，。！？、；：""''（）《》【】\s]+', '', text)
+        text = _IGNORED_CHARS_RE.sub('', text)
         
         # 计算中文字符数
-        chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', text))
+        chinese_chars = len(_CHINESE_CHAR_RE.findall(text))
         
         # 计算英文单词数（简化处理）
-        english_words = len(re.findall(r'[a-zA-Z]+', text))
+        english_words = len(_ENGLISH_WORD_RE.findall(text))
         
         return chinese_chars + english_words
     
+    def cell_stats(self, content: str) -> TextStats:
+        """
+        获取单元格文本的统计结果（带缓存）
+        
+        Args:
+            content: 单元格文本（Spintax 已展开）
+        
+        Returns:
+            TextStats（keyword_counts 与不含换行的关键词一一对应）
+        """
+        stats = self._cell_stats.get(content)
+        if stats is None:
+            stats = TextStats(content, self._cell_keywords)
+            if len(self._cell_stats) < self.MAX_CACHED_CELLS:
+                self._cell_stats[content] = stats
+        return stats
+    
     def check_keyword_density(self, text: str) -> Tuple[float, str, str]:
         """
         检查关键词密度
@@ -122,17 +210,48 @@ class QualityChecker:
         # 计算总字数
         total_words = self.count_chinese_words(text)
         
-        if total_words == 0:
-            return 0.0, "不足", "文章内容为空"
+        # 计算关键词总字符数
+        keyword_total_length = sum(
+            len(keyword) * text.count(keyword)
+            for keyword in self._cell_keywords + self._joined_keywords
+        )
         
-        # 计算关键词出现次数
-        keyword_count = 0
-        keyword_total_length = 0
+        return self._rate_density(total_words, keyword_total_length)
+    
+    def check_keyword_density_cells(self, cells: List[str]) -> Tuple[float, str, str]:
+        """
+        按列统计检查关键词密度（结果与对 "\n".join(非空列) 调用 check_keyword_density 相同）
+        
+        每个单元格的字数和关键词次数只统计一次，之后每篇文档只需按列累加，
+        不再对整篇全文做正则扫描。
+        
+        Args:
+            cells: 物化后的各列内容
+        
+        Returns:
+            (密度, 评级, 建议)
+        """
+        cells = [content for content in cells if content]
+        if not self.seo_keywords or not cells:
+            return 0.0, "", ""
         
-        for keyword in self.seo_keywords:
-            count = text.count(keyword)
-            keyword_count += count
-            keyword_total_length += len(keyword) * count
+        stats_list = [self.cell_stats(content) for content in cells]
+        total_words = TextStats.total_words(stats_list)
+        
+        keyword_total_length = 0
+        for keyword_idx, keyword in enumerate(self._cell_keywords):
+            keyword_total_length += len(keyword) * sum(stats.keyword_counts[keyword_idx] for stats in stats_list)
+        if self._joined_keywords:
+            # 含换行的关键词可能跨越两列，在连接后的全文中统计
+            text = CELL_SEPARATOR.join(cells)
+            keyword_total_length += sum(len(keyword) * text.count(keyword) for keyword in self._joined_keywords)
+        
+        return self._rate_density(total_words, keyword_total_length)
+    
+    def _rate_density(self, total_words: int, keyword_total_length: int) -> Tuple[float, str, str]:
+        """根据总字数和关键词总字符数计算密度并评级"""
+        if total_words == 0:
+            return 0.0, "不足", "文章内容为空"
         
         # 计算密度
         # 公式：(关键词总字符数) / 总字数
@@ -152,7 +271,10 @@ class QualityChecker:
             rating = "完美"
             suggestion = ""
         
-        logger.debug(f"SEO 密度检查: 总字数={total_words}, 关键词字符数={keyword_total_length}, 密度={density:.2%}, 评级={rating}")
+        logger.debug(
+            "SEO 密度检查: 总字数={}, 关键词字符数={}, 密度={:.2%}, 评级={}",
+            total_words, keyword_total_length, density, rating
+        )
         
         return density, rating, suggestion
     
@@ -182,16 +304,21 @@ class QualityChecker:
         
         return intersection / union
     
-    def check_quality(self, current_fingerprint: Set[str], full_text: str = "") -> QualityScore:
+    def check_quality(self, current_fingerprint: Set[str], full_text: str = "",
+                      cells: Optional[List[str]] = None, label: str = "") -> QualityScore:
         """
         检查当前文档的质量（与历史文档对比）
         
         Args:
             current_fingerprint: 当前文档的指纹
+            full_text: 文章全文（用于 SEO 密度检查）
+            cells: 可选，物化后的各列内容（提供时按列统计 SEO 密度，结果与全文统计相同）
+            label: 当前文档名称（之后的文档与它最相似时报告该名称）
             
         Returns:
             质量评分结果
         """
+        matched_document = ""
         if not self.history_fingerprints:
             # 第一篇文档，没有对比对象
             max_similarity = 0.0
@@ -202,6 +329,8 @@ class QualityChecker:
                 for hist_fp in self.history_fingerprints
             ]
             max_similarity = max(similarities)
+            if max_similarity > 0:
+                matched_document = self.history_labels[similarities.index(max_similarity)]
         
         # 根据阈值判断评级
         if max_similarity < self.threshold_premium:
@@ -216,13 +345,16 @@ class QualityChecker:
         
         # 将当前文档加入历史记录
         self.history_fingerprints.append(current_fingerprint)
+        self.history_labels.append(label)
         
         # SEO 密度检查
         keyword_density = 0.0
         density_rating = ""
         seo_suggestion = ""
         
-        if full_text and self.seo_keywords:
+        if cells is not None and self.seo_keywords:
+            keyword_density, density_rating, seo_suggestion = self.check_keyword_density_cells(cells)
+        elif full_text and self.seo_keywords:
             keyword_density, density_rating, seo_suggestion = self.check_keyword_density(full_text)
         
         score = QualityScore(
@@ -230,21 +362,48 @@ class QualityChecker:
             rating=rating,
             rating_en=rating_en,
             compared_count=len(self.history_fingerprints) - 1,
+            matched_document=matched_document,
             keyword_density=keyword_density,
             density_rating=density_rating,
             seo_suggestion=seo_suggestion
         )
         
-        logger.debug(f"质量检查: 重复率={max_similarity:.2%}, 评级={rating}, 对比数={score.compared_count}, SEO密度={keyword_density:.2%}")
-        
         return score
 
 
 class QualityReport:
-    """质量报告生成器"""
+    """
+    质量报告生成器
+    
+    指定 output_path 时为流式模式：记录先进入缓冲区，每 flush_every 条追加写入 CSV，
+    中途崩溃最多丢失一个缓冲区的记录，内存中也不保留全部记录；
+    统计信息由计数器累加，不需要遍历记录。
+    """
     
-    def __init__(self):
-        self.records: List[Dict] = []
+    FIELDNAMES = [
+        "文件名", "标题", "最大重复率", "查重评级",
+        "关键词密度", "密度评级", "SEO建议", "生成时间"
+    ]
+    
+    def __init__(self, output_path: Optional[str] = None, flush_every: int = 50, detail_sink=None):
+        """
+        初始化质量报告
+        
+        Args:
+            output_path: CSV 输出路径（None 表示在内存中保存全部记录，最后调用 save_to_csv）
+            flush_every: 流式模式下每多少条记录写入一次
+            detail_sink: 可选的明细输出（见 quality_report_sinks），与 CSV 同步落盘
+        """
+        self.output_path = output_path
+        self.flush_every = max(1, flush_every)
+        self.detail_sink = detail_sink
+        self.records: List[Dict] = []  # 非流式模式下的全部记录
+        self.record_count = 0
+        
+        self._pending: List[Dict] = []
+        self._file = None
+        self._writer = None
+        self._stats: Counter = Counter()
     
     def add_record(self, 
                    filename: str,
@@ -254,7 +413,8 @@ class QualityReport:
                    timestamp: datetime,
                    keyword_density: float = 0.0,
                    density_rating: str = "",
-                   seo_suggestion: str = ""):
+                   seo_suggestion: str = "",
+                   details: Optional[Dict] = None):
         """
         添加一条记录
         
@@ -267,8 +427,9 @@ class QualityReport:
             keyword_density: 关键词密度
             density_rating: 密度评级
             seo_suggestion: SEO 建议
+            details: 明细输出的附加字段（SimHash、最相似文档、各阶段耗时等）
         """
-        self.records.append({
+        record = {
             "文件名": filename,
             "标题": title,
             "最大重复率": f"{max_similarity:.2%}",
@@ -277,16 +438,75 @@ class QualityReport:
             "密度评级": density_rating if density_rating else "-",
             "SEO建议": seo_suggestion if seo_suggestion else "-",
             "生成时间": timestamp.strftime("%Y-%m-%d %H:%M:%S")
-        })
+        }
+        self.record_count += 1
+        self._stats[f"查重_{rating}"] += 1
+        if density_rating:
+            self._stats[f"SEO_{density_rating}"] += 1
+        
+        if self.detail_sink is not None:
+            self.detail_sink.add({
+                "filename": filename,
+                "title": title,
+                "rating": rating,
+                "max_similarity": max_similarity,
+                "keyword_density": keyword_density,
+                "density_rating": density_rating,
+                "generated_at": timestamp.isoformat(timespec="seconds"),
+                **(details or {})
+            })
+        
+        if self.output_path is None:
+            self.records.append(record)
+            return
+        
+        self._pending.append(record)
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+    
+    def flush(self):
+        """把缓冲区中的记录追加写入 CSV（流式模式）"""
+        if self.detail_sink is not None:
+            self.detail_sink.flush()
+        if not self._pending:
+            return
+        
+        try:
+            if self._file is None:
+                self._file = open(self.output_path, 'w', encoding='utf-8-sig', newline='')
+                self._writer = csv.DictWriter(self._file, fieldnames=self.FIELDNAMES)
+                self._writer.writeheader()
+            self._writer.writerows(self._pending)
+            self._file.flush()
+            self._pending.clear()
+        except Exception as e:
+            logger.error(f"写入质量报告失败: {e}")
+    
+    def close(self):
+        """写入剩余记录并关闭文件（流式模式）"""
+        self.flush()
+        if self.detail_sink is not None:
+            self.detail_sink.close()
+        
+        if self._file is None:
+            if self.output_path is not None:
+                logger.warning("质量报告为空，跳过保存")
+            return
+        
+        self._file.close()
+        self._file = None
+        logger.info(f"质量报告已保存: {self.output_path}, 共 {self.record_count} 条记录")
     
     def save_to_csv(self, output_path: str):
         """
-        保存为 CSV 文件
+        保存为 CSV 文件（流式模式下等同于 close）
         
         Args:
             output_path: 输出路径
         """
-        import csv
+        if self.output_path is not None:
+            self.close()
+            return
         
         if not self.records:
             logger.warning("质量报告为空，跳过保存")
@@ -294,10 +514,7 @@ class QualityReport:
         
         try:
             with open(output_path, 'w', encoding='utf-8-sig', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=[
-                    "文件名", "标题", "最大重复率", "查重评级", 
-                    "关键词密度", "密度评级", "SEO建议", "生成时间"
-                ])
+                writer = csv.DictWriter(f, fieldnames=self.FIELDNAMES)
                 writer.writeheader()
                 writer.writerows(self.records)
             
@@ -307,7 +524,7 @@ class QualityReport:
     
     def get_statistics(self) -> Dict[str, int]:
         """
-        获取统计信息
+        获取统计信息（来自累加的计数器）
         
         Returns:
             统计字典 {评级: 数量}
@@ -316,24 +533,6 @@ class QualityReport:
             "查重_优质": 0, "查重_中等": 0, "查重_高重复": 0,
             "SEO_完美": 0, "SEO_不足": 0, "SEO_堆砌": 0
         }
-        for record in self.records:
-            # 查重统计
-            rating = record.get("查重评级", "")
-            if rating == "优质":
-                stats["查重_优质"] += 1
-            elif rating == "中等":
-                stats["查重_中等"] += 1
-            elif rating == "高重复":
-                stats["查重_高重复"] += 1
-            
-            # SEO 统计
-            density_rating = record.get("密度评级", "")
-            if density_rating == "完美":
-                stats["SEO_完美"] += 1
-            elif density_rating == "不足":
-                stats["SEO_不足"] += 1
-            elif density_rating == "堆砌":
-                stats["SEO_堆砌"] += 1
-        
+        for key in stats:
+            stats[key] = self._stats[key]
         return stats
-
@@ -0,0 +1,164 @@
+"""
+质量报告明细输出
+除 quality_report.csv 之外，可选把每篇文档的明细（SimHash、最大重复率、最相似文档、
+关键词密度、各阶段耗时）按列式结构写入 SQLite 或 Parquet，便于大批次事后分析。
+
+明细与 CSV 一样缓冲写入、定期落盘；Parquet 依赖 pyarrow（可选），未安装时回退到 SQLite。
+"""
+
+import sqlite3
+from typing import Dict, List, Optional
+from loguru import logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+# 明细的固定列（各阶段耗时列在第一条记录写入时按阶段名追加，列名为 "<阶段>_ms"）
+DETAIL_COLUMNS = (
+    ("filename", "TEXT"),
+    ("title", "TEXT"),
+    ("rating", "TEXT"),
+    ("max_similarity", "REAL"),
+    ("matched_document", "TEXT"),
+    ("simhash", "TEXT"),
+    ("keyword_density", "REAL"),
+    ("density_rating", "TEXT"),
+    ("attempt", "INTEGER"),
+    ("generated_at", "TEXT"),
+)
+
+# 支持的明细格式
+DETAIL_FORMATS = ("none", "sqlite", "parquet")
+
+
+class DetailSink:
+    """明细输出基类（列在第一条记录到达时确定）"""
+    
+    suffix = ""
+    
+    def __init__(self, path_stem: str):
+        """
+        Args:
+            path_stem: 输出路径（不含扩展名）
+        """
+        self.path = f"{path_stem}{self.suffix}"
+        self.columns: Optional[List[str]] = None
+        self.row_count = 0
+        self._pending: List[Dict] = []
+    
+    def add(self, row: Dict):
+        """
+        追加一条明细（写入缓冲区）
+        
+        Args:
+            row: {列名: 值}，耗时列为 "<阶段>_ms"
+        """
+        if self.columns is None:
+            fixed = [name for name, _ in DETAIL_COLUMNS]
+            self.columns = fixed + sorted(key for key in row if key not in fixed)
+            self._open()
+        self._pending.append(row)
+    
+    def flush(self):
+        """把缓冲区写入文件"""
+        if not self._pending:
+            return
+        rows = self._pending
+        self._pending = []
+        self._write(rows)
+        self.row_count += len(rows)
+    
+    def close(self):
+        """写入剩余数据并关闭文件"""
+        self.flush()
+        if self.columns is not None:
+            self._close()
+            logger.info(f"质量明细已保存: {self.path}, 共 {self.row_count} 条记录")
+    
+    def _open(self):
+        raise NotImplementedError
+    
+    def _write(self, rows: List[Dict]):
+        raise NotImplementedError
+    
+    def _close(self):
+        pass
+
+
+class SQLiteDetailSink(DetailSink):
+    """明细写入 SQLite（表 quality_report，每次落盘一个事务）"""
+    
+    suffix = ".sqlite"
+    
+    def _open(self):
+        column_types = dict(DETAIL_COLUMNS)
+        definitions = ", ".join(f'"{name}" {column_types.get(name, "REAL")}' for name in self.columns)
+        self._connection = sqlite3.connect(self.path)
+        # 每次运行重新生成（与 CSV 报告覆盖写入一致）
+        self._connection.execute("DROP TABLE IF EXISTS quality_report")
+        self._connection.execute(f"CREATE TABLE quality_report ({definitions})")
+        self._connection.commit()
+        placeholders = ", ".join("?" for _ in self.columns)
+        self._insert_sql = f"INSERT INTO quality_report VALUES ({placeholders})"
+    
+    def _write(self, rows: List[Dict]):
+        with self._connection:
+            self._connection.executemany(
+                self._insert_sql,
+                ([row.get(name) for name in self.columns] for row in rows)
+            )
+    
+    def _close(self):
+        self._connection.close()
+
+
+class ParquetDetailSink(DetailSink):
+    """明细写入 Parquet（每次落盘一个 row group）"""
+    
+    suffix = ".parquet"
+    
+    _ARROW_TYPES = {"TEXT": "string", "REAL": "float64", "INTEGER": "int64"}
+    
+    def _open(self):
+        column_types = dict(DETAIL_COLUMNS)
+        self._schema = pa.schema([
+            (name, pa.type_for_alias(self._ARROW_TYPES[column_types.get(name, "REAL")]))
+            for name in self.columns
+        ])
+        self._writer = pq.ParquetWriter(self.path, self._schema)
+    
+    def _write(self, rows: List[Dict]):
+        table = pa.Table.from_pydict(
+            {name: [row.get(name) for row in rows] for name in self.columns},
+            schema=self._schema
+        )
+        self._writer.write_table(table)
+    
+    def _close(self):
+        self._writer.close()
+
+
+def create_detail_sink(detail_format: str, path_stem: str) -> Optional[DetailSink]:
+    """
+    按配置创建明细输出
+    
+    Args:
+        detail_format: "none" / "sqlite" / "parquet"
+        path_stem: 输出路径（不含扩展名）
+    
+    Returns:
+        DetailSink 实例（不输出明细时为 None）
+    """
+    if detail_format == "parquet":
+        if pq is not None:
+            return ParquetDetailSink(path_stem)
+        logger.warning("未安装 pyarrow，质量明细改为输出 SQLite")
+        return SQLiteDetailSink(path_stem)
+    if detail_format == "sqlite":
+        return SQLiteDetailSink(path_stem)
+    return None
@@ -0,0 +1,200 @@
+"""
+生成随机源
+为每篇文档派生独立、可复现的随机数生成器，并支持分片（shard）执行
+
+分片执行的保证范围：每篇文档首次尝试的内容（规划的组合、Spintax 变体、混排策略、
+列图片、对比表）只由 (种子, 文档序号) 决定，各分片合起来与单机生成的内容一致。
+以下结果取决于同一进程之前处理过哪些文档或数据库中的历史数据，分片与单机可能不同：
+- 批内质量评级及文件名的评级前缀（[优质]/[中等]/[高重复]）：每篇文档只与同一进程中
+  之前评分的文档比较；文件名末尾的文档序号（_0002）在各种分片方式下都指向同一篇文档
+- 历史查重的拒绝与重试（retry 子流）：取决于查重库中已有的指纹
+- 启用跨批次均衡轮换时的内容选择：取决于使用次数表
+- 启用 SEO 密度定向时的组合探测与替换：避开同一进程中已规划的组合
+
+各分片的质量报告写入 quality_report_{i}of{N}.csv（明细文件同样带分片后缀）。
+合并时拼接各分片的数据行、表头只保留一份即可；其中的评级是分片内比较的结果，
+需要整批统一评级时，应对合并后的全部文档重新做质量检查。
+"""
+
+import random
+from typing import List, Optional, Tuple
+from loguru import logger
+
+
+def resolve_run_seed(seed: Optional[int] = None) -> int:
+    """
+    确定本次运行的种子
+    
+    未指定种子时随机生成一个并写入日志，便于事后复现同一批文档。
+    
+    Args:
+        seed: 配置中的种子（None 表示随机）
+    
+    Returns:
+        本次运行使用的种子
+    """
+    if seed is None:
+        seed = random.SystemRandom().randrange(2 ** 32)
+        logger.info(f"本次生成随机种子: {seed}（在配置中设置该种子可复现本批文档）")
+    else:
+        logger.info(f"使用固定随机种子: {seed}")
+    return seed
+
+
+def make_doc_rng(seed: int, doc_index: int, stream: str = "") -> random.Random:
+    """
+    为单篇文档派生随机数生成器
+    
+    同一 (seed, doc_index, stream) 总是得到相同的随机序列，且与其它文档的生成顺序无关，
+    因此分片执行时每篇文档的随机选择与单机一致（评级、查重重试等的范围见模块说明）。
+    
+    Args:
+        seed: 运行种子
+        doc_index: 文档全局序号（从0开始）
+        stream: 子流名称（用于区分同一文档内互不影响的随机用途）
+    
+    Returns:
+        random.Random 实例
+    """
+    # 字符串种子经 SHA-512 派生，不受 PYTHONHASHSEED 影响
+    return random.Random(f"{seed}:{doc_index}:{stream}")
+
+
+def make_run_rng(seed: int, stream: str) -> random.Random:
+    """
+    派生批次级随机数生成器（如组合规划的排列），只取决于运行种子
+    
+    Args:
+        seed: 运行种子
+        stream: 用途名称
+    
+    Returns:
+        random.Random 实例
+    """
+    return random.Random(f"{seed}:run:{stream}")
+
+
+def parse_shard(text: Optional[str]) -> Optional[Tuple[int, int]]:
+    """
+    解析分片参数
+    
+    Args:
+        text: 形如 "1/4" 的字符串（第1片，共4片，序号从1开始）
+    
+    Returns:
+        (分片索引（从0开始）, 分片总数)，text 为空时返回 None
+    
+    Raises:
+        ValueError: 格式错误
+    """
+    if not text:
+        return None
+    
+    try:
+        index_text, total_text = text.split('/')
+        index = int(index_text)
+        total = int(total_text)
+    except ValueError:
+        raise ValueError(f"分片格式错误: '{text}'，应为 i/N，例如 1/4")
+    
+    if total < 1 or not 1 <= index <= total:
+        raise ValueError(f"分片超出范围: '{text}'，i 必须在 1 到 N 之间")
+    
+    return index - 1, total
+
+
+def shard_indices(count: int, shard: Optional[Tuple[int, int]] = None) -> List[int]:
+    """
+    获取属于指定分片的文档序号
+    
+    按取模轮转分配，各分片数量最多相差 1，所有分片的并集恰为 0..count-1。
+    
+    Args:
+        count: 逻辑批次的文档总数
+        shard: (分片索引, 分片总数)，None 表示全部
+    
+    Returns:
+        文档序号列表
+    """
+    if shard is None:
+        return list(range(count))
+    
+    index, total = shard
+    return list(range(index, count, total))
+
+
+class IndexPermutation:
+    """
+    [0, size) 上的伪随机排列（不占内存的无放回抽样）
+    
+    使用 4 轮 Feistel 网络在 2 的偶数次幂区间上构造双射，
+    超出 size 的结果继续迭代（cycle walking）直到落回区间内。
+    第 i 个元素可以直接计算，无需生成或存储整个排列，因此 size 可以非常大。
+    """
+    
+    ROUNDS = 4
+    
+    def __init__(self, size: int, rng: Optional[random.Random] = None):
+        """
+        Args:
+            size: 排列长度
+            rng: 随机数生成器（用于派生轮密钥；同一种子得到同一排列）
+        """
+        if size < 0:
+            raise ValueError(f"排列长度不能为负数: {size}")
+        
+        rng = rng or random
+        self.size = size
+        
+        # 区间位数取偶数，左右两半等宽；区间大小 < 4 * size，平均迭代不超过 4 次
+        bits = max(2, (size - 1).bit_length())
+        bits += bits % 2
+        self._half_bits = bits // 2
+        self._half_mask = (1 << self._half_bits) - 1
+        self._keys = [rng.getrandbits(64) for _ in range(self.ROUNDS)]
+    
+    def _round(self, value: int, key: int) -> int:
+        """轮函数：splitmix64 风格的混合，截断到半区间宽度"""
+        mask64 = 0xFFFFFFFFFFFFFFFF
+        result = 0
+        # 半区间超过 64 位时按 64 位分块混合
+        for shift in range(0, self._half_bits, 64):
+            z = (((value >> shift) + key + shift) * 0x9E3779B97F4A7C15) & mask64
+            z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & mask64
+            z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & mask64
+            z ^= z >> 31
+            result |= z << shift
+        return result & self._half_mask
+    
+    def _encrypt(self, value: int) -> int:
+        """在 2^bits 区间上的一次 Feistel 置换"""
+        left = value >> self._half_bits
+        right = value & self._half_mask
+        for key in self._keys:
+            left, right = right, left ^ self._round(right, key)
+        return (left << self._half_bits) | right
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def __getitem__(self, index: int) -> int:
+        """
+        排列中第 index 个元素
+        
+        Args:
+            index: 位置（0 <= index < size）
+        
+        Returns:
+            [0, size) 内的值，不同位置的值互不相同
+        """
+        if not 0 <= index < self.size:
+            raise IndexError(f"排列位置超出范围: {index}（长度 {self.size}）")
+        
+        value = self._encrypt(index)
+        while value >= self.size:
+            value = self._encrypt(value)
+        return value
+    
+    def __iter__(self):
+        for index in range(self.size):
+            yield self[index]
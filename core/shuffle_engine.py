@@ -4,12 +4,48 @@
 """
 
 import random
-from typing import List, Dict, Set, Tuple
+from dataclasses import dataclass
+from typing import List, Dict, Set, Tuple, Optional
+import numpy as np
 from loguru import logger
 
 from ..config.settings import ShufflingStrategy
 
 
+@dataclass
+class ShuffleBatch:
+    """一批文档的混排结果（按文档序号逐行存储）"""
+    keep_mask: np.ndarray  # (文档数, 总列数) 布尔矩阵，True 表示保留该列
+    group_orders: List[Optional[np.ndarray]]  # 每个策略保留组的排列 (文档数, 保留组数)，未启用乱序的策略为 None
+    
+    def __len__(self) -> int:
+        return self.keep_mask.shape[0]
+    
+    def keep_map(self, index: int) -> Dict[int, bool]:
+        """
+        第 index 篇文档的保留映射（与 ShuffleEngine.execute 的返回格式一致）
+        
+        Args:
+            index: 文档序号
+            
+        Returns:
+            {列索引: 是否保留} 的字典
+        """
+        return dict(enumerate(self.keep_mask[index].tolist()))
+    
+    def kept_columns(self, index: int) -> List[int]:
+        """
+        第 index 篇文档保留的列
+        
+        Args:
+            index: 文档序号
+            
+        Returns:
+            列索引列表（升序）
+        """
+        return np.flatnonzero(self.keep_mask[index]).tolist()
+
+
 class ShuffleEngine:
     """混排策略执行器"""
     
@@ -35,12 +71,13 @@ class ShuffleEngine:
         
         logger.info(f"混排策略验证通过，共 {len(self.strategies)} 个策略")
     
-    def execute(self, total_columns: int) -> Dict[int, bool]:
+    def execute(self, total_columns: int, rng: Optional[random.Random] = None) -> Dict[int, bool]:
         """
         执行混排策略，返回每列是否保留的映射
         
         Args:
             total_columns: 总列数
+            rng: 随机数生成器（可选，默认使用全局 random）
             
         Returns:
             {列索引: 是否保留} 的字典
@@ -50,7 +87,7 @@ class ShuffleEngine:
         
         # 执行每个策略
         for strategy in self.strategies:
-            kept_columns = self._execute_single_strategy(strategy)
+            kept_columns = self._execute_single_strategy(strategy, rng)
             
             # 更新保留映射
             for col in strategy.columns:
@@ -61,36 +98,94 @@ class ShuffleEngine:
         
         return column_keep_map
     
-    def _execute_single_strategy(self, strategy: ShufflingStrategy) -> Set[int]:
+    def execute_batch(self, total_columns: int, count: int, seed: Optional[int] = None) -> ShuffleBatch:
+        """
+        一次性为整批文档执行混排策略（向量化，5 万篇文档只需几毫秒）
+        
+        每个策略为每篇文档生成一行随机键，按键排序得到各组的随机排列：
+        排列的前 keep_count 项即保留的组（等价于 random.sample），其顺序即乱序后的组顺序。
+        每个策略使用由种子派生的独立随机流并按文档逐行取数，
+        因此第 i 篇文档的结果只取决于 (seed, i)，与批次大小无关。
+        
+        这是独立的批量接口（如预先统计一批文档的列保留情况），生成流水线不使用：
+        流水线按文档应用 GenerationPlan 中编译后的策略（只保留完整的组），随机流随文档和重试变化。
+        与 execute 的一致性见 test_shuffle_batch.py。
+        
+        Args:
+            total_columns: 总列数
+            count: 文档数量
+            seed: 随机种子（None 表示随机）
+            
+        Returns:
+            ShuffleBatch
+        """
+        keep_mask = np.ones((count, total_columns), dtype=bool)
+        group_orders: List[Optional[np.ndarray]] = []
+        streams = np.random.SeedSequence(seed).spawn(len(self.strategies))
+        
+        for strategy, stream in zip(self.strategies, streams):
+            groups = self._split_groups(strategy)
+            keep_count = min(strategy.keep_count, len(groups))
+            
+            # 每篇文档各组的随机排列，取前 keep_count 组保留
+            keys = np.random.default_rng(stream).random((count, len(groups)))
+            kept = np.argsort(keys, axis=1)[:, :keep_count]
+            group_kept = np.zeros((count, len(groups)), dtype=bool)
+            np.put_along_axis(group_kept, kept, True, axis=1)
+            
+            # 组的保留结果展开到列（超出总列数的列忽略）
+            columns = []
+            column_groups = []
+            for group_idx, group in enumerate(groups):
+                for col in group:
+                    if 0 <= col < total_columns:
+                        columns.append(col)
+                        column_groups.append(group_idx)
+            keep_mask[:, columns] = group_kept[:, column_groups]
+            
+            group_orders.append(kept if strategy.shuffle_order else None)
+        
+        logger.debug(f"批量混排完成：{count} 篇文档，{len(self.strategies)} 个策略")
+        return ShuffleBatch(keep_mask=keep_mask, group_orders=group_orders)
+    
+    @staticmethod
+    def _split_groups(strategy: ShufflingStrategy) -> List[List[int]]:
+        """将策略的列按 group_size 切分为组（最后一组可能不完整）"""
+        columns = strategy.columns
+        return [columns[i:i + strategy.group_size] for i in range(0, len(columns), strategy.group_size)]
+    
+    def _execute_single_strategy(
+        self,
+        strategy: ShufflingStrategy,
+        rng: Optional[random.Random] = None
+    ) -> Set[int]:
         """
         执行单个策略
         
         Args:
             strategy: 策略对象
+            rng: 随机数生成器（可选，默认使用全局 random）
             
         Returns:
             保留的列索引集合
         """
+        rng = rng or random
         columns = strategy.columns
-        group_size = strategy.group_size
         keep_count = strategy.keep_count
         shuffle_order = strategy.shuffle_order
         
         # 将列切分为组
-        groups = []
-        for i in range(0, len(columns), group_size):
-            group = columns[i:i + group_size]
-            groups.append(group)
+        groups = self._split_groups(strategy)
         
         # 随机抽取保留的组
         if keep_count >= len(groups):
             kept_groups = groups
         else:
-            kept_groups = random.sample(groups, keep_count)
+            kept_groups = rng.sample(groups, keep_count)
         
         # 如果需要打乱顺序
         if shuffle_order:
-            random.shuffle(kept_groups)
+            rng.shuffle(kept_groups)
         
         # 展开为列索引集合
         kept_columns = set()
@@ -105,18 +200,19 @@ class ShuffleEngine:
         
         return kept_columns
     
-    def get_column_order(self, total_columns: int) -> List[int]:
+    def get_column_order(self, total_columns: int, rng: Optional[random.Random] = None) -> List[int]:
         """
         获取列的最终顺序（考虑策略的乱序设置）
         
         Args:
             total_columns: 总列数
+            rng: 随机数生成器（可选）
             
         Returns:
             列索引的有序列表
         """
         # 获取保留映射
-        keep_map = self.execute(total_columns)
+        keep_map = self.execute(total_columns, rng)
         
         # 筛选保留的列
         kept_columns = [col for col in range(total_columns) if keep_map[col]]
@@ -5,10 +5,15 @@ SimHash 查重引擎
 
 import hashlib
 import re
-from typing import List, Tuple
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+import numpy as np
 from loguru import logger
 
 
+# 分句：中文标点和空白
+_SENTENCE_SEPARATOR = re.compile(r'[，。！？；：、\s]+')
+
+
 class SimHashEngine:
     """SimHash 算法引擎"""
     
@@ -40,31 +45,58 @@ class SimHashEngine:
         if not tokens:
             return 0
         
-        # 2. 初始化向量（64维）
-        vector = [0] * self.hash_bits
+        # 2. 计算每个词的 64 位哈希，按位展开为 (词数, 64) 的 0/1 矩阵（第 i 列为第 i 位）
+        token_hashes = np.fromiter(map(self._hash_token, tokens), dtype='<u8', count=len(tokens))
+        bits = np.unpackbits(token_hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
         
-        # 3. 对每个词计算哈希并累加
-        for token in tokens:
-            # 计算词的哈希值
-            token_hash = self._hash_token(token)
-            
-            # 根据哈希值的每一位更新向量
-            for i in range(self.hash_bits):
-                bit = (token_hash >> i) & 1
-                if bit == 1:
-                    vector[i] += 1
-                else:
-                    vector[i] -= 1
+        # 3. 每一位：为 1 的词 +1，为 0 的词 -1（超过 64 位的维度所有词都为 0）
+        vector = 2 * bits[:, :self.hash_bits].sum(axis=0, dtype=np.int64) - len(tokens)
         
         # 4. 降维：将向量转为二进制指纹
-        fingerprint = 0
-        for i in range(self.hash_bits):
-            if vector[i] > 0:
-                fingerprint |= (1 << i)
+        fingerprint = int.from_bytes(np.packbits(vector > 0, bitorder='little').tobytes(), 'little')
         
-        logger.debug(f"SimHash 计算: 文本长度={len(text)}, 分词数={len(tokens)}, 指纹={fingerprint}")
+        logger.debug("SimHash 计算: 文本长度={}, 分词数={}, 指纹={}", len(text), len(tokens), fingerprint)
         return fingerprint
     
+    def calculate_simhashes(self, texts: Sequence[str]) -> List[int]:
+        """
+        批量计算 SimHash（结果与逐条 calculate_simhash 相同）
+        
+        同一批文本中重复出现的词只计算一次哈希（2/3-gram 在素材之间大量重复，
+        逐词 MD5 是主要开销），所有词的哈希拼成一个矩阵一次展开、按文本分段求和。
+        
+        Args:
+            texts: 文本列表
+            
+        Returns:
+            SimHash 值列表（空文本为 0）
+        """
+        token_lists = [self._tokenize(text) if text and text.strip() else [] for text in texts]
+        counts = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+        fingerprints = [0] * len(token_lists)
+        nonempty = np.flatnonzero(counts)
+        if not len(nonempty):
+            return fingerprints
+        
+        vocabulary = dict.fromkeys(token for tokens in token_lists for token in tokens)
+        for token in vocabulary:
+            vocabulary[token] = self._hash_token(token)
+        token_hashes = np.fromiter(
+            (vocabulary[token] for tokens in token_lists for token in tokens),
+            dtype='<u8', count=int(counts.sum())
+        )
+        bits = np.unpackbits(token_hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+        
+        # 每个非空文本的词在矩阵中的起始行，按段求和得到每一位为 1 的词数
+        starts = np.concatenate(([0], np.cumsum(counts[nonempty])[:-1]))
+        ones = np.add.reduceat(bits[:, :self.hash_bits], starts, axis=0, dtype=np.int64)
+        vectors = 2 * ones - counts[nonempty, None]
+        
+        packed = np.packbits(vectors > 0, axis=1, bitorder='little')
+        for text_idx, row in zip(nonempty.tolist(), packed):
+            fingerprints[text_idx] = int.from_bytes(row.tobytes(), 'little')
+        return fingerprints
+    
     def calculate_hamming_distance(self, hash1: int, hash2: int) -> int:
         """
         计算两个 SimHash 的海明距离
@@ -125,40 +157,21 @@ class SimHashEngine:
         Returns:
             词列表
         """
-        # 清理文本
-        text = re.sub(r'\s+', ' ', text)  # 合并空白字符
-        text = text.strip()
-        
         # 简单分词策略：
-        # 1. 按标点符号分句
+        # 1. 按标点符号和空白分句（句子中不含空白，切出的词都非空）
         # 2. 每句按2-3字切分（模拟中文分词）
         
         tokens = []
         
-        # 按标点分句
-        sentences = re.split(r'[，。！？；：、\s]+', text)
-        
-        for sentence in sentences:
-            if not sentence:
-                continue
-            
+        for sentence in _SENTENCE_SEPARATOR.split(text):
             # 2-gram 切分
-            for i in range(len(sentence) - 1):
-                tokens.append(sentence[i:i+2])
+            tokens.extend([sentence[i:i + 2] for i in range(len(sentence) - 1)])
             
             # 3-gram 切分（增加权重）
-            for i in range(len(sentence) - 2):
-                tokens.append(sentence[i:i+3])
+            tokens.extend([sentence[i:i + 3] for i in range(len(sentence) - 2)])
         
         # 去重并保持顺序
-        seen = set()
-        unique_tokens = []
-        for token in tokens:
-            if token not in seen and len(token.strip()) > 0:
-                seen.add(token)
-                unique_tokens.append(token)
-        
-        return unique_tokens
+        return list(dict.fromkeys(tokens))
     
     def _hash_token(self, token: str) -> int:
         """
@@ -170,13 +183,8 @@ class SimHashEngine:
         Returns:
             64-bit 整数哈希值
         """
-        # 使用 MD5 生成哈希
-        md5_hash = hashlib.md5(token.encode('utf-8')).hexdigest()
-        
-        # 取前16个字符转为64位整数
-        hash_value = int(md5_hash[:16], 16)
-        
-        return hash_value
+        # 使用 MD5 生成哈希，取前 8 个字节（十六进制前 16 个字符）转为 64 位整数
+        return int.from_bytes(hashlib.md5(token.encode('utf-8')).digest()[:8], 'big')
 
 
 class ContentDeduplicator:
@@ -225,7 +233,8 @@ class ContentDeduplicator:
     def check_duplicate(
         self,
         text: str,
-        source_project: str = None
+        source_project: str = None,
+        fingerprint: Optional[Tuple[int, str]] = None
     ) -> Tuple[bool, dict]:
         """
         检查内容是否重复
@@ -233,6 +242,7 @@ class ContentDeduplicator:
         Args:
             text: 文本内容
             source_project: 来源项目
+            fingerprint: 已计算好的 (simhash, md5)，避免重复计算
             
         Returns:
             (is_duplicate, duplicate_info)
@@ -243,7 +253,7 @@ class ContentDeduplicator:
             return (False, {})
         
         # 计算指纹
-        simhash_value, md5_hash = self.calculate_content_fingerprint(text)
+        simhash_value, md5_hash = fingerprint or self.calculate_content_fingerprint(text)
         
         # 查重
         is_dup, record, distance = self.fp_manager.check_duplicate(
@@ -272,7 +282,8 @@ class ContentDeduplicator:
         self,
         text: str,
         source_project: str = "",
-        document_path: str = ""
+        document_path: str = "",
+        fingerprint: Optional[Tuple[int, str]] = None
     ) -> bool:
         """
         添加内容指纹到数据库
@@ -281,13 +292,14 @@ class ContentDeduplicator:
             text: 文本内容
             source_project: 来源项目
             document_path: 文档路径
+            fingerprint: 已计算好的 (simhash, md5)，避免重复计算
             
         Returns:
             是否添加成功
         """
         try:
             # 计算指纹
-            simhash_value, md5_hash = self.calculate_content_fingerprint(text)
+            simhash_value, md5_hash = fingerprint or self.calculate_content_fingerprint(text)
             
             # 提取预览
             preview = text[:100]
@@ -334,6 +346,61 @@ class ContentDeduplicator:
         return self.fp_manager.get_statistics(source_project)
 
 
+class SimHashIndex:
+    """
+    SimHash 近似查找索引（分段鸽巢原理）
+    
+    把 64 位指纹切成 max_distance + 1 段：海明距离不超过 max_distance 的两个指纹
+    至少有一段完全相同，因此只需比较与目标有相同段的候选，而不是逐条计算距离。
+    """
+    
+    def __init__(self, max_distance: int = 3, hash_bits: int = 64):
+        """
+        Args:
+            max_distance: 视为近似重复的最大海明距离
+            hash_bits: 指纹位数
+        """
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        bounds = [hash_bits * i // bands for i in range(bands + 1)]
+        # 每段的 (起始位, 掩码)
+        self._bands = [(start, (1 << (end - start)) - 1) for start, end in zip(bounds, bounds[1:])]
+        self._tables: List[Dict[int, List[Tuple[int, Hashable]]]] = [{} for _ in self._bands]
+        self.size = 0
+    
+    def add(self, fingerprint: int, key: Hashable):
+        """
+        加入一个指纹
+        
+        Args:
+            fingerprint: SimHash 值
+            key: 指纹对应的标识（如素材 ID）
+        """
+        for table, (start, mask) in zip(self._tables, self._bands):
+            table.setdefault((fingerprint >> start) & mask, []).append((fingerprint, key))
+        self.size += 1
+    
+    def find(self, fingerprint: int) -> Optional[Tuple[Hashable, int]]:
+        """
+        查找海明距离最近且不超过 max_distance 的指纹
+        
+        Args:
+            fingerprint: SimHash 值
+        
+        Returns:
+            (标识, 海明距离)，没有近似指纹时返回 None
+        """
+        best = None
+        for table, (start, mask) in zip(self._tables, self._bands):
+            for candidate, key in table.get((fingerprint >> start) & mask, ()):
+                distance = (candidate ^ fingerprint).bit_count()
+                if distance <= self.max_distance and (best is None or distance < best[1]):
+                    best = (key, distance)
+                    if distance == 0:
+                        return best
+        return best
+
+
 def distance_to_similarity(distance: int, hash_bits: int = 64) -> float:
     """
     海明距离转相似度
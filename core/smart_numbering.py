@@ -6,6 +6,8 @@ import re
 from typing import Tuple, Optional
 from loguru import logger
 
+from ..utils.tracing import trace_counters
+
 
 class SmartNumbering:
     """智能序号处理器"""
@@ -34,6 +36,12 @@ class SmartNumbering:
         'rank': r'^\s*第([一二三四五六七八九十\d]+)[名点]\s?',  # 第一名 或 第1点 或 第一名文字
     }
     
+    # 所有序号类型合并为一个预编译的多选正则：每种类型整体作为以类型名命名的组
+    # （其后紧跟该类型的序号捕获组），按 NUMBER_STYLES 的顺序依次尝试，与逐个 re.match 的优先级一致
+    COMBINED_PATTERN = re.compile('|'.join(
+        f"(?P<{style_name}>{pattern})" for style_name, pattern in NUMBER_STYLES.items()
+    ))
+    
     def __init__(self):
         """初始化"""
         pass
@@ -52,17 +60,19 @@ class SmartNumbering:
         if not text or not text.strip():
             return text, None
         
-        # 尝试匹配所有序号类型
-        for style_name, pattern in SmartNumbering.NUMBER_STYLES.items():
-            match = re.match(pattern, text)
-            if match:
-                # 提取序号后的正文
-                cleaned_text = text[match.end():]
-                logger.info(f"[智能序号] 检测到: {style_name}, 原序号={match.group(1)}, 原文='{text[:30]}'")
-                return cleaned_text.lstrip(), style_name
+        # 一次匹配所有序号类型（命中的命名组即序号类型）
+        match = SmartNumbering.COMBINED_PATTERN.match(text)
+        if match:
+            style_name = match.lastgroup
+            # 提取序号后的正文
+            cleaned_text = text[match.end():]
+            trace_counters.count("numbering.detected")
+            logger.trace("[智能序号] 检测到: {}, 原序号={}, 原文='{}'", style_name, match.group(match.lastindex + 1), text[:30])
+            return cleaned_text.lstrip(), style_name
         
         # 没有匹配到序号
-        logger.info(f"[智能序号] 未检测到序号: '{text[:30]}'")
+        trace_counters.count("numbering.plain")
+        logger.trace("[智能序号] 未检测到序号: '{}'", text[:30])
         return text, None
     
     @staticmethod
@@ -160,11 +170,11 @@ class SmartNumbering:
         if detected_style:
             new_prefix = SmartNumbering.generate_prefix(index, detected_style)
             result = new_prefix + cleaned_text
-            logger.info(f"[智能序号] 重新编号: {index}, 样式={detected_style}, 新前缀='{new_prefix}', 结果='{result[:40]}'")
+            logger.trace("[智能序号] 重新编号: {}, 样式={}, 新前缀='{}', 结果='{}'", index, detected_style, new_prefix, result[:40])
             return result
         
         # 原本没有序号，不添加
-        logger.info(f"[智能序号] 无序号，保持原样: '{cleaned_text[:40]}'")
+        logger.trace("[智能序号] 无序号，保持原样: '{}'", cleaned_text[:40])
         return cleaned_text
     
     @staticmethod
@@ -1,27 +1,344 @@
 """
 Spintax 语法解析器
-支持 {A|B|C} 格式的随机替换
+支持 {A|B|C} 格式的随机替换，可任意嵌套，如 {很{好|棒}|不错}
+
+单元格文本只编译一次（按文本缓存）为语法树：字面量 + 选项组（每个选项又是节点序列），
+之后每次渲染只需沿语法树用随机数生成器选择分支，耗时与输出长度成正比。
+
+变体按混合进制编号（0 <= k < 变体数）：组内各选项的编号区间首尾相接，
+并列的组按位组合（靠前的组为高位）。据此可以直接取第 k 个变体（unrank），
+配合 IndexPermutation 可以不占内存地无放回抽取互不重复的变体。
 """
 
 import re
 import random
-from typing import List
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Union
 from loguru import logger
 
+from .seeding import IndexPermutation
+
+
+class _Group:
+    """选项组节点 {A|B|C}"""
+    
+    __slots__ = ("alternatives", "offsets", "variations")
+    
+    def __init__(self, alternatives: Tuple[Tuple["_Node", ...], ...]):
+        # 每个选项是一个节点序列（已去除首尾空白、已过滤空选项）
+        self.alternatives = alternatives
+        # 每个选项的编号起点；变体数 = 各选项变体数之和
+        offsets = []
+        total = 0
+        for alt in alternatives:
+            offsets.append(total)
+            total += _sequence_variations(alt)
+        self.offsets = tuple(offsets)
+        self.variations = total
+
+
+# 语法树节点：字面量字符串或选项组
+_Node = Union[str, _Group]
+
+
+def _sequence_variations(nodes) -> int:
+    """节点序列的变体数（各选项组变体数之积）"""
+    variations = 1
+    for node in nodes:
+        if node.__class__ is _Group:
+            variations *= node.variations
+    return variations
+
+
+def _render_nodes(nodes, rng, out: List[str]):
+    """沿语法树渲染节点序列，结果追加到 out"""
+    for node in nodes:
+        if node.__class__ is _Group:
+            _render_nodes(rng.choice(node.alternatives), rng, out)
+        else:
+            out.append(node)
+
+
+def _unrank_nodes(nodes, rank: int, out: List[str]):
+    """按混合进制编号渲染节点序列（靠前的组为高位），结果追加到 out"""
+    # 先从低位拆出每个组的编号，再顺序渲染
+    digits = []
+    for node in reversed(nodes):
+        if node.__class__ is _Group:
+            rank, digit = divmod(rank, node.variations)
+            digits.append(digit)
+    
+    for node in nodes:
+        if node.__class__ is _Group:
+            digit = digits.pop()
+            choice = bisect_right(node.offsets, digit) - 1
+            _unrank_nodes(node.alternatives[choice], digit - node.offsets[choice], out)
+        else:
+            out.append(node)
+
+
+def _match_braces(text: str) -> Tuple[Dict[int, int], List[int], List[int]]:
+    """
+    一次扫描配对大括号
+    
+    Returns:
+        ({左括号位置: 右括号位置}, 未配对的左括号位置, 未配对的右括号位置)
+    """
+    pairs = {}
+    stack = []
+    unmatched_close = []
+    for pos, char in enumerate(text):
+        if char == '{':
+            stack.append(pos)
+        elif char == '}':
+            if stack:
+                pairs[stack.pop()] = pos
+            else:
+                unmatched_close.append(pos)
+    return pairs, stack, unmatched_close
+
+
+def _finish_sequence(nodes: list, strip: bool) -> Tuple[_Node, ...]:
+    """合并相邻字面量，按需去除首尾空白，丢弃空字面量"""
+    merged = []
+    for node in nodes:
+        if node.__class__ is str and merged and merged[-1].__class__ is str:
+            merged[-1] += node
+        else:
+            merged.append(node)
+    
+    if strip and merged:
+        if merged[0].__class__ is str:
+            merged[0] = merged[0].lstrip()
+        if merged[-1].__class__ is str:
+            merged[-1] = merged[-1].rstrip()
+    
+    return tuple(node for node in merged if node != "")
+
+
+class _Compiler:
+    """把文本编译为语法树（只在缓存未命中时运行）"""
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.pairs, _, _ = _match_braces(text)
+        self.group_count = 0
+        
+        # 内部（任意深度）含有空 {} 的组整体按字面量保留，与逐层正则替换时的结果一致
+        self.literal_opens = set()
+        for open_pos, close_pos in self.pairs.items():
+            if close_pos == open_pos + 1:
+                self._mark_literal_ancestors(open_pos, close_pos)
+        self._mark_emptied_groups()
+    
+    def _mark_literal_ancestors(self, open_pos: int, close_pos: int):
+        """把包含 [open_pos, close_pos] 的所有外层组标记为字面量"""
+        self.literal_opens.update(
+            outer for outer, outer_close in self.pairs.items()
+            if outer < open_pos and outer_close > close_pos
+        )
+    
+    def _mark_emptied_groups(self):
+        """
+        找出内容被替换为空字符串的组（如 {{ }}：内层组选项全为空，替换后外层只剩 {}）
+        
+        逐层替换时这样的组变成字面量 {}，不再匹配，外层组也随之整体保留为字面量。
+        组是否渲染为空与随机选择无关（被选中的选项总是非空），因此可以在编译时确定：
+        由内向外检查每个组，记录选项全为空（渲染为空字符串）的组。
+        """
+        text = self.text
+        pairs = self.pairs
+        blank_groups = set()
+        for open_pos, close_pos in sorted(pairs.items(), key=lambda pair: pair[1] - pair[0]):
+            if close_pos == open_pos + 1 or open_pos in self.literal_opens:
+                continue
+            
+            # 内层组已经处理过（更短）；不是字面量的外层组中，内层组只可能渲染为空或非空文本
+            has_text = False  # 内容中是否有字面量字符
+            has_content = False  # 当前选项是否有非空白内容
+            all_blank = True
+            pos = open_pos + 1
+            while pos < close_pos:
+                char = text[pos]
+                if char == '{' and pos in pairs:
+                    if pos not in blank_groups:
+                        has_text = has_content = True
+                    pos = pairs[pos] + 1
+                    continue
+                has_text = True
+                if char == '|':
+                    all_blank = all_blank and not has_content
+                    has_content = False
+                elif not char.isspace():
+                    has_content = True
+                pos += 1
+            all_blank = all_blank and not has_content
+            
+            if not has_text:
+                # 内容只由渲染为空的组构成：替换后成为字面量 {}
+                self.literal_opens.add(open_pos)
+                self._mark_literal_ancestors(open_pos, close_pos)
+            elif all_blank:
+                blank_groups.add(open_pos)
+    
+    def parse_sequence(self, start: int, end: int, in_group: bool) -> List[list]:
+        """
+        解析 [start, end) 区间
+        
+        Returns:
+            选项列表（不在选项组内时只有一个），每个选项为未整理的节点列表
+        """
+        text = self.text
+        pairs = self.pairs
+        literal_opens = self.literal_opens
+        alternatives = [[]]
+        literal_start = start
+        pos = start
+        
+        while pos < end:
+            char = text[pos]
+            if char == '{' and pos in pairs and pairs[pos] > pos + 1 and pos not in literal_opens:
+                if literal_start < pos:
+                    alternatives[-1].append(text[literal_start:pos])
+                close = pairs[pos]
+                group = self.parse_group(pos + 1, close)
+                # 选项全为空的组渲染为空字符串，直接省略
+                if group is not None:
+                    alternatives[-1].append(group)
+                pos = close + 1
+                literal_start = pos
+            elif char == '{' and pairs.get(pos) == pos + 1:
+                # 空的 {} 按原样保留为字面量
+                pos += 2
+            elif char == '|' and in_group:
+                if literal_start < pos:
+                    alternatives[-1].append(text[literal_start:pos])
+                alternatives.append([])
+                pos += 1
+                literal_start = pos
+            else:
+                pos += 1
+        
+        if literal_start < end:
+            alternatives[-1].append(text[literal_start:end])
+        return alternatives
+    
+    def parse_group(self, start: int, end: int) -> Optional[_Group]:
+        """解析选项组内容（不含两侧大括号），选项全为空时返回 None"""
+        self.group_count += 1
+        alternatives = []
+        for nodes in self.parse_sequence(start, end, in_group=True):
+            sequence = _finish_sequence(nodes, strip=True)
+            # 过滤空选项（与逐层替换时 opt.strip() 为空即丢弃的规则一致）
+            if sequence:
+                alternatives.append(sequence)
+        return _Group(tuple(alternatives)) if alternatives else None
+
+
+class SpintaxTemplate:
+    """编译后的 Spintax 模板（不可变，可在多线程间共享）"""
+    
+    __slots__ = ("source", "nodes", "has_groups", "variations")
+    
+    def __init__(self, source: str):
+        """
+        Args:
+            source: 原始文本
+        """
+        compiler = _Compiler(source)
+        nodes = compiler.parse_sequence(0, len(source), in_group=False)[0]
+        
+        self.source = source
+        self.nodes: Tuple[_Node, ...] = _finish_sequence(nodes, strip=False)
+        # 是否包含选项组（包括选项全为空、渲染为空字符串的组）
+        self.has_groups = compiler.group_count > 0
+        self.variations = _sequence_variations(self.nodes)
+    
+    def render(self, rng: Optional[random.Random] = None) -> str:
+        """
+        用随机数生成器渲染一个变体
+        
+        Args:
+            rng: 随机数生成器（可选，默认使用全局 random）
+        
+        Returns:
+            渲染后的文本
+        """
+        if not self.has_groups:
+            return self.source
+        out = []
+        _render_nodes(self.nodes, rng or random, out)
+        return "".join(out)
+    
+    def unrank(self, rank: int) -> str:
+        """
+        取编号为 rank 的变体（不同编号对应不同的选项组合）
+        
+        Args:
+            rank: 变体编号（0 <= rank < variations）
+        
+        Returns:
+            变体文本
+        
+        Raises:
+            IndexError: 编号超出范围
+        """
+        if not 0 <= rank < self.variations:
+            raise IndexError(f"变体编号超出范围: {rank}（共 {self.variations} 个变体）")
+        if not self.has_groups:
+            return self.source
+        out = []
+        _unrank_nodes(self.nodes, rank, out)
+        return "".join(out)
+    
+    def iter_unique(self, rng: Optional[random.Random] = None):
+        """
+        按伪随机顺序无放回地逐个生成变体（每种选项组合恰好出现一次，不占额外内存）
+        
+        Args:
+            rng: 随机数生成器（决定抽取顺序）
+        
+        Yields:
+            变体文本
+        """
+        for rank in IndexPermutation(self.variations, rng):
+            yield self.unrank(rank)
+
+
+@lru_cache(maxsize=8192)
+def _compile_cached(text: str) -> SpintaxTemplate:
+    return SpintaxTemplate(text)
+
 
 class SpintaxParser:
     """Spintax 语法解析器"""
     
-    # 匹配 {A|B|C} 格式的正则表达式
+    # 匹配最内层 {A|B|C} 的正则表达式
     PATTERN = r'\{([^{}]+)\}'
+    _PATTERN_RE = re.compile(PATTERN)
+    
+    @staticmethod
+    def compile(text: str) -> SpintaxTemplate:
+        """
+        编译 Spintax 文本（按文本缓存，同一单元格只解析一次）
+        
+        Args:
+            text: 包含 Spintax 语法的文本
+            
+        Returns:
+            编译后的模板
+        """
+        return _compile_cached(text or "")
     
     @staticmethod
-    def parse(text: str) -> str:
+    def parse(text: str, rng: Optional[random.Random] = None) -> str:
         """
         解析 Spintax 语法，随机选择选项
         
         Args:
             text: 包含 Spintax 语法的文本
+            rng: 随机数生成器（可选，默认使用全局 random）
             
         Returns:
             解析后的文本
@@ -29,21 +346,7 @@ class SpintaxParser:
         if not text:
             return text
         
-        def replace_spintax(match):
-            """替换单个 Spintax 匹配"""
-            options = match.group(1).split('|')
-            # 过滤空选项
-            options = [opt.strip() for opt in options if opt.strip()]
-            if not options:
-                return ''
-            return random.choice(options)
-        
-        # 递归替换所有 Spintax
-        result = text
-        while re.search(SpintaxParser.PATTERN, result):
-            result = re.sub(SpintaxParser.PATTERN, replace_spintax, result)
-        
-        return result
+        return _compile_cached(text).render(rng)
     
     @staticmethod
     def has_spintax(text: str) -> bool:
@@ -56,12 +359,12 @@ class SpintaxParser:
         Returns:
             是否包含 Spintax
         """
-        return bool(re.search(SpintaxParser.PATTERN, text))
+        return bool(text) and _compile_cached(text).has_groups
     
     @staticmethod
     def get_spintax_count(text: str) -> int:
         """
-        获取文本中 Spintax 的数量
+        获取文本中（最内层）Spintax 的数量
         
         Args:
             text: 文本内容
@@ -69,12 +372,12 @@ class SpintaxParser:
         Returns:
             Spintax 数量
         """
-        return len(re.findall(SpintaxParser.PATTERN, text))
+        return len(SpintaxParser._PATTERN_RE.findall(text))
     
     @staticmethod
     def get_spintax_options(text: str) -> List[List[str]]:
         """
-        获取所有 Spintax 的选项列表
+        获取所有（最内层）Spintax 的选项列表
         
         Args:
             text: 文本内容
@@ -82,13 +385,13 @@ class SpintaxParser:
         Returns:
             选项列表的列表
         """
-        matches = re.findall(SpintaxParser.PATTERN, text)
+        matches = SpintaxParser._PATTERN_RE.findall(text)
         return [match.split('|') for match in matches]
     
     @staticmethod
     def calculate_variations(text: str) -> int:
         """
-        计算文本可能的变体数量
+        计算文本可能的变体数量（支持嵌套：同一组内各选项相加，并列的组相乘）
         
         Args:
             text: 文本内容
@@ -96,50 +399,112 @@ class SpintaxParser:
         Returns:
             变体数量
         """
-        options_list = SpintaxParser.get_spintax_options(text)
-        if not options_list:
+        if not text:
             return 1
+        return _compile_cached(text).variations
+    
+    @staticmethod
+    def unrank(text: str, rank: int) -> str:
+        """
+        取文本编号为 rank 的变体
         
-        # 计算所有选项数量的乘积
-        variations = 1
-        for options in options_list:
-            variations *= len(options)
+        Args:
+            text: 包含 Spintax 语法的文本
+            rank: 变体编号（0 <= rank < calculate_variations(text)）
+            
+        Returns:
+            变体文本
+        """
+        return _compile_cached(text or "").unrank(rank)
+    
+    @staticmethod
+    def sample_unique(text: str, count: int, rng: Optional[random.Random] = None) -> List[str]:
+        """
+        无放回地随机抽取互不相同的变体（无需查重重试）
         
-        return variations
+        Args:
+            text: 包含 Spintax 语法的文本
+            count: 需要的数量（超过变体数时只返回全部变体）
+            rng: 随机数生成器（可选，默认使用全局 random）
+            
+        Returns:
+            变体列表（选项组合互不相同）
+        """
+        template = _compile_cached(text or "")
+        if count > template.variations:
+            logger.warning(f"需要 {count} 个不同变体，但文本只有 {template.variations} 种组合")
+        
+        permutation = IndexPermutation(template.variations, rng)
+        return [template.unrank(permutation[i]) for i in range(min(count, template.variations))]
     
     @staticmethod
-    def validate(text: str) -> tuple[bool, str]:
+    def find_errors(text: str) -> List[Tuple[int, str]]:
         """
-        验证 Spintax 语法是否正确
+        查找 Spintax 语法错误
         
         Args:
             text: 文本内容
             
         Returns:
-            (是否有效, 错误信息)
+            [(字符位置(从0开始), 错误信息)]，按位置排序
         """
         if not text:
-            return True, ""
+            return []
         
-        # 检查大括号是否匹配
-        if text.count('{') != text.count('}'):
-            return False, "大括号不匹配"
+        pairs, unmatched_open, unmatched_close = _match_braces(text)
+        errors = [(pos, "'{' 没有对应的 '}'") for pos in unmatched_open]
+        errors += [(pos, "'}' 没有对应的 '{'") for pos in unmatched_close]
         
-        # 检查每个 Spintax 格式
-        matches = re.finditer(SpintaxParser.PATTERN, text)
-        for match in matches:
-            content = match.group(1)
+        for open_pos, close_pos in pairs.items():
+            if close_pos == open_pos + 1:
+                errors.append((open_pos, "空的 Spintax: {}"))
+                continue
             
-            # 检查是否包含 |
-            if '|' not in content:
-                return False, f"Spintax 格式错误: {{{content}}}, 缺少 '|' 分隔符"
+            # 按本层的 '|' 切分选项（跳过嵌套组内部）
+            option_starts = [open_pos + 1]
+            pos = open_pos + 1
+            while pos < close_pos:
+                if text[pos] == '{' and pos in pairs:
+                    pos = pairs[pos] + 1
+                    continue
+                if text[pos] == '|':
+                    option_starts.append(pos + 1)
+                pos += 1
             
-            # 检查选项是否为空
-            options = content.split('|')
-            if any(not opt.strip() for opt in options):
-                return False, f"Spintax 包含空选项: {{{content}}}"
+            snippet = text[open_pos:close_pos + 1]
+            if len(snippet) > 30:
+                snippet = snippet[:27] + "..."
+            if len(option_starts) == 1:
+                errors.append((open_pos, f"Spintax 格式错误: {snippet}, 缺少 '|' 分隔符"))
+                continue
+            
+            option_ends = [start - 1 for start in option_starts[1:]] + [close_pos]
+            for start, end in zip(option_starts, option_ends):
+                if not text[start:end].strip():
+                    errors.append((start, f"Spintax 包含空选项: {snippet}"))
+                    break
+        
+        return sorted(errors)
+    
+    @staticmethod
+    def validate(text: str) -> tuple[bool, str]:
+        """
+        验证 Spintax 语法是否正确
+        
+        Args:
+            text: 文本内容
+            
+        Returns:
+            (是否有效, 错误信息（含出错位置，多个错误只报告第一个）)
+        """
+        errors = SpintaxParser.find_errors(text)
+        if not errors:
+            return True, ""
         
-        return True, ""
+        pos, message = errors[0]
+        if len(errors) > 1:
+            return False, f"第 {pos + 1} 个字符: {message}（另有 {len(errors) - 1} 处错误）"
+        return False, f"第 {pos + 1} 个字符: {message}"
 
 
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+"""
+跨批次均衡轮换
+混排选内容时优先选用累计使用次数少的单元格，使素材的长期曝光保持均匀。
+
+每次抽取随机取若干候选，选其中使用次数最少的一个（"多选一"加权抽样）：
+使用次数越少被选中的概率越大，但不会让一条新内容占满整批文档；
+使用次数相同时选最久没有用过的一个。
+使用次数和最近使用时间按内容 MD5 持久化在 cell_usage 表中，由 UsageAccumulator
+在内存中累加，批次结束（以及按配置每隔一段时间）一次性写入。
+"""
+
+import hashlib
+import time
+from typing import Dict, List
+from loguru import logger
+
+
+class UsageBalancedRotation:
+    """按使用次数均衡的单元格轮换分配器"""
+    
+    def __init__(self, columns_data: List[List[str]], usage_manager, choices: int = 2,
+                 flush_interval: float = 0):
+        """
+        初始化轮换分配器
+        
+        Args:
+            columns_data: 按列组织的有效内容
+            usage_manager: CellUsageManager 实例
+            choices: 每次抽取比较的候选数（1 表示纯随机）
+            flush_interval: 使用次数定期写入间隔（秒），0 表示只在批次结束时写入
+        """
+        from ..database.usage_manager import UsageAccumulator
+        
+        self.usage_manager = usage_manager
+        self.choices = max(1, choices)
+        # 本批次新增的使用次数（内存中累加，定期和批次结束时写入数据库）
+        self.accumulator = UsageAccumulator(usage_manager, flush_interval)
+        
+        # 每列的内容、哈希与使用次数（数组存储，按下标 O(1) 抽取）
+        self._items: List[List[str]] = [list(dict.fromkeys(col_data)) for col_data in columns_data]
+        self._positions: List[Dict[str, int]] = [
+            {item: idx for idx, item in enumerate(items)}
+            for items in self._items
+        ]
+        self._hashes: List[List[str]] = [
+            [hashlib.md5(item.encode('utf-8')).hexdigest() for item in items]
+            for items in self._items
+        ]
+        
+        stored = usage_manager.get_usage_stats(h for hashes in self._hashes for h in hashes)
+        self._counts: List[List[int]] = [
+            [stored[h][0] if h in stored else 0 for h in hashes]
+            for hashes in self._hashes
+        ]
+        # 最近使用时间戳（从未使用为 0）
+        self._last_used: List[List[float]] = [
+            [stored[h][1].timestamp() if h in stored and stored[h][1] else 0.0 for h in hashes]
+            for hashes in self._hashes
+        ]
+        
+        known = sum(1 for hashes in self._hashes for h in hashes if h in stored)
+        total = sum(len(hashes) for hashes in self._hashes)
+        logger.info(f"均衡轮换已启用: {total} 条内容，其中 {known} 条有历史使用记录")
+    
+    def choose(self, col_idx: int, rng) -> str:
+        """
+        为某一列选择内容
+        
+        Args:
+            col_idx: 列索引
+            rng: 随机数生成器
+        
+        Returns:
+            选中的内容（空列返回空字符串）
+        """
+        items = self._items[col_idx]
+        if not items:
+            return ""
+        
+        counts = self._counts[col_idx]
+        last_used = self._last_used[col_idx]
+        size = len(items)
+        best = rng.randrange(size)
+        for _ in range(self.choices - 1):
+            candidate = rng.randrange(size)
+            if (counts[candidate], last_used[candidate]) < (counts[best], last_used[best]):
+                best = candidate
+        return items[best]
+    
+    def record(self, row: List[str]):
+        """
+        记录一篇文档实际使用的内容（混排策略删除的列不计数）
+        
+        Args:
+            row: 应用策略后的每列内容
+        """
+        now = time.time()
+        for col_idx, item in enumerate(row[:len(self._items)]):
+            if not item:
+                continue
+            position = self._positions[col_idx].get(item)
+            if position is None:
+                continue
+            self._counts[col_idx][position] += 1
+            self._last_used[col_idx][position] = now
+            self.accumulator.add(self._hashes[col_idx][position])
+    
+    def flush(self) -> bool:
+        """
+        把尚未写入的使用次数写入数据库（一个事务）
+        
+        Returns:
+            是否成功
+        """
+        return self.accumulator.flush()
@@ -22,6 +22,8 @@ from selenium.common.exceptions import TimeoutException, WebDriverException
 
 from PyQt6.QtCore import QThread, pyqtSignal
 
+from ..utils.tracing import trace_counters
+
 
 class ZhihuMonitorWorker(QThread):
     """知乎监测工作线程"""
@@ -467,6 +469,7 @@ class ZhihuMonitorWorker(QThread):
         Returns:
             结果字典或None
         """
+        counters_before = trace_counters.snapshot()
         try:
             logger.info("="*60)
             logger.info(f"🎯 开始检测: {url}")
@@ -747,7 +750,8 @@ class ZhihuMonitorWorker(QThread):
                     try:
                         answer_elem.find_element(By.CLASS_NAME, 'RichContent')
                     except:
-                        logger.debug(f"第 {rank} 个元素不包含 RichContent，跳过（可能是广告）")
+                        trace_counters.count("zhihu.answer_skipped")
+                        logger.trace("第 {} 个元素不包含 RichContent，跳过（可能是广告）", rank)
                         continue
                     
                     # 提取回答内容 - 使用 textContent 获取隐藏内容
@@ -766,13 +770,15 @@ class ZhihuMonitorWorker(QThread):
                         logger.warning(f"第 {rank} 个回答内容为空")
                         continue
                     
-                    # 输出前100字用于调试
-                    logger.info(f"第 {rank} 名回答前100字: {content_text[:100]}")
+                    # 输出前100字用于调试（仅 TRACE 级别，逐条回答不写 INFO 日志）
+                    trace_counters.count("zhihu.answer_scanned")
+                    logger.trace("第 {} 名回答前100字: {}", rank, content_text[:100])
                     
                     # 检查是否包含目标品牌（不区分大小写）
                     if self._match_brand(content_text, target_brand):
                         found_ranks.append(rank)
-                        logger.info(f"在第 {rank} 名发现品牌: {target_brand}")
+                        trace_counters.count("zhihu.brand_hit")
+                        logger.debug("在第 {} 名发现品牌: {}", rank, target_brand)
                     
                     # 收集Top10详细信息
                     if rank <= 10 and rank <= len(answers):
@@ -818,7 +824,7 @@ class ZhihuMonitorWorker(QThread):
                         
                         if vote_text:
                             vote_count = self._parse_vote_count(vote_text)
-                            logger.info(f"  第{rank}名 赞同: '{vote_text}' -> {vote_count}")
+                            logger.debug("  第{}名 赞同: '{}' -> {}", rank, vote_text, vote_count)
                         else:
                             logger.warning(f"  第{rank}名 未找到赞同数")
                         
@@ -833,10 +839,10 @@ class ZhihuMonitorWorker(QThread):
                             # 关键判断：如果是"添加评论"，强制设为 0
                             if "添加评论" in comment_text:
                                 comment_count = 0
-                                logger.info(f"  第{rank}名 评论: '添加评论' -> 0")
+                                logger.debug("  第{}名 评论: '添加评论' -> 0", rank)
                             else:
                                 comment_count = self._parse_comment_count(comment_text)
-                                logger.info(f"  第{rank}名 评论: '{comment_text}' -> {comment_count}")
+                                logger.debug("  第{}名 评论: '{}' -> {}", rank, comment_text, comment_count)
                         except:
                             logger.debug(f"  第{rank}名 未找到评论数")
                         
@@ -881,6 +887,7 @@ class ZhihuMonitorWorker(QThread):
             }
             
             logger.success(f"检测完成: 找到{len(found_ranks)}个排名, 收集{len(top10_details)}条Top10数据")
+            trace_counters.log_summary("本问题扫描统计", counters_before, prefix="zhihu.")
             
             return result
             
@@ -1596,7 +1603,8 @@ class ZhihuDetailedWorker(QThread):
                     try:
                         answer_elem.find_element(By.CLASS_NAME, 'RichContent')
                     except:
-                        logger.debug(f"[详情] 第 {rank} 个元素不包含 RichContent，跳过")
+                        trace_counters.count("zhihu.answer_skipped")
+                        logger.trace("[详情] 第 {} 个元素不包含 RichContent，跳过", rank)
                         continue
                     
                     # 滚动到该元素
@@ -1652,7 +1660,7 @@ class ZhihuDetailedWorker(QThread):
                     
                     if vote_text:
                         vote_count = self._parse_vote_count(vote_text)
-                        logger.info(f"  [详情] 第{rank}名 赞同: '{vote_text}' -> {vote_count}")
+                        logger.debug("  [详情] 第{}名 赞同: '{}' -> {}", rank, vote_text, vote_count)
                     else:
                         logger.debug(f"  [详情] 第{rank}名 未找到赞同数")
                     
@@ -1667,10 +1675,10 @@ class ZhihuDetailedWorker(QThread):
                         # 关键判断：如果是"添加评论"，强制设为 0
                         if "添加评论" in comment_text:
                             comment_count = 0
-                            logger.info(f"  [详情] 第{rank}名 评论: '添加评论' -> 0")
+                            logger.debug("  [详情] 第{}名 评论: '添加评论' -> 0", rank)
                         else:
                             comment_count = self._parse_comment_count(comment_text)
-                            logger.info(f"  [详情] 第{rank}名 评论: '{comment_text}' -> {comment_count}")
+                            logger.debug("  [详情] 第{}名 评论: '{}' -> {}", rank, comment_text, comment_count)
                     except:
                         logger.debug(f"  [详情] 第{rank}名 未找到评论数")
                     
@@ -0,0 +1,156 @@
+"""
+对比表读缓存
+ComparisonDBManager 的读取方法（类目、品牌、参数、表格数据、配置、任务）按参数缓存结果，
+所有实例共享一个全局数据版本号：任何写入方法提交后版本号加一并清空缓存，
+之后的读取重新查询数据库。
+
+缓存的结果是只读快照（ORM 对象 → RecordSnapshot，dict → MappingProxyType，list → tuple），
+生成线程和界面线程可以同时读取同一份结果而不会互相改坏。
+"""
+
+import inspect
+import threading
+from types import MappingProxyType, MethodType
+from typing import Callable, Dict, Hashable, Tuple, TypeVar
+from sqlalchemy import inspect as sa_inspect
+
+
+T = TypeVar("T")
+
+
+class RecordSnapshot:
+    """
+    ORM 对象的只读快照
+    列属性按值保存；模型上的普通方法（to_dict、get_style_dict 等）照常可用，
+    修改属性的方法（set_style_dict 等）会因快照只读而抛出 AttributeError。
+    """
+    
+    __slots__ = ("_model", "_values")
+    
+    def __init__(self, obj):
+        """
+        Args:
+            obj: 已加载的 ORM 对象（会话关闭前调用）
+        """
+        model = type(obj)
+        values = {attr.key: getattr(obj, attr.key) for attr in sa_inspect(model).column_attrs}
+        object.__setattr__(self, "_model", model)
+        object.__setattr__(self, "_values", MappingProxyType(values))
+    
+    @property
+    def model(self) -> type:
+        """快照对应的 ORM 模型类"""
+        return self._model
+    
+    def __getattr__(self, name: str):
+        values = self._values
+        if name in values:
+            return values[name]
+        method = getattr(self._model, name, None)
+        if inspect.isfunction(method):
+            return MethodType(method, self)
+        raise AttributeError(f"{self._model.__name__} 快照没有属性 {name!r}")
+    
+    def __setattr__(self, name: str, value):
+        raise AttributeError(f"{self._model.__name__} 快照是只读的，不能设置 {name!r}")
+    
+    def __delattr__(self, name: str):
+        raise AttributeError(f"{self._model.__name__} 快照是只读的，不能删除 {name!r}")
+    
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, RecordSnapshot):
+            return NotImplemented
+        return self._model is other._model and dict(self._values) == dict(other._values)
+    
+    def __hash__(self) -> int:
+        return hash((self._model, self._values.get("id")))
+    
+    def __repr__(self) -> str:
+        return f"<{self._model.__name__} 快照 id={self._values.get('id')}>"
+
+
+def freeze(value):
+    """
+    把查询结果转换为只读快照（递归）
+    
+    Args:
+        value: ORM 对象、dict、list/tuple/set 或标量
+    
+    Returns:
+        RecordSnapshot / MappingProxyType / tuple / frozenset / 原标量
+    """
+    if isinstance(value, (RecordSnapshot, MappingProxyType)):
+        return value
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    if hasattr(type(value), "__mapper__"):
+        return RecordSnapshot(value)
+    return value
+
+
+class VersionedReadCache:
+    """按全局数据版本号失效的读缓存（线程安全）"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._entries: Dict[Hashable, object] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    @property
+    def version(self) -> int:
+        """当前数据版本号（每次写入提交后加一）"""
+        return self._version
+    
+    def bump(self) -> int:
+        """
+        数据已变化：版本号加一并丢弃所有缓存结果
+        
+        Returns:
+            新的版本号
+        """
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            return self._version
+    
+    def get(self, key: Hashable, loader: Callable[[], T]) -> T:
+        """
+        读取缓存结果，没有时调用 loader 查询并缓存其只读快照
+        
+        loader 在锁外执行（不阻塞其他线程的命中读取）；查询期间版本号变化（有写入提交）时，
+        结果照常返回但不缓存，避免把写入前读到的旧数据留在新版本的缓存里。
+        
+        Args:
+            key: 缓存键（方法名 + 参数）
+            loader: 查询函数
+        
+        Returns:
+            只读快照
+        """
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            version = self._version
+        
+        value = freeze(loader())
+        
+        with self._lock:
+            if self._version == version:
+                self._entries.setdefault(key, value)
+        return value
+    
+    def stats(self) -> Tuple[int, int, int]:
+        """
+        Returns:
+            (版本号, 命中次数, 未命中次数)
+        """
+        with self._lock:
+            return self._version, self.hits, self.misses
@@ -3,8 +3,10 @@
 提供对比表的增删改查接口
 """
 
-from typing import List, Optional, Dict, Tuple
-from sqlalchemy import and_
+from dataclasses import dataclass, field
+from typing import Iterable, List, Mapping, Optional, Dict, Set, Tuple
+from sqlalchemy import and_, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from loguru import logger
 
@@ -14,10 +16,50 @@ from .models import (
     ComparisonTask, TaskParameterSelection
 )
 from .db_manager import DatabaseManager
+from .comparison_cache import RecordSnapshot, VersionedReadCache
+
+
+@dataclass
+class ComparisonCellChange:
+    """一个单元格的变更"""
+    
+    brand_id: int
+    parameter_id: int
+    old_value: Optional[str]  # 原值（新单元格为 None）
+    new_value: str
+
+
+@dataclass
+class ComparisonUpsertReport:
+    """批量写入结果（变更明细供图片缓存按单元格失效）"""
+    
+    category_id: int
+    added_brands: List[str] = field(default_factory=list)  # 新建的品牌
+    added_parameters: List[str] = field(default_factory=list)  # 新建的参数
+    changes: List[ComparisonCellChange] = field(default_factory=list)  # 新增或值有变化的单元格
+    unchanged: int = 0  # 值未变化（未写入）的单元格数
+    
+    @property
+    def changed_cells(self) -> Set[Tuple[int, int]]:
+        """变化的单元格 {(brand_id, parameter_id)}"""
+        return {(change.brand_id, change.parameter_id) for change in self.changes}
+    
+    @property
+    def changed(self) -> bool:
+        """是否有任何变化"""
+        return bool(self.added_brands or self.added_parameters or self.changes)
 
 
 class ComparisonDBManager:
-    """对比表数据库管理器"""
+    """
+    对比表数据库管理器
+    
+    读取方法返回缓存的只读快照（ORM 对象为 RecordSnapshot，列表为 tuple，字典为 MappingProxyType），
+    缓存由所有实例共享，任何写入方法提交后整体失效（见 comparison_cache）。
+    """
+    
+    # 所有实例共享：生成线程和界面各自创建的管理器看到同一个数据版本
+    _cache = VersionedReadCache()
     
     def __init__(self):
         """初始化管理器"""
@@ -27,6 +69,23 @@ class ComparisonDBManager:
         """获取数据库会话"""
         return self.db.get_session()
     
+    @property
+    def data_version(self) -> int:
+        """对比表数据版本号（每次写入提交后加一，可用于判断派生结果是否过期）"""
+        return self._cache.version
+    
+    def _invalidate(self):
+        """写入已提交：数据版本号加一，缓存的读取结果全部失效"""
+        self._cache.bump()
+    
+    def _query(self, query):
+        """在独立会话中执行查询函数 query(session)，返回其结果"""
+        session = self.get_session()
+        try:
+            return query(session)
+        finally:
+            session.close()
+    
     # ==================== 类目管理 ====================
     
     def add_category(self, name: str, icon: str = None) -> Optional[ComparisonCategory]:
@@ -54,6 +113,7 @@ class ComparisonDBManager:
             category = ComparisonCategory(name=name, icon=icon)
             session.add(category)
             session.commit()
+            self._invalidate()
             session.refresh(category)
             
             logger.info(f"添加类目成功: {name}")
@@ -77,6 +137,7 @@ class ComparisonDBManager:
             if category:
                 session.delete(category)
                 session.commit()
+                self._invalidate()
                 logger.info(f"删除类目成功: ID={category_id}")
                 return True
             else:
@@ -108,6 +169,7 @@ class ComparisonDBManager:
                 category.icon = icon
             
             session.commit()
+            self._invalidate()
             logger.info(f"更新类目成功: ID={category_id}")
             return True
             
@@ -118,25 +180,21 @@ class ComparisonDBManager:
         finally:
             session.close()
     
-    def get_all_categories(self) -> List[ComparisonCategory]:
-        """获取所有类目"""
-        session = self.get_session()
-        try:
-            return session.query(ComparisonCategory).order_by(
+    def get_all_categories(self) -> Tuple[RecordSnapshot, ...]:
+        """获取所有类目（只读快照，带缓存）"""
+        return self._cache.get(("categories",), lambda: self._query(
+            lambda session: session.query(ComparisonCategory).order_by(
                 ComparisonCategory.created_at.desc()
             ).all()
-        finally:
-            session.close()
+        ))
     
-    def get_category_by_id(self, category_id: int) -> Optional[ComparisonCategory]:
-        """根据ID获取类目"""
-        session = self.get_session()
-        try:
-            return session.query(ComparisonCategory).filter(
+    def get_category_by_id(self, category_id: int) -> Optional[RecordSnapshot]:
+        """根据ID获取类目（只读快照，带缓存）"""
+        return self._cache.get(("category", category_id), lambda: self._query(
+            lambda session: session.query(ComparisonCategory).filter(
                 ComparisonCategory.id == category_id
             ).first()
-        finally:
-            session.close()
+        ))
     
     # ==================== 品牌管理 ====================
     
@@ -164,6 +222,7 @@ class ComparisonDBManager:
             )
             session.add(brand)
             session.commit()
+            self._invalidate()
             session.refresh(brand)
             
             logger.info(f"添加品牌成功: {name}")
@@ -187,6 +246,7 @@ class ComparisonDBManager:
             if brand:
                 session.delete(brand)
                 session.commit()
+                self._invalidate()
                 logger.info(f"删除品牌成功: ID={brand_id}")
                 return True
             return False
@@ -214,6 +274,7 @@ class ComparisonDBManager:
                     setattr(brand, key, value)
             
             session.commit()
+            self._invalidate()
             logger.info(f"更新品牌成功: ID={brand_id}")
             return True
             
@@ -224,15 +285,13 @@ class ComparisonDBManager:
         finally:
             session.close()
     
-    def get_brands_by_category(self, category_id: int) -> List[ComparisonBrand]:
-        """获取类目下的所有品牌"""
-        session = self.get_session()
-        try:
-            return session.query(ComparisonBrand).filter(
+    def get_brands_by_category(self, category_id: int) -> Tuple[RecordSnapshot, ...]:
+        """获取类目下的所有品牌（只读快照，带缓存）"""
+        return self._cache.get(("brands", category_id), lambda: self._query(
+            lambda session: session.query(ComparisonBrand).filter(
                 ComparisonBrand.category_id == category_id
             ).order_by(ComparisonBrand.sort_order).all()
-        finally:
-            session.close()
+        ))
     
     # ==================== 参数管理 ====================
     
@@ -259,6 +318,7 @@ class ComparisonDBManager:
             )
             session.add(parameter)
             session.commit()
+            self._invalidate()
             session.refresh(parameter)
             
             logger.info(f"添加参数成功: {name}")
@@ -282,6 +342,7 @@ class ComparisonDBManager:
             if parameter:
                 session.delete(parameter)
                 session.commit()
+                self._invalidate()
                 logger.info(f"删除参数成功: ID={parameter_id}")
                 return True
             return False
@@ -309,6 +370,7 @@ class ComparisonDBManager:
                     setattr(parameter, key, value)
             
             session.commit()
+            self._invalidate()
             logger.info(f"更新参数成功: ID={parameter_id}")
             return True
             
@@ -319,43 +381,28 @@ class ComparisonDBManager:
         finally:
             session.close()
     
-    def get_parameters_by_category(self, category_id: int) -> List[ComparisonParameter]:
-        """获取类目下的所有参数"""
-        session = self.get_session()
-        try:
-            return session.query(ComparisonParameter).filter(
+    def get_parameters_by_category(self, category_id: int) -> Tuple[RecordSnapshot, ...]:
+        """获取类目下的所有参数（只读快照，带缓存）"""
+        return self._cache.get(("parameters", category_id), lambda: self._query(
+            lambda session: session.query(ComparisonParameter).filter(
                 ComparisonParameter.category_id == category_id
             ).order_by(ComparisonParameter.sort_order).all()
-        finally:
-            session.close()
+        ))
     
     # ==================== 数值管理 ====================
     
     def set_value(self, category_id: int, brand_id: int, parameter_id: int, value: str) -> bool:
-        """设置参数值"""
+        """设置参数值（按 (brand_id, parameter_id) 唯一索引 upsert，一条语句）"""
         session = self.get_session()
         try:
-            # 查找是否已存在
-            existing = session.query(ComparisonValue).filter(
-                and_(
-                    ComparisonValue.category_id == category_id,
-                    ComparisonValue.brand_id == brand_id,
-                    ComparisonValue.parameter_id == parameter_id
-                )
-            ).first()
-            
-            if existing:
-                existing.value = value
-            else:
-                new_value = ComparisonValue(
-                    category_id=category_id,
-                    brand_id=brand_id,
-                    parameter_id=parameter_id,
-                    value=value
-                )
-                session.add(new_value)
-            
+            session.execute(self._upsert_value_statement(), [{
+                "category_id": category_id,
+                "brand_id": brand_id,
+                "parameter_id": parameter_id,
+                "value": value,
+            }])
             session.commit()
+            self._invalidate()
             return True
             
         except Exception as e:
@@ -365,6 +412,106 @@ class ComparisonDBManager:
         finally:
             session.close()
     
+    def set_values(self, category_id: int, values: Dict[Tuple[int, int], str]) -> Optional[ComparisonUpsertReport]:
+        """
+        批量设置参数值（一个事务：一次读取现有值，只 upsert 有变化的单元格）
+        
+        Args:
+            category_id: 类目ID
+            values: {(brand_id, parameter_id): 值}
+            
+        Returns:
+            ComparisonUpsertReport，失败返回 None
+        """
+        session = self.get_session()
+        try:
+            report = ComparisonUpsertReport(category_id)
+            self._upsert_values(session, category_id, values, report)
+            session.commit()
+            self._invalidate()
+            logger.info(f"批量设置参数值: 类目ID={category_id}, 变化 {len(report.changes)} 格")
+            return report
+        except Exception as e:
+            session.rollback()
+            logger.error(f"批量设置参数值失败: {e}")
+            return None
+        finally:
+            session.close()
+    
+    @staticmethod
+    def _upsert_value_statement():
+        """INSERT ... ON CONFLICT(brand_id, parameter_id) DO UPDATE 语句（executemany 参数见 set_value）"""
+        statement = sqlite_insert(ComparisonValue)
+        return statement.on_conflict_do_update(
+            index_elements=[ComparisonValue.brand_id, ComparisonValue.parameter_id],
+            set_={"value": statement.excluded.value, "category_id": statement.excluded.category_id}
+        )
+    
+    def _upsert_values(self, session: Session, category_id: int, values: Dict[Tuple[int, int], str],
+                       report: ComparisonUpsertReport):
+        """在给定会话中写入有变化的单元格，并把变更记入 report（不提交）"""
+        existing = dict(
+            ((brand_id, parameter_id), value)
+            for brand_id, parameter_id, value in session.query(
+                ComparisonValue.brand_id, ComparisonValue.parameter_id, ComparisonValue.value
+            ).filter(ComparisonValue.category_id == category_id)
+        )
+        
+        params = []
+        for (brand_id, parameter_id), value in values.items():
+            old_value = existing.get((brand_id, parameter_id))
+            if old_value == value:
+                report.unchanged += 1
+                continue
+            report.changes.append(ComparisonCellChange(brand_id, parameter_id, old_value, value))
+            params.append({
+                "category_id": category_id,
+                "brand_id": brand_id,
+                "parameter_id": parameter_id,
+                "value": value,
+            })
+        
+        if params:
+            session.execute(self._upsert_value_statement(), params)
+    
+    @staticmethod
+    def _resolve_names(session: Session, model, category_id: int, names: Iterable[Tuple[str, int]],
+                       added: List[str]) -> Dict[str, int]:
+        """
+        按名称查找类目下的品牌/参数，不存在的批量新建（不提交）
+        
+        Args:
+            session: 数据库会话
+            model: ComparisonBrand 或 ComparisonParameter
+            category_id: 类目ID
+            names: [(名称, 新建时的排序顺序), ...]（重名只取第一个）
+            added: 新建的名称追加到这里
+            
+        Returns:
+            {名称: ID}
+        """
+        ids = dict(
+            session.query(model.name, model.id).filter(model.category_id == category_id)
+        )
+        missing = {}
+        for name, sort_order in names:
+            if name not in ids and name not in missing:
+                missing[name] = sort_order
+        if not missing:
+            return ids
+        
+        session.execute(insert(model), [
+            {"category_id": category_id, "name": name, "sort_order": sort_order}
+            for name, sort_order in missing.items()
+        ])
+        added.extend(missing)
+        ids.update(
+            session.query(model.name, model.id).filter(
+                model.category_id == category_id, model.name.in_(list(missing))
+            )
+        )
+        return ids
+    
     def get_value(self, brand_id: int, parameter_id: int) -> Optional[str]:
         """获取参数值"""
         session = self.get_session()
@@ -380,17 +527,21 @@ class ComparisonDBManager:
         finally:
             session.close()
     
-    def get_table_data(self, category_id: int) -> Dict:
+    def get_table_data(self, category_id: int) -> Mapping:
         """
-        获取类目的完整表格数据
+        获取类目的完整表格数据（只读快照，带缓存）
         
         Returns:
             {
-                'brands': [{'id': 1, 'name': '希喂', 'is_own': 1}, ...],
-                'parameters': [{'id': 1, 'name': '价格'}, ...],
+                'brands': ({'id': 1, 'name': '希喂', 'is_own': 1}, ...),
+                'parameters': ({'id': 1, 'name': '价格'}, ...),
                 'values': {(brand_id, parameter_id): value, ...}
             }
         """
+        return self._cache.get(("table_data", category_id), lambda: self._load_table_data(category_id))
+    
+    def _load_table_data(self, category_id: int) -> Dict:
+        """从数据库读取类目的完整表格数据（格式见 get_table_data）"""
         session = self.get_session()
         try:
             # 获取品牌列表
@@ -441,6 +592,7 @@ class ComparisonDBManager:
                 session.add(config)
             
             session.commit()
+            self._invalidate()
             logger.info(f"保存配置成功: {config_type}")
             return True
             
@@ -451,23 +603,23 @@ class ComparisonDBManager:
         finally:
             session.close()
     
-    def get_config(self, config_type: str) -> Optional[Dict]:
-        """获取配置"""
-        session = self.get_session()
-        try:
+    def get_config(self, config_type: str) -> Optional[Mapping]:
+        """获取配置（只读快照，带缓存；需要修改时先 dict() 复制）"""
+        def load(session):
             config = session.query(ComparisonConfig).filter(
                 ComparisonConfig.config_type == config_type
             ).first()
-            
             return config.get_config_dict() if config else None
-        finally:
-            session.close()
+        
+        return self._cache.get(("config", config_type), lambda: self._query(load))
     
     # ==================== Excel 导入 ====================
     
-    def import_from_excel_data(self, category_id: int, data: List[List[str]]) -> bool:
+    def import_from_excel_data(self, category_id: int, data: List[List[str]]) -> Optional[ComparisonUpsertReport]:
         """
-        从Excel数据导入
+        从Excel数据导入（一个事务：批量解析/新建品牌和参数，再批量 upsert 所有值）
+        
+        已存在的品牌和参数按名称复用，单元格值覆盖原值；值未变化的单元格不写入。
         
         Args:
             category_id: 类目ID
@@ -475,48 +627,64 @@ class ComparisonDBManager:
                   [[空, 品牌1, 品牌2, ...],
                    [参数1, 值1, 值2, ...],
                    [参数2, 值1, 值2, ...]]
+        
+        Returns:
+            ComparisonUpsertReport（含变化的单元格），数据为空或失败返回 None
         """
+        if not data or len(data) < 2:
+            return None
+        
         session = self.get_session()
         try:
-            if not data or len(data) < 2:
-                return False
+            report = ComparisonUpsertReport(category_id)
             
-            # 解析品牌（第一行，跳过第一个单元格）
-            brand_names = data[0][1:]
-            brand_objects = []
+            # 解析品牌（第一行，跳过第一个单元格）：{列号: 品牌名}
+            brand_columns = {
+                col_idx: str(name).strip()
+                for col_idx, name in enumerate(data[0][1:])
+                if name is not None and str(name).strip()
+            }
+            brand_ids = self._resolve_names(
+                session, ComparisonBrand, category_id,
+                ((name, col_idx) for col_idx, name in brand_columns.items()), report.added_brands
+            )
             
-            for idx, brand_name in enumerate(brand_names):
-                if brand_name.strip():
-                    brand = self.add_brand(category_id, brand_name.strip(), sort_order=idx)
-                    if brand:
-                        brand_objects.append(brand)
+            # 解析参数（从第二行开始，第一列）
+            param_rows = [
+                (row_idx, str(row[0]).strip(), row[1:])
+                for row_idx, row in enumerate(data[1:])
+                if row and len(row) >= 2 and row[0] is not None and str(row[0]).strip()
+            ]
+            parameter_ids = self._resolve_names(
+                session, ComparisonParameter, category_id,
+                ((name, row_idx) for row_idx, name, _ in param_rows), report.added_parameters
+            )
             
-            # 解析参数和值（从第二行开始）
-            for row_idx, row in enumerate(data[1:]):
-                if not row or len(row) < 2:
-                    continue
-                
-                param_name = row[0].strip()
-                if not param_name:
-                    continue
-                
-                # 添加参数
-                parameter = self.add_parameter(category_id, param_name, sort_order=row_idx)
-                if not parameter:
-                    continue
-                
-                # 添加每个品牌的参数值
-                for col_idx, value in enumerate(row[1:]):
-                    if col_idx < len(brand_objects):
-                        brand = brand_objects[col_idx]
-                        self.set_value(category_id, brand.id, parameter.id, value.strip())
+            # 每个品牌的参数值（同名品牌/参数重复出现时后面的覆盖前面的）
+            values = {}
+            for _, param_name, cells in param_rows:
+                for col_idx, value in enumerate(cells):
+                    if col_idx in brand_columns:
+                        key = (brand_ids[brand_columns[col_idx]], parameter_ids[param_name])
+                        values[key] = "" if value is None else str(value).strip()
             
-            logger.info(f"Excel数据导入成功: 类目ID={category_id}")
-            return True
+            self._upsert_values(session, category_id, values, report)
+            session.commit()
+            self._invalidate()
+            
+            logger.info(
+                f"Excel数据导入成功: 类目ID={category_id}, 新增品牌 {len(report.added_brands)} 个, "
+                f"新增参数 {len(report.added_parameters)} 个, 变化 {len(report.changes)} 格, "
+                f"未变化 {report.unchanged} 格"
+            )
+            return report
             
         except Exception as e:
+            session.rollback()
             logger.error(f"Excel数据导入失败: {e}")
-            return False
+            return None
+        finally:
+            session.close()
     
     # ==================== 任务管理 ====================
     
@@ -561,6 +729,7 @@ class ComparisonDBManager:
             
             session.add(task)
             session.commit()
+            self._invalidate()
             session.refresh(task)
             
             logger.info(f"添加任务成功: {task_name}")
@@ -584,6 +753,7 @@ class ComparisonDBManager:
             if task:
                 session.delete(task)
                 session.commit()
+                self._invalidate()
                 logger.info(f"删除任务成功: ID={task_id}")
                 return True
             return False
@@ -613,6 +783,7 @@ class ComparisonDBManager:
                     setattr(task, key, value)
             
             session.commit()
+            self._invalidate()
             logger.info(f"更新任务成功: ID={task_id}")
             return True
             
@@ -623,25 +794,21 @@ class ComparisonDBManager:
         finally:
             session.close()
     
-    def get_tasks_by_category(self, category_id: int) -> List[ComparisonTask]:
-        """获取类目下的所有任务（按排序顺序）"""
-        session = self.get_session()
-        try:
-            return session.query(ComparisonTask).filter(
+    def get_tasks_by_category(self, category_id: int) -> Tuple[RecordSnapshot, ...]:
+        """获取类目下的所有任务（按排序顺序；只读快照，带缓存）"""
+        return self._cache.get(("tasks", category_id), lambda: self._query(
+            lambda session: session.query(ComparisonTask).filter(
                 ComparisonTask.category_id == category_id
             ).order_by(ComparisonTask.sort_order).all()
-        finally:
-            session.close()
+        ))
     
-    def get_task_by_id(self, task_id: int) -> Optional[ComparisonTask]:
-        """根据ID获取任务"""
-        session = self.get_session()
-        try:
-            return session.query(ComparisonTask).filter(
+    def get_task_by_id(self, task_id: int) -> Optional[RecordSnapshot]:
+        """根据ID获取任务（只读快照，带缓存）"""
+        return self._cache.get(("task", task_id), lambda: self._query(
+            lambda session: session.query(ComparisonTask).filter(
                 ComparisonTask.id == task_id
             ).first()
-        finally:
-            session.close()
+        ))
     
     def reorder_tasks(self, task_ids: List[int]) -> bool:
         """重新排序任务"""
@@ -655,6 +822,7 @@ class ComparisonDBManager:
                     task.sort_order = idx
             
             session.commit()
+            self._invalidate()
             logger.info("任务排序更新成功")
             return True
             
@@ -694,6 +862,7 @@ class ComparisonDBManager:
                 session.add(selection)
             
             session.commit()
+            self._invalidate()
             logger.info(f"任务参数设置成功: task_id={task_id}, 参数数={len(parameter_ids)}")
             return True
             
@@ -704,25 +873,23 @@ class ComparisonDBManager:
         finally:
             session.close()
     
-    def get_task_parameters(self, task_id: int) -> List[int]:
+    def get_task_parameters(self, task_id: int) -> Tuple[int, ...]:
         """
-        获取任务选择的参数ID列表
+        获取任务选择的参数ID列表（带缓存）
         
         Args:
             task_id: 任务ID
             
         Returns:
-            参数ID列表
+            参数ID元组
         """
-        session = self.get_session()
-        try:
-            selections = session.query(TaskParameterSelection).filter(
-                TaskParameterSelection.task_id == task_id
-            ).all()
-            
-            return [s.parameter_id for s in selections]
-        finally:
-            session.close()
+        return self._cache.get(("task_parameters", task_id), lambda: self._query(
+            lambda session: [
+                parameter_id for parameter_id, in session.query(TaskParameterSelection.parameter_id).filter(
+                    TaskParameterSelection.task_id == task_id
+                )
+            ]
+        ))
     
     def clear_task_parameters(self, task_id: int) -> bool:
         """清空任务的参数选择"""
@@ -733,6 +900,7 @@ class ComparisonDBManager:
             ).delete()
             
             session.commit()
+            self._invalidate()
             logger.info(f"清空任务参数成功: task_id={task_id}")
             return True
             
@@ -743,17 +911,21 @@ class ComparisonDBManager:
         finally:
             session.close()
     
-    def get_task_full_data(self, task_id: int) -> Optional[Dict]:
+    def get_task_full_data(self, task_id: int) -> Optional[Mapping]:
         """
-        获取任务的完整数据（包括参数列表）
+        获取任务的完整数据（包括参数列表；只读快照，带缓存）
         
         Returns:
             {
-                'task': task对象,
-                'selected_parameter_ids': [1, 2, 3],
-                'parameters': [参数对象列表]
+                'task': task快照,
+                'selected_parameter_ids': (1, 2, 3),
+                'parameters': (参数快照, ...)
             }
         """
+        return self._cache.get(("task_full_data", task_id), lambda: self._load_task_full_data(task_id))
+    
+    def _load_task_full_data(self, task_id: int) -> Optional[Dict]:
+        """从数据库读取任务的完整数据（格式见 get_task_full_data）"""
         session = self.get_session()
         try:
             task = session.query(ComparisonTask).filter(
@@ -4,12 +4,51 @@
 """
 
 import os
-from typing import List, Optional
-from sqlalchemy import create_engine, and_
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from sqlalchemy import create_engine, event, func, and_, case, insert, update, bindparam
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session
 from loguru import logger
 
 from .models import Base, Material
+from .material_search import MaterialSearchHit, MaterialSearchIndex, SearchCancelled
+from ..config.settings import DatabaseConfig
+
+
+def create_sqlite_engine(db_path: str, pragmas: Sequence[Tuple[str, object]] = ()) -> Engine:
+    """
+    创建 SQLite 引擎，并在每个新连接上应用 PRAGMA
+    
+    PRAGMA 是连接级设置（journal_mode=WAL 除外，它写入数据库文件），
+    因此通过 connect 事件对连接池里的每个连接各执行一次。
+    本地文件连接不会失效，不再做 pool_pre_ping（每次取连接都多一次 SELECT 1）。
+    
+    Args:
+        db_path: 数据库文件路径
+        pragmas: [(名称, 值), ...]，为空时使用 SQLite 默认设置
+        
+    Returns:
+        SQLAlchemy Engine
+    """
+    engine = create_engine(
+        f"sqlite:///{db_path}",
+        echo=False  # 设为 True 可以看到 SQL 语句
+    )
+    
+    if pragmas:
+        statements = [f"PRAGMA {name}={value}" for name, value in pragmas]
+        
+        @event.listens_for(engine, "connect")
+        def _apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for statement in statements:
+                    cursor.execute(statement)
+                    cursor.fetchall()
+            finally:
+                cursor.close()
+    
+    return engine
 
 
 class DatabaseManager:
@@ -19,38 +58,42 @@ class DatabaseManager:
     _engine = None
     _session_factory = None
     
-    def __new__(cls, db_path: str = "assets.db"):
+    def __new__(cls, db_path: str = "assets.db", database_config: DatabaseConfig = None):
         """单例模式实现"""
         if cls._instance is None:
             cls._instance = super().__new__(cls)
-            cls._instance._initialize(db_path)
+            cls._instance._initialize(db_path, database_config)
         return cls._instance
     
-    def _initialize(self, db_path: str):
+    def _initialize(self, db_path: str, database_config: DatabaseConfig = None):
         """
         初始化数据库连接
         
         Args:
             db_path: 数据库文件路径
+            database_config: SQLite 性能参数（可选，默认 WAL + synchronous=NORMAL）
         """
         self.db_path = db_path
-        db_url = f"sqlite:///{db_path}"
+        self.database_config = database_config or DatabaseConfig()
         
-        # 创建引擎
-        self._engine = create_engine(
-            db_url,
-            echo=False,  # 设为 True 可以看到 SQL 语句
-            pool_pre_ping=True  # 连接池健康检查
-        )
+        # 创建引擎（GUI、生成线程、知乎监测线程共用同一个文件，WAL 下读写互不阻塞）
+        self._engine = create_sqlite_engine(db_path, self.database_config.pragmas())
         
         # 创建会话工厂
         self._session_factory = sessionmaker(bind=self._engine)
         
-        logger.info(f"数据库管理器初始化完成: {db_path}")
+        # 素材全文检索索引（表和触发器在 create_tables 中创建）
+        self._search_index = MaterialSearchIndex(self._engine)
+        
+        logger.info(
+            f"数据库管理器初始化完成: {db_path} "
+            f"(journal_mode={self.database_config.journal_mode}, synchronous={self.database_config.synchronous})"
+        )
     
     def create_tables(self):
         """创建所有表（如果不存在）"""
         Base.metadata.create_all(self._engine)
+        self._search_index.ensure()
         logger.info("数据库表创建完成")
     
     def get_session(self) -> Session:
@@ -107,6 +150,41 @@ class DatabaseManager:
         finally:
             session.close()
     
+    def bulk_insert_materials(self, rows: Sequence[Dict]) -> int:
+        """
+        批量插入素材（一个事务，executemany），不做查重，由调用方预先去重
+        
+        Args:
+            rows: [{"category", "content", "content_hash", "simhash", "tags"}, ...]
+            
+        Returns:
+            插入条数，失败返回 0
+        """
+        if not rows:
+            return 0
+        
+        session = self.get_session()
+        try:
+            session.execute(insert(Material), [
+                {
+                    "category": row["category"],
+                    "content": row["content"],
+                    "content_hash": row.get("content_hash") or Material._generate_hash(row["content"]),
+                    "simhash": row.get("simhash"),
+                    "tags": row.get("tags"),
+                    "usage_count": 0,
+                }
+                for row in rows
+            ])
+            session.commit()
+            return len(rows)
+        except Exception as e:
+            session.rollback()
+            logger.error(f"批量插入素材失败: {e}")
+            return 0
+        finally:
+            session.close()
+    
     # ==================== 删 ====================
     
     def delete_material(self, material_id: int) -> bool:
@@ -178,7 +256,7 @@ class DatabaseManager:
     
     def increment_usage(self, material_id: int) -> bool:
         """
-        增加素材使用次数
+        增加素材使用次数（单条读取、提交；生成流程中的批量计数请使用 usage_manager.UsageAccumulator）
         
         Args:
             material_id: 素材 ID
@@ -237,6 +315,127 @@ class DatabaseManager:
         finally:
             session.close()
     
+    def get_material_previews(self, category: str, offset: int = 0, limit: int = 100,
+                              length: int = 30) -> List[Tuple[int, str]]:
+        """
+        分页获取某分类素材的 ID 和内容开头（不读取完整内容，供素材树按需加载）
+        
+        Args:
+            category: 分类名称
+            offset: 起始位置
+            limit: 本页条数
+            length: 预览字符数
+            
+        Returns:
+            [(素材 ID, 内容前 length 个字符), ...]，排序与 get_materials_by_category 一致
+        """
+        session = self.get_session()
+        try:
+            return [
+                (material_id, preview)
+                for material_id, preview in session.query(
+                    Material.id, func.substr(Material.content, 1, length)
+                ).filter(
+                    Material.category == category
+                ).order_by(
+                    Material.usage_count.desc(), Material.id
+                ).offset(offset).limit(limit)
+            ]
+        finally:
+            session.close()
+    
+    def get_category_counts(self) -> Dict[str, int]:
+        """
+        获取每个分类的素材数量（一次 GROUP BY 查询）
+        
+        Returns:
+            {分类名称: 素材数量}
+        """
+        session = self.get_session()
+        try:
+            return dict(
+                session.query(Material.category, func.count(Material.id)).group_by(Material.category).all()
+            )
+        finally:
+            session.close()
+    
+    def find_existing_hashes(self, content_hashes: Iterable[str]) -> Set[str]:
+        """
+        查询素材库中已存在的内容哈希（走 idx_content_hash 索引）
+        
+        Args:
+            content_hashes: 待检查的 MD5 哈希
+            
+        Returns:
+            已存在的哈希集合
+        """
+        content_hashes = list(content_hashes)
+        session = self.get_session()
+        try:
+            existing = set()
+            # SQLite 单条语句的参数数量有限，IN 查询分批执行
+            for start in range(0, len(content_hashes), 500):
+                chunk = content_hashes[start:start + 500]
+                existing.update(
+                    row[0] for row in session.query(Material.content_hash).filter(Material.content_hash.in_(chunk))
+                )
+            return existing
+        finally:
+            session.close()
+    
+    def iter_material_simhashes(self, batch_size: int = 5000) -> Iterator[Tuple[int, Optional[str], Optional[str]]]:
+        """
+        按 ID 分批遍历所有素材的指纹（SimHash 为空的素材同时返回内容，供补算）
+        
+        Args:
+            batch_size: 每批读取条数
+            
+        Yields:
+            (素材 ID, SimHash 字符串或 None, SimHash 为空时的内容否则 None)
+        """
+        last_id = 0
+        while True:
+            session = self.get_session()
+            try:
+                rows = session.query(
+                    Material.id, Material.simhash,
+                    case((Material.simhash.is_(None), Material.content))
+                ).filter(Material.id > last_id).order_by(Material.id).limit(batch_size).all()
+            finally:
+                session.close()
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1][0]
+    
+    def update_material_simhashes(self, simhashes: Sequence[Tuple[int, str]]) -> int:
+        """
+        批量写入素材的 SimHash（一个事务）
+        
+        Args:
+            simhashes: [(素材 ID, SimHash 字符串), ...]
+            
+        Returns:
+            更新条数，失败返回 0
+        """
+        if not simhashes:
+            return 0
+        
+        session = self.get_session()
+        try:
+            session.connection().execute(
+                update(Material).where(Material.id == bindparam("material_id")).values(simhash=bindparam("value")),
+                [{"material_id": material_id, "value": value} for material_id, value in simhashes]
+            )
+            session.commit()
+            return len(simhashes)
+        except Exception as e:
+            session.rollback()
+            logger.error(f"写入素材 SimHash 失败: {e}")
+            return 0
+        finally:
+            session.close()
+    
     def get_all_categories(self) -> List[str]:
         """
         获取所有分类名称
@@ -259,18 +458,50 @@ class DatabaseManager:
             keyword: 搜索关键词
             
         Returns:
-            匹配的 Material 对象列表
+            匹配的 Material 对象列表（按相关度排序）
         """
+        material_ids = [hit.id for hit in self._search_index.search(keyword, limit=-1)]
+        if not material_ids:
+            return []
+        
         session = self.get_session()
         try:
-            search_pattern = f"%{keyword}%"
-            return session.query(Material).filter(
-                (Material.content.like(search_pattern)) |
-                (Material.tags.like(search_pattern))
-            ).all()
+            materials = {}
+            # SQLite 单条语句的参数数量有限，IN 查询分批执行
+            for start in range(0, len(material_ids), 500):
+                chunk = material_ids[start:start + 500]
+                materials.update(
+                    (material.id, material)
+                    for material in session.query(Material).filter(Material.id.in_(chunk))
+                )
+            return [materials[material_id] for material_id in material_ids if material_id in materials]
         finally:
             session.close()
     
+    def search_material_hits(self, keyword: str, limit: int = 200,
+                             start_mark: str = "<b>", end_mark: str = "</b>",
+                             cancelled: Callable[[], bool] = None) -> List[MaterialSearchHit]:
+        """
+        搜索素材并返回高亮片段（FTS5 索引，供输入即搜索使用）
+        
+        Args:
+            keyword: 搜索关键词（少于 3 个字符时回退到 LIKE）
+            limit: 最多返回条数
+            start_mark: 高亮开始标记
+            end_mark: 高亮结束标记
+            cancelled: 取消检查函数（可选），返回 True 时中断查询并抛出 SearchCancelled
+            
+        Returns:
+            按相关度排序的 MaterialSearchHit 列表
+        """
+        try:
+            return self._search_index.search(keyword, limit, start_mark, end_mark, cancelled)
+        except SearchCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"搜索素材失败: {e}")
+            return []
+    
     def get_all_materials(self, limit: int = None) -> List[Material]:
         """
         获取所有素材
@@ -6,6 +6,7 @@
 import os
 from loguru import logger
 from .db_manager import DatabaseManager
+from ..config.settings import DatabaseConfig
 from .models import (
     Material, ComparisonCategory, ComparisonBrand, ComparisonParameter, 
     ComparisonValue, ComparisonConfig, ComparisonTask, TaskParameterSelection,
@@ -15,12 +16,13 @@ from .models import (
 from .migrations import migrate_database, check_migration_needed
 
 
-def init_database(db_path: str = "assets.db") -> DatabaseManager:
+def init_database(db_path: str = "assets.db", database_config: DatabaseConfig = None) -> DatabaseManager:
     """
     初始化数据库
     
     Args:
         db_path: 数据库文件路径
+        database_config: SQLite 性能参数（可选）
         
     Returns:
         DatabaseManager 实例
@@ -34,7 +36,7 @@ def init_database(db_path: str = "assets.db") -> DatabaseManager:
         logger.info(f"数据库文件已存在: {db_path}")
     
     # 创建数据库管理器实例（单例）
-    db_manager = DatabaseManager(db_path)
+    db_manager = DatabaseManager(db_path, database_config)
     
     # 创建表（如果不存在）
     db_manager.create_tables()
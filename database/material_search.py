@@ -0,0 +1,246 @@
+"""
+素材全文检索
+在 materials.content / tags 上建立 FTS5 外部内容索引（trigram 分词，中文任意子串可检索），
+由触发器与素材表保持同步，检索结果按 bm25 排序并带关键词高亮片段。
+
+trigram 索引只能匹配 3 个字符及以上的关键词，更短的关键词（如"吸力"）回退到 LIKE 扫描；
+SQLite 不支持 FTS5/trigram（3.34 以前）时全部使用 LIKE。
+"""
+
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from loguru import logger
+
+
+FTS_TABLE = "materials_fts"
+
+# trigram 分词器能匹配的最短关键词长度
+MIN_FTS_KEYWORD_LENGTH = 3
+
+# 高亮片段的长度（trigram 下一个词元约等于一个字符）
+SNIPPET_TOKENS = 24
+SNIPPET_ELLIPSIS = "…"
+
+# bm25 列权重：标签命中比正文命中更相关
+BM25_WEIGHTS = (1.0, 2.0)
+
+# 命中超过该数量时不再按 bm25 排序（需要为每条命中计算得分），改为最新素材优先：
+# 常见词命中几万条时排序本身就没有区分度，而逐条打分要上百毫秒
+RANK_CANDIDATES = 2000
+
+# 可取消的检索每执行多少条虚拟机指令检查一次取消标志
+CANCEL_CHECK_STEPS = 1000
+
+_FTS_SCHEMA = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        content, tags,
+        content='materials', content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON materials BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, content, tags) VALUES (new.id, new.content, new.tags);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON materials BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content, tags) VALUES ('delete', old.id, old.content, old.tags);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF content, tags ON materials BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content, tags) VALUES ('delete', old.id, old.content, old.tags);
+        INSERT INTO {FTS_TABLE}(rowid, content, tags) VALUES (new.id, new.content, new.tags);
+    END
+    """,
+)
+
+_FTS_COUNT_SQL = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ? LIMIT ?"
+
+_FTS_SEARCH_SQL = f"""
+    SELECT m.id, m.category, m.content, m.tags,
+           snippet({FTS_TABLE}, -1, ?, ?, ?, ?) AS snippet,
+           {{score}} AS score
+    FROM {FTS_TABLE} JOIN materials AS m ON m.id = {FTS_TABLE}.rowid
+    WHERE {FTS_TABLE} MATCH ?
+    ORDER BY {{order}}
+    LIMIT ?
+"""
+_FTS_RANKED_SQL = _FTS_SEARCH_SQL.format(
+    score=f"bm25({FTS_TABLE}, {BM25_WEIGHTS[0]}, {BM25_WEIGHTS[1]})", order="score"
+)
+_FTS_NEWEST_SQL = _FTS_SEARCH_SQL.format(score="0.0", order=f"{FTS_TABLE}.rowid DESC")
+
+_LIKE_SEARCH_SQL = """
+    SELECT id, category, content, tags
+    FROM materials
+    WHERE content LIKE ? ESCAPE '\\' OR tags LIKE ? ESCAPE '\\'
+    ORDER BY id DESC
+    LIMIT ?
+"""
+
+
+class SearchCancelled(Exception):
+    """检索在执行过程中被取消（已有更新的检索请求）"""
+
+
+@dataclass
+class MaterialSearchHit:
+    """一条检索结果"""
+    
+    id: int
+    category: str
+    content: str
+    tags: Optional[str]
+    snippet: str  # 命中位置附近的片段，关键词两侧带高亮标记
+    score: float = 0.0  # bm25 得分（越小越相关；LIKE 回退时为 0）
+
+
+class MaterialSearchIndex:
+    """素材 FTS5 检索索引"""
+    
+    def __init__(self, engine: Engine):
+        """
+        Args:
+            engine: 素材库所在的 SQLAlchemy 引擎
+        """
+        self._engine = engine
+        self._available: Optional[bool] = None
+    
+    @property
+    def available(self) -> bool:
+        """索引是否存在（首次访问时检测，之后缓存）"""
+        if self._available is None:
+            with self._engine.connect() as conn:
+                self._available = conn.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (FTS_TABLE,)
+                ).first() is not None
+        return self._available
+    
+    def ensure(self) -> bool:
+        """
+        创建索引表和同步触发器；索引表是新建的（旧数据库首次升级）时一次性回填已有素材
+        
+        Returns:
+            索引是否可用
+        """
+        try:
+            with self._engine.begin() as conn:
+                existed = conn.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (FTS_TABLE,)
+                ).first() is not None
+                for statement in _FTS_SCHEMA:
+                    conn.exec_driver_sql(statement)
+                if not existed:
+                    conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+                    count = conn.exec_driver_sql("SELECT COUNT(*) FROM materials").scalar()
+                    logger.info(f"素材全文索引已创建，回填 {count} 条素材")
+            self._available = True
+        except OperationalError as e:
+            # SQLite 未编译 FTS5 或版本过低（trigram 需要 3.34+）
+            logger.warning(f"素材全文索引不可用，搜索将使用 LIKE: {e}")
+            self._available = False
+        return self._available
+    
+    def rebuild(self):
+        """按素材表重建整个索引（索引与素材表不一致时使用）"""
+        with self._engine.begin() as conn:
+            conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        logger.info("素材全文索引已重建")
+    
+    def search(self, keyword: str, limit: int = 200,
+               start_mark: str = "<b>", end_mark: str = "</b>",
+               cancelled: Optional[Callable[[], bool]] = None) -> List[MaterialSearchHit]:
+        """
+        检索素材内容和标签
+        
+        Args:
+            keyword: 搜索关键词（按整体子串匹配，不区分英文大小写）
+            limit: 最多返回条数
+            start_mark: 高亮开始标记
+            end_mark: 高亮结束标记
+            cancelled: 取消检查函数（可选），返回 True 时中断正在执行的 SQL
+        
+        Returns:
+            按相关度排序的 MaterialSearchHit 列表（命中过多或 LIKE 回退时按 ID 倒序）
+        
+        Raises:
+            SearchCancelled: 检索被取消
+        """
+        keyword = keyword.strip()
+        if not keyword:
+            return []
+        
+        with self._engine.connect() as conn:
+            if cancelled is None:
+                return self._search(conn, keyword, limit, start_mark, end_mark)
+            
+            # SQLite 进度回调返回非 0 时中断当前语句，旧的慢查询（如短关键词的 LIKE 扫描）不必跑完
+            dbapi_connection = conn.connection.driver_connection
+            dbapi_connection.set_progress_handler(cancelled, CANCEL_CHECK_STEPS)
+            try:
+                if cancelled():
+                    raise SearchCancelled(keyword)
+                return self._search(conn, keyword, limit, start_mark, end_mark)
+            except OperationalError:
+                if cancelled():
+                    raise SearchCancelled(keyword)
+                raise
+            finally:
+                dbapi_connection.set_progress_handler(None, 0)
+    
+    def _search(self, conn, keyword: str, limit: int, start_mark: str, end_mark: str) -> List[MaterialSearchHit]:
+        """在给定连接上执行检索（FTS5 或 LIKE 回退）"""
+        if len(keyword) >= MIN_FTS_KEYWORD_LENGTH and self.available:
+            # 整个关键词作为一个短语：trigram 下等价于子串匹配
+            phrase = '"' + keyword.replace('"', '""') + '"'
+            matched = conn.exec_driver_sql(_FTS_COUNT_SQL, (phrase, RANK_CANDIDATES + 1)).all()
+            sql = _FTS_RANKED_SQL if len(matched) <= RANK_CANDIDATES else _FTS_NEWEST_SQL
+            rows = conn.exec_driver_sql(
+                sql, (start_mark, end_mark, SNIPPET_ELLIPSIS, SNIPPET_TOKENS, phrase, limit)
+            ).all()
+            return [MaterialSearchHit(*row) for row in rows]
+        
+        pattern = "%" + keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        rows = conn.exec_driver_sql(_LIKE_SEARCH_SQL, (pattern, pattern, limit)).all()
+        return [
+            MaterialSearchHit(
+                material_id, category, content, tags,
+                make_snippet(content, keyword, start_mark, end_mark)
+                or make_snippet(tags or "", keyword, start_mark, end_mark)
+            )
+            for material_id, category, content, tags in rows
+        ]
+
+
+def make_snippet(text: str, keyword: str, start_mark: str = "<b>", end_mark: str = "</b>",
+                 width: int = SNIPPET_TOKENS) -> str:
+    """
+    生成与 FTS5 snippet() 格式一致的高亮片段（LIKE 回退时使用）
+    
+    Args:
+        text: 原文
+        keyword: 关键词
+        start_mark: 高亮开始标记
+        end_mark: 高亮结束标记
+        width: 片段长度（字符）
+    
+    Returns:
+        高亮片段（原文不含关键词时返回空字符串）
+    """
+    position = text.lower().find(keyword.lower())
+    if position < 0:
+        return ""
+    
+    end = position + len(keyword)
+    start = max(0, min(position - (width - len(keyword)) // 2, len(text) - width))
+    stop = max(end, start + width)
+    return (
+        (SNIPPET_ELLIPSIS if start > 0 else "")
+        + text[start:position] + start_mark + text[position:end] + end_mark + text[end:stop]
+        + (SNIPPET_ELLIPSIS if stop < len(text) else "")
+    )
@@ -4,6 +4,7 @@
 """
 
 import sqlite3
+from typing import Optional
 from loguru import logger
 
 
@@ -29,6 +30,15 @@ def migrate_database(db_path: str):
         # 迁移 3: 为 zhihu_monitor_tasks 表添加问题描述字段
         _migrate_zhihu_tasks_question_detail(cursor, conn)
         
+        # 迁移 4: 为 materials 表添加 SimHash 字段（批量导入近似查重）
+        _migrate_materials_simhash(cursor, conn)
+        
+        # 迁移 5: 为 materials 表添加最近使用时间字段（批量记录使用次数）
+        _migrate_materials_last_used_at(cursor, conn)
+        
+        # 迁移 6: comparison_values 的 (brand_id, parameter_id) 索引改为唯一索引（批量导入 upsert）
+        _migrate_comparison_values_unique(cursor, conn)
+        
         conn.close()
         logger.success("数据库迁移完成")
         
@@ -144,6 +154,123 @@ def _migrate_zhihu_tasks_question_detail(cursor, conn):
         logger.warning(f"迁移 zhihu_monitor_tasks.question_detail 失败: {e}")
 
 
+def _migrate_materials_simhash(cursor, conn):
+    """
+    迁移 materials 表 - 添加 SimHash 字段
+    
+    新增字段：
+    - simhash: 内容 SimHash 指纹（已有素材为空，批量导入时补算）
+    """
+    try:
+        cursor.execute("PRAGMA table_info(materials)")
+        columns = [row[1] for row in cursor.fetchall()]
+        
+        if not columns:
+            logger.info("materials 表不存在（跳过迁移）")
+            return
+        
+        if 'simhash' not in columns:
+            logger.info("添加字段: materials.simhash")
+            cursor.execute("""
+                ALTER TABLE materials 
+                ADD COLUMN simhash VARCHAR(20)
+            """)
+            conn.commit()
+            logger.success("✅ 已添加字段: simhash")
+        else:
+            logger.info("字段已存在: simhash（跳过）")
+            
+    except Exception as e:
+        logger.warning(f"迁移 materials.simhash 失败: {e}")
+
+
+def _migrate_materials_last_used_at(cursor, conn):
+    """
+    迁移 materials 表 - 添加最近使用时间字段
+    
+    新增字段：
+    - last_used_at: 最近使用时间（已有素材为空）
+    """
+    try:
+        cursor.execute("PRAGMA table_info(materials)")
+        columns = [row[1] for row in cursor.fetchall()]
+        
+        if not columns:
+            logger.info("materials 表不存在（跳过迁移）")
+            return
+        
+        if 'last_used_at' not in columns:
+            logger.info("添加字段: materials.last_used_at")
+            cursor.execute("""
+                ALTER TABLE materials 
+                ADD COLUMN last_used_at DATETIME
+            """)
+            conn.commit()
+            logger.success("✅ 已添加字段: last_used_at")
+        else:
+            logger.info("字段已存在: last_used_at（跳过）")
+            
+    except Exception as e:
+        logger.warning(f"迁移 materials.last_used_at 失败: {e}")
+
+
+def _comparison_values_index_unique(cursor) -> Optional[bool]:
+    """
+    comparison_values 表的 idx_brand_param 索引是否为唯一索引
+    
+    Returns:
+        表不存在时返回 None
+    """
+    cursor.execute("PRAGMA index_list(comparison_values)")
+    indexes = {row[1]: bool(row[2]) for row in cursor.fetchall()}
+    if not indexes:
+        cursor.execute("""
+            SELECT name FROM sqlite_master 
+            WHERE type='table' AND name='comparison_values'
+        """)
+        if not cursor.fetchone():
+            return None
+    return indexes.get('idx_brand_param', False)
+
+
+def _migrate_comparison_values_unique(cursor, conn):
+    """
+    迁移 comparison_values 表 - (brand_id, parameter_id) 改为唯一索引
+    
+    旧版本逐格"先查再写"，并发或重复导入时可能留下同一单元格的多条记录，
+    建唯一索引前只保留每个单元格最新（id 最大）的一条。
+    """
+    try:
+        unique = _comparison_values_index_unique(cursor)
+        if unique is None:
+            logger.info("comparison_values 表不存在（跳过迁移）")
+            return
+        if unique:
+            logger.info("唯一索引已存在: idx_brand_param（跳过）")
+            return
+        
+        logger.info("重建索引: comparison_values.idx_brand_param (UNIQUE)")
+        cursor.execute("""
+            DELETE FROM comparison_values
+            WHERE id NOT IN (
+                SELECT MAX(id) FROM comparison_values GROUP BY brand_id, parameter_id
+            )
+        """)
+        if cursor.rowcount:
+            logger.info(f"已删除 {cursor.rowcount} 条重复的参数值")
+        cursor.execute("DROP INDEX IF EXISTS idx_brand_param")
+        cursor.execute("""
+            CREATE UNIQUE INDEX idx_brand_param 
+            ON comparison_values (brand_id, parameter_id)
+        """)
+        conn.commit()
+        logger.success("✅ 已创建唯一索引: idx_brand_param")
+        
+    except Exception as e:
+        conn.rollback()
+        logger.warning(f"迁移 comparison_values 唯一索引失败: {e}")
+
+
 def check_migration_needed(db_path: str) -> bool:
     """
     检查是否需要执行迁移
@@ -158,6 +285,19 @@ def check_migration_needed(db_path: str) -> bool:
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
         
+        # 检查 materials 表的新字段
+        cursor.execute("PRAGMA table_info(materials)")
+        material_columns = [row[1] for row in cursor.fetchall()]
+        if material_columns and ('simhash' not in material_columns or
+                                 'last_used_at' not in material_columns):
+            conn.close()
+            return True
+        
+        # 检查 comparison_values 的唯一索引
+        if _comparison_values_index_unique(cursor) is False:
+            conn.close()
+            return True
+        
         # 检查 zhihu_monitor_configs 表是否存在
         cursor.execute("""
             SELECT name FROM sqlite_master 
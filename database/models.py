@@ -23,8 +23,10 @@ class Material(Base):
     category = Column(Text, nullable=False, comment='分类名称')
     content = Column(Text, nullable=False, comment='文本内容')
     content_hash = Column(Text, comment='内容 MD5 哈希值')
+    simhash = Column(String(20), comment='内容 SimHash 指纹（64-bit 整数转字符串，批量导入时计算）')
     tags = Column(Text, comment='标签')
     usage_count = Column(Integer, default=0, comment='使用次数')
+    last_used_at = Column(DateTime, comment='最近使用时间')
     created_at = Column(DateTime, default=datetime.now, comment='创建时间')
     
     # 索引定义
@@ -64,7 +66,8 @@ class Material(Base):
     
     def increment_usage(self):
         """增加使用次数"""
-        self.usage_count += 1
+        self.usage_count = (self.usage_count or 0) + 1
+        self.last_used_at = datetime.now()
     
     def update_content(self, new_content: str):
         """
@@ -75,6 +78,7 @@ class Material(Base):
         """
         self.content = new_content
         self.content_hash = self._generate_hash(new_content)
+        self.simhash = None  # 内容已变，下次批量导入时重新计算
     
     def __repr__(self):
         return f"<Material(id={self.id}, category='{self.category}', usage={self.usage_count})>"
@@ -93,6 +97,7 @@ class Material(Base):
             'content_hash': self.content_hash,
             'tags': self.tags,
             'usage_count': self.usage_count,
+            'last_used_at': self.last_used_at.isoformat() if self.last_used_at else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
@@ -200,7 +205,8 @@ class ComparisonValue(Base):
     parameter = relationship("ComparisonParameter", back_populates="values")
     
     __table_args__ = (
-        Index('idx_brand_param', 'brand_id', 'parameter_id'),
+        # 每个品牌的每个参数只有一个值（批量导入按此唯一索引 ON CONFLICT 更新）
+        Index('idx_brand_param', 'brand_id', 'parameter_id', unique=True),
     )
     
     def to_dict(self):
@@ -348,6 +354,24 @@ class ContentFingerprint(Base):
         }
 
 
+class CellUsage(Base):
+    """单元格使用次数表（混排轮换，跨批次均衡曝光）"""
+    
+    __tablename__ = 'cell_usage'
+    
+    content_hash = Column(String(32), primary_key=True, comment='单元格内容 MD5 哈希值（与素材表 content_hash 一致）')
+    usage_count = Column(Integer, nullable=False, default=0, comment='累计使用次数')
+    last_used_at = Column(DateTime, comment='最近使用时间')
+    
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'content_hash': self.content_hash,
+            'usage_count': self.usage_count,
+            'last_used_at': self.last_used_at.isoformat() if self.last_used_at else None
+        }
+
+
 class ZhihuBrand(Base):
     """知乎监测品牌词库表"""
     
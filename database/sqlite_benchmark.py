@@ -0,0 +1,177 @@
+"""
+SQLite 性能参数基准测试
+对比 SQLite 默认设置（回滚日志、synchronous=FULL、默认页缓存、无 mmap）与
+DatabaseConfig 性能参数（WAL 等）下的：
+- 逐条提交插入吞吐（与 add_material 一样每条一个事务）
+- 全表扫描吞吐（与素材库搜索一样扫描 materials）
+- 并发读写：多个读线程持续流式读取时，写线程的提交次数、最大等待时间和锁超时次数
+
+每种设置使用独立的临时数据库文件（journal_mode=WAL 会写入文件本身）。
+
+用法:
+    python -m seo_workbench.database.sqlite_benchmark --rows 5000 --readers 4 --seconds 3
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Sequence, Tuple
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from .db_manager import create_sqlite_engine
+from .models import Base
+from ..config.settings import DatabaseConfig
+
+
+INSERT_SQL = text(
+    "INSERT INTO materials (category, content, tags, usage_count) "
+    "VALUES (:category, :content, :tags, 0)"
+)
+SCAN_SQL = "SELECT id, category, content, tags FROM materials WHERE content LIKE '%吸力%'"
+STREAM_SQL = "SELECT id, content FROM materials"
+
+
+def _sample_row(index: int) -> Dict[str, str]:
+    """生成一条测试素材"""
+    return {
+        "category": f"基准-{index % 20}",
+        "content": f"第 {index} 条素材：强劲的{{吸力|清洁能力}}配合智能感应系统，让清洁变得轻松简单。" * 3,
+        "tags": "基准,测试",
+    }
+
+
+def _bench_inserts(engine, rows: int) -> float:
+    """逐条提交插入，返回每秒插入条数"""
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        for index in range(rows):
+            conn.execute(INSERT_SQL, _sample_row(index))
+            conn.commit()
+    return rows / (time.perf_counter() - start)
+
+
+def _bench_scans(engine, rows: int, repeat: int = 20) -> float:
+    """重复全表 LIKE 扫描，返回每秒扫描行数"""
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        for _ in range(repeat):
+            conn.exec_driver_sql(SCAN_SQL).fetchall()
+    return rows * repeat / (time.perf_counter() - start)
+
+
+def _bench_concurrency(engine, readers: int, seconds: float) -> Dict[str, float]:
+    """
+    读线程持续流式读取（逐批 fetch，模拟界面逐页填充列表），写线程逐条提交插入
+    
+    Returns:
+        {"commits": 提交次数, "max_wait_ms": 单次提交最长耗时, "locked": 锁超时次数, "reads": 完成的读取轮数}
+    """
+    stop = threading.Event()
+    reads = [0] * readers
+    
+    def reader(slot: int):
+        with engine.connect() as conn:
+            while not stop.is_set():
+                result = conn.exec_driver_sql(STREAM_SQL)
+                while not stop.is_set() and result.fetchmany(200):
+                    time.sleep(0.001)
+                result.close()
+                reads[slot] += 1
+    
+    threads = [threading.Thread(target=reader, args=(slot,), daemon=True) for slot in range(readers)]
+    for thread in threads:
+        thread.start()
+    
+    commits = locked = 0
+    max_wait = 0.0
+    deadline = time.perf_counter() + seconds
+    with engine.connect() as conn:
+        index = 0
+        while time.perf_counter() < deadline:
+            index += 1
+            start = time.perf_counter()
+            try:
+                conn.execute(INSERT_SQL, _sample_row(index))
+                conn.commit()
+                commits += 1
+            except OperationalError:
+                conn.rollback()
+                locked += 1
+            max_wait = max(max_wait, time.perf_counter() - start)
+    
+    stop.set()
+    for thread in threads:
+        thread.join()
+    
+    return {"commits": commits, "max_wait_ms": max_wait * 1000, "locked": locked, "reads": sum(reads)}
+
+
+def run_profile(pragmas: Sequence[Tuple[str, object]], rows: int, readers: int, seconds: float) -> Dict[str, float]:
+    """
+    在临时数据库上测试一组 PRAGMA
+    
+    Args:
+        pragmas: [(名称, 值), ...]，为空表示 SQLite 默认设置
+        rows: 插入/扫描的行数
+        readers: 并发读线程数
+        seconds: 并发测试时长（秒）
+    
+    Returns:
+        各项测试结果
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        engine = create_sqlite_engine(os.path.join(temp_dir, "bench.db"), pragmas)
+        try:
+            Base.metadata.create_all(engine)
+            with engine.connect() as conn:
+                journal_mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+            results = {"journal_mode": journal_mode}
+            results["insert_per_s"] = _bench_inserts(engine, rows)
+            results["scan_rows_per_s"] = _bench_scans(engine, rows)
+            results.update(_bench_concurrency(engine, readers, seconds))
+            return results
+        finally:
+            engine.dispose()
+
+
+def run_benchmark(rows: int = 5000, readers: int = 4, seconds: float = 3.0) -> Dict[str, Dict[str, float]]:
+    """
+    对比默认设置与性能参数
+    
+    Returns:
+        {"default": 结果, "tuned": 结果}
+    """
+    return {
+        "default": run_profile((), rows, readers, seconds),
+        "tuned": run_profile(DatabaseConfig().pragmas(), rows, readers, seconds),
+    }
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="SQLite 性能参数基准测试")
+    parser.add_argument("--rows", type=int, default=5000, help="插入/扫描的行数")
+    parser.add_argument("--readers", type=int, default=4, help="并发读线程数")
+    parser.add_argument("--seconds", type=float, default=3.0, help="并发读写测试时长（秒）")
+    args = parser.parse_args(argv)
+    
+    results = run_benchmark(args.rows, args.readers, args.seconds)
+    metrics = [
+        ("journal_mode", "日志模式", "{}"),
+        ("insert_per_s", "逐条提交插入 (条/秒)", "{:.0f}"),
+        ("scan_rows_per_s", "全表扫描 (行/秒)", "{:.0f}"),
+        ("commits", f"并发写入提交数 ({args.readers} 个读线程)", "{}"),
+        ("max_wait_ms", "单次提交最长耗时 (ms)", "{:.1f}"),
+        ("locked", "锁超时次数", "{}"),
+        ("reads", "读线程完成的读取轮数", "{}"),
+    ]
+    print(f"{'指标':<32}{'默认设置':>14}{'性能参数':>14}")
+    for key, label, fmt in metrics:
+        print(f"{label:<32}{fmt.format(results['default'][key]):>14}{fmt.format(results['tuned'][key]):>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+单元格使用次数管理器
+按内容哈希记录每个单元格被混排使用的累计次数和最近使用时间，供跨批次均衡轮换使用。
+
+生成过程中的使用次数先在内存中累加（UsageAccumulator），批次结束或每隔一段时间
+才用一个事务 executemany 写入，而不是每用一次就单独读一行、加一、提交。
+"""
+
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert
+from loguru import logger
+
+from .models import CellUsage
+from .db_manager import DatabaseManager
+
+
+class CellUsageManager:
+    """单元格使用次数管理器"""
+
+    # SQLite 单条语句的参数数量有限，IN 查询分批执行
+    QUERY_CHUNK_SIZE = 500
+
+    def __init__(self, db_manager: DatabaseManager = None):
+        """
+        初始化使用次数管理器
+
+        Args:
+            db_manager: 数据库管理器实例（可选）
+        """
+        self.db_manager = db_manager or DatabaseManager()
+
+    def get_usage_counts(self, content_hashes: Iterable[str]) -> Dict[str, int]:
+        """
+        批量查询使用次数
+
+        Args:
+            content_hashes: 内容哈希列表
+
+        Returns:
+            {内容哈希: 使用次数}（没有记录的哈希不出现在结果中）
+        """
+        return {
+            content_hash: usage_count
+            for content_hash, (usage_count, _) in self.get_usage_stats(content_hashes).items()
+        }
+
+    def get_usage_stats(self, content_hashes: Iterable[str]) -> Dict[str, Tuple[int, Optional[datetime]]]:
+        """
+        批量查询使用次数和最近使用时间
+
+        Args:
+            content_hashes: 内容哈希列表
+
+        Returns:
+            {内容哈希: (使用次数, 最近使用时间)}（没有记录的哈希不出现在结果中）
+        """
+        hashes = list(dict.fromkeys(content_hashes))
+        stats = {}
+        session = self.db_manager.get_session()
+        try:
+            for start in range(0, len(hashes), self.QUERY_CHUNK_SIZE):
+                chunk = hashes[start:start + self.QUERY_CHUNK_SIZE]
+                rows = session.query(CellUsage.content_hash, CellUsage.usage_count, CellUsage.last_used_at).filter(
+                    CellUsage.content_hash.in_(chunk)
+                ).all()
+                stats.update({
+                    content_hash: (usage_count, last_used_at)
+                    for content_hash, usage_count, last_used_at in rows
+                })
+            return stats
+        except Exception as e:
+            logger.error(f"查询单元格使用次数失败: {e}")
+            return stats
+        finally:
+            session.close()
+
+    def add_usage(self, increments: Dict[str, int], used_at: datetime = None) -> bool:
+        """
+        累加使用次数（一个事务内完成，同时更新素材表中相同内容的 usage_count 和 last_used_at）
+
+        Args:
+            increments: {内容哈希: 增量}
+            used_at: 使用时间（默认当前时间）
+
+        Returns:
+            是否成功
+        """
+        if not increments:
+            return True
+
+        now = used_at or datetime.now()
+        params = [
+            {"content_hash": content_hash, "usage_count": count, "last_used_at": now}
+            for content_hash, count in increments.items() if count
+        ]
+
+        session = self.db_manager.get_session()
+        try:
+            statement = insert(CellUsage)
+            statement = statement.on_conflict_do_update(
+                index_elements=[CellUsage.content_hash],
+                set_={
+                    "usage_count": CellUsage.usage_count + statement.excluded.usage_count,
+                    "last_used_at": statement.excluded.last_used_at,
+                }
+            )
+            session.execute(statement, params)
+
+            # 素材库中的同一内容（content_hash 同为 MD5）同步累加
+            session.execute(
+                text(
+                    "UPDATE materials SET usage_count = COALESCE(usage_count, 0) + :usage_count, "
+                    "last_used_at = :last_used_at WHERE content_hash = :content_hash"
+                ),
+                params
+            )
+            session.commit()
+            logger.info(f"单元格使用次数已更新: {len(params)} 条内容")
+            return True
+        except Exception as e:
+            session.rollback()
+            logger.error(f"更新单元格使用次数失败: {e}")
+            return False
+        finally:
+            session.close()
+
+    def add_material_usage(self, increments: Dict[int, int], used_at: datetime = None) -> bool:
+        """
+        按素材 ID 累加使用次数（一个事务，executemany）
+
+        Args:
+            increments: {素材 ID: 增量}
+            used_at: 使用时间（默认当前时间）
+
+        Returns:
+            是否成功
+        """
+        params = [
+            {"material_id": material_id, "usage_count": count, "last_used_at": used_at or datetime.now()}
+            for material_id, count in increments.items() if count
+        ]
+        if not params:
+            return True
+
+        session = self.db_manager.get_session()
+        try:
+            session.execute(
+                text(
+                    "UPDATE materials SET usage_count = COALESCE(usage_count, 0) + :usage_count, "
+                    "last_used_at = :last_used_at WHERE id = :material_id"
+                ),
+                params
+            )
+            session.commit()
+            logger.info(f"素材使用次数已更新: {len(params)} 条素材")
+            return True
+        except Exception as e:
+            session.rollback()
+            logger.error(f"更新素材使用次数失败: {e}")
+            return False
+        finally:
+            session.close()
+
+
+class UsageAccumulator:
+    """
+    使用次数累加器
+
+    生成流程可以随意调用 add / add_material（只在内存中计数，线程安全），
+    累加的次数在 flush 时一次性写入；设置了 flush_interval 时，距上次写入超过该秒数后
+    下一次累加会顺带写入，长时间运行的批次中途退出也只丢失最近一段的计数。
+    """
+
+    def __init__(self, usage_manager: CellUsageManager = None, flush_interval: float = 0):
+        """
+        初始化累加器
+
+        Args:
+            usage_manager: CellUsageManager 实例（可选）
+            flush_interval: 定期写入间隔（秒），0 表示只在调用 flush 时写入
+        """
+        self.usage_manager = usage_manager or CellUsageManager()
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._hashes: Counter = Counter()
+        self._materials: Counter = Counter()
+        self._last_flush = time.monotonic()
+
+    @property
+    def pending(self) -> int:
+        """尚未写入的累加条目数"""
+        with self._lock:
+            return len(self._hashes) + len(self._materials)
+
+    def add(self, content_hash: str, count: int = 1):
+        """
+        按内容哈希累加（写入 cell_usage，并同步素材表中相同内容的素材）
+
+        Args:
+            content_hash: 内容 MD5 哈希
+            count: 增量
+        """
+        with self._lock:
+            self._hashes[content_hash] += count
+        self._maybe_flush()
+
+    def add_material(self, material_id: int, count: int = 1):
+        """
+        按素材 ID 累加（只更新素材表）
+
+        Args:
+            material_id: 素材 ID
+            count: 增量
+        """
+        with self._lock:
+            self._materials[material_id] += count
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        """距上次写入超过 flush_interval 时写入"""
+        if self.flush_interval and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> bool:
+        """
+        把累加的次数写入数据库（两类计数各一个事务）
+
+        Returns:
+            是否成功（失败的计数保留，下次 flush 时重试）
+        """
+        # 写入期间其他线程可以继续累加：先取走当前计数，失败时再加回去
+        with self._flush_lock:
+            with self._lock:
+                hashes, self._hashes = self._hashes, Counter()
+                materials, self._materials = self._materials, Counter()
+                self._last_flush = time.monotonic()
+
+            now = datetime.now()
+            success = True
+            if hashes and not self.usage_manager.add_usage(dict(hashes), now):
+                success = False
+                with self._lock:
+                    self._hashes.update(hashes)
+            if materials and not self.usage_manager.add_material_usage(dict(materials), now):
+                success = False
+                with self._lock:
+                    self._materials.update(materials)
+            return success
@@ -0,0 +1,159 @@
+"""
+SEO 智能内容工作台 - 命令行批量生成入口
+无需 Qt 界面，适合在构建服务器上跑夜间批次
+
+用法:
+    python -m seo_workbench.generate --grid data.xlsx --mode shuffle --count 500 --output out/
+    python -m seo_workbench.generate --grid data.csv --mode row --shard 2/4
+
+标准输出每行一个 JSON 事件（start / progress / done / error），日志写入标准错误和 logs 目录。
+
+分片运行时文档内容与单机一致，但质量评级（文件名前缀）与历史查重重试只在分片内比较；
+各分片的质量报告为 quality_report_{i}of{N}.csv，合并方式见 core/seeding.py。
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from loguru import logger
+
+from .config.settings import ProfileConfig
+from .core.generation_engine import GenerationEngine
+from .core.seeding import parse_shard
+from .database.init_db import init_database
+from .utils.file_handler import FileHandler
+from .utils.logger import setup_logger
+from .utils.tracing import parse_module_levels
+
+
+def emit(event: str, **fields):
+    """
+    输出一行机器可读的进度事件
+    
+    Args:
+        event: 事件类型
+        **fields: 事件字段
+    """
+    print(json.dumps({"event": event, **fields}, ensure_ascii=False), flush=True)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """创建命令行参数解析器"""
+    parser = argparse.ArgumentParser(
+        prog="python -m seo_workbench.generate",
+        description="按配置文件和表格数据批量生成 Word 文档（无界面）"
+    )
+    parser.add_argument("--profile", default="profile.json", help="配置文件路径（默认 profile.json）")
+    parser.add_argument("--grid", required=True, help="网格数据文件（.xlsx / .xls / .csv，首行为表头）")
+    parser.add_argument("--mode", choices=["row", "shuffle"], default="shuffle", help="生成模式（默认 shuffle）")
+    parser.add_argument("--count", type=int, default=None, help="混排模式生成数量（默认等于行数）")
+    parser.add_argument("--output", default=None, help="输出目录（默认使用配置中的 output_directory）")
+    parser.add_argument("--db", default="assets.db", help="数据库文件路径（对比表、历史查重使用）")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子（默认使用配置中的 generation_seed）")
+    parser.add_argument("--shard", default=None, help="分片 i/N：只生成属于第 i 片的文档，例如 1/4")
+    parser.add_argument("--titles", default=None, help="AI 标题文件（每行一个标题，混排模式下依次替换第一列）")
+    parser.add_argument("--title-format", default="H1", help="AI 标题使用的列格式（默认 H1）")
+    parser.add_argument("--timing", action="store_true", help="统计各阶段耗时并输出 generation_profile.json")
+    parser.add_argument("--log-level", default="INFO", help="日志级别（默认 INFO）")
+    parser.add_argument(
+        "--log-module",
+        action="append",
+        default=[],
+        metavar="MODULE=LEVEL",
+        help="单独设置某个模块的日志级别，可重复，例如 core.smart_numbering=TRACE"
+    )
+    return parser
+
+
+def main(argv=None) -> int:
+    """主函数"""
+    args = build_parser().parse_args(argv)
+    
+    try:
+        module_levels = parse_module_levels(args.log_module)
+    except ValueError as e:
+        emit("error", message=str(e))
+        return 2
+    
+    # 标准输出只留给 JSON 事件
+    setup_logger(log_level=args.log_level, console=sys.stderr, module_levels=module_levels)
+    
+    try:
+        shard = parse_shard(args.shard)
+    except ValueError as e:
+        emit("error", message=str(e))
+        return 2
+    
+    config = ProfileConfig.load_from_file(args.profile)
+    if args.timing:
+        config.profiling_enabled = True
+    init_database(args.db, config.database_config)
+    
+    grid_data = FileHandler.read_grid(args.grid)
+    if not grid_data:
+        emit("error", message=f"网格数据为空或无法读取: {args.grid}")
+        return 1
+    
+    title_queue = None
+    if args.titles:
+        title_queue = [
+            line.strip()
+            for line in Path(args.titles).read_text(encoding="utf-8").splitlines()
+            if line.strip()
+        ]
+    
+    if args.mode == "row":
+        count = len(grid_data)
+    elif title_queue:
+        # 标题驱动模式：数量与标题数量一致
+        count = len(title_queue)
+    else:
+        count = args.count if args.count is not None else len(grid_data)
+    
+    output_dir = args.output or config.output_directory
+    
+    emit(
+        "start",
+        mode=args.mode,
+        total=count,
+        rows=len(grid_data),
+        shard=args.shard,
+        output=str(Path(output_dir).resolve())
+    )
+    
+    def on_progress(current: int, total: int, detail: str = ""):
+        emit("progress", current=current, total=total, detail=detail)
+    
+    engine = GenerationEngine(config)
+    start_time = time.monotonic()
+    
+    try:
+        generated = engine.generate(
+            grid_data=grid_data,
+            save_dir=output_dir,
+            mode=args.mode,
+            count=count,
+            progress_callback=on_progress,
+            title_queue=title_queue,
+            title_format=args.title_format,
+            seed=args.seed,
+            shard=shard
+        )
+    except Exception as e:
+        logger.exception(f"批量生成失败: {e}")
+        emit("error", message=str(e))
+        return 1
+    
+    emit(
+        "done",
+        generated=generated,
+        elapsed=round(time.monotonic() - start_time, 3),
+        files=engine.generated_files
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
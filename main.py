@@ -4,6 +4,7 @@ SEO 智能内容工作台 - 主程序入口
 
 import sys
 import os
+import multiprocessing
 from pathlib import Path
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtCore import Qt
@@ -72,9 +73,9 @@ def main():
         splash = SplashScreen(background_image=splash_image)
         splash.show()
         
-        # 初始化数据库和配置
-        db_manager = init_database("assets.db")
+        # 初始化配置和数据库（数据库连接参数来自配置）
         config = load_config()
+        db_manager = init_database("assets.db", config.database_config)
         
         # 创建主窗口（但先不显示）
         window = MainWindow(config, db_manager)
@@ -94,4 +95,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # 打包为可执行文件后，素材批量导入的进程池子进程需要由这里接管
+    multiprocessing.freeze_support()
     sys.exit(main())
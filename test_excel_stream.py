@@ -0,0 +1,302 @@
+"""
+Excel 流式读取快速测试脚本
+生成各种写法的工作簿，分别用 iter_excel_chunks 和 openpyxl 只读模式读取，
+验证两者经 cell_text 转换后的每个单元格完全一致：
+稀疏单元格、省略 r 属性、空行、共享字符串（富文本、拼音注音 rPh）、内联字符串、
+日期 / 时长格式、1904 日期系统、布尔值、错误值、公式字符串结果
+"""
+
+import random
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+from loguru import logger
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from openpyxl import load_workbook
+
+from seo_workbench.utils.excel_stream import cell_text, iter_excel_chunks
+
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PACKAGE_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+CONTENT_TYPES = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>
+</Types>"""
+
+ROOT_RELS = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="{PACKAGE_REL_NS}">
+<Relationship Id="rId1" Type="{REL_NS}/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+WORKBOOK_RELS = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="{PACKAGE_REL_NS}">
+<Relationship Id="rId1" Type="{REL_NS}/worksheet" Target="worksheets/sheet1.xml"/>
+<Relationship Id="rId2" Type="{REL_NS}/sharedStrings" Target="sharedStrings.xml"/>
+<Relationship Id="rId3" Type="{REL_NS}/styles" Target="styles.xml"/>
+</Relationships>"""
+
+# 样式序号：0 常规，1 内置日期(14)，2 自定义日期，3 时长，4 两位小数
+STYLES = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="{MAIN_NS}">
+<numFmts count="2"><numFmt numFmtId="164" formatCode="yyyy/mm/dd hh:mm"/><numFmt numFmtId="165" formatCode="[h]:mm:ss"/></numFmts>
+<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>
+<fills count="1"><fill><patternFill patternType="none"/></fill></fills>
+<borders count="1"><border/></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="5">
+<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>
+<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+<xf numFmtId="2" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+</cellXfs>
+</styleSheet>"""
+
+TEXT_PIECES = ["吸尘器", "吸力", "续航", "Dyson", "V12", " ", "a&b", "<tag>", "\"引号\"", "1.0", "换\n行", "  前后空格  "]
+
+
+def _text(rng: random.Random) -> str:
+    return "".join(rng.choice(TEXT_PIECES) for _ in range(rng.randint(1, 3)))
+
+
+def _t(text: str) -> str:
+    return f'<t xml:space="preserve">{escape(text)}</t>'
+
+
+class SharedStrings:
+    """按首次使用的顺序收集共享字符串（部分写成富文本或带拼音注音）"""
+    
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.items = []
+        self._index = {}
+    
+    def add(self, text: str) -> int:
+        if text not in self._index:
+            self._index[text] = len(self.items)
+            self.items.append(self._si(text))
+        return self._index[text]
+    
+    def _si(self, text: str) -> str:
+        kind = self.rng.random()
+        if kind < 0.2 and len(text) > 1:
+            # 富文本：拆成两段，第二段加粗
+            cut = self.rng.randint(1, len(text) - 1)
+            return f'<si><r>{_t(text[:cut])}</r><r><rPr><b/></rPr>{_t(text[cut:])}</r></si>'
+        if kind < 0.35:
+            # 拼音注音不属于单元格文本
+            return f'<si>{_t(text)}<rPh sb="0" eb="1"><t>ふりがな</t></rPh><phoneticPr fontId="0" type="noConversion"/></si>'
+        return f'<si>{_t(text)}</si>'
+    
+    def xml(self) -> str:
+        return (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                f'<sst xmlns="{MAIN_NS}" count="{len(self.items)}" uniqueCount="{len(self.items)}">'
+                + "".join(self.items) + '</sst>')
+
+
+def _column_letter(index: int) -> str:
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _random_cell(rng: random.Random, strings: SharedStrings) -> str:
+    """一个单元格的属性和内容（不含 r 属性）"""
+    kind = rng.randrange(12)
+    if kind == 0:
+        return f' t="s"><v>{strings.add(_text(rng))}</v>'
+    if kind == 1:
+        return f' t="inlineStr"><is>{_t(_text(rng))}</is>'
+    if kind == 2:
+        return f'><v>{rng.randint(-10 ** 6, 10 ** 6)}</v>'
+    if kind == 3:
+        return f'><v>{rng.choice([0.5, -2.25, 1e-7, 3.0, 12345.678, 1e20])}</v>'
+    if kind == 4:
+        return f' s="1"><v>{rng.randint(1, 60000)}</v>'
+    if kind == 5:
+        return f' s="2"><v>{rng.randint(1, 60000) + rng.randrange(1440) / 1440}</v>'
+    if kind == 6:
+        return f' s="3"><v>{rng.randrange(1, 20000) / 1440}</v>'
+    if kind == 7:
+        return f' s="4"><v>{rng.randint(0, 999)}</v>'
+    if kind == 8:
+        return f' t="b"><v>{rng.randint(0, 1)}</v>'
+    if kind == 9:
+        return f' t="e"><v>{rng.choice(["#N/A", "#DIV/0!", "#VALUE!", "#REF!"])}</v>'
+    if kind == 10:
+        return f' t="str"><f>A1&amp;"x"</f><v>{escape(_text(rng))}</v>'
+    return ' t="s"><v>0</v>'
+
+
+def build_sheet(rng: random.Random, strings: SharedStrings, row_count: int, column_count: int) -> str:
+    """随机工作表：稀疏单元格、空行，部分行 / 单元格省略 r 属性"""
+    strings.add("表头")
+    rows = [f'<row r="1">' + "".join(
+        f'<c r="{_column_letter(col)}1" t="s"><v>0</v></c>' for col in range(column_count)
+    ) + '</row>']
+    row_number = 1
+    for _ in range(row_count):
+        # 空行：跳过若干行号
+        step = 1 if rng.random() < 0.8 else rng.randint(2, 4)
+        row_number += step
+        row_attr = f' r="{row_number}"' if step > 1 or rng.random() < 0.7 else ""
+        
+        cells = []
+        previous = -1
+        for col in range(column_count + rng.randint(0, 2)):
+            if rng.random() < 0.35:
+                continue
+            # 紧接上一个单元格时可以省略 r
+            cell_attr = f' r="{_column_letter(col)}{row_number}"' if col != previous + 1 or rng.random() < 0.6 else ""
+            cells.append(f'<c{cell_attr}{_random_cell(rng, strings)}</c>')
+            previous = col
+        rows.append(f'<row{row_attr}>' + "".join(cells) + '</row>')
+    
+    return (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<worksheet xmlns="{MAIN_NS}" xmlns:r="{REL_NS}"><sheetData>'
+            + "".join(rows) + '</sheetData></worksheet>')
+
+
+def write_workbook(path: Path, sheet_xml: str, strings: SharedStrings, date1904: bool = False):
+    """按最小的 OOXML 结构写出工作簿"""
+    workbook_pr = '<workbookPr date1904="1"/>' if date1904 else '<workbookPr/>'
+    workbook = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">{workbook_pr}'
+                f'<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>')
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", CONTENT_TYPES)
+        archive.writestr("_rels/.rels", ROOT_RELS)
+        archive.writestr("xl/workbook.xml", workbook)
+        archive.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS)
+        archive.writestr("xl/styles.xml", STYLES)
+        archive.writestr("xl/sharedStrings.xml", strings.xml())
+        archive.writestr("xl/worksheets/sheet1.xml", sheet_xml)
+
+
+def _trim(cells) -> list:
+    """去掉行末的空单元格"""
+    cells = list(cells)
+    while cells and not cells[-1]:
+        cells.pop()
+    return cells
+
+
+def _trim_rows(rows: list) -> list:
+    """去掉末尾的空行"""
+    while rows and not rows[-1]:
+        rows.pop()
+    return rows
+
+
+def stream_rows(path: Path) -> list:
+    """iter_excel_chunks 读出的数据行（用很小的块，覆盖跨块拼接）"""
+    rows = []
+    for chunk in iter_excel_chunks(str(path), first_chunk_rows=7, chunk_rows=50):
+        for row in range(chunk.row_count):
+            rows.append(_trim(column[row] for column in chunk.columns))
+    return _trim_rows(rows)
+
+
+def openpyxl_rows(path: Path) -> list:
+    """openpyxl 只读模式读出的数据行（跳过表头）"""
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = [_trim(cell_text(value) for value in row) for row in workbook.worksheets[0].iter_rows(values_only=True)]
+    finally:
+        workbook.close()
+    return _trim_rows(rows[1:])
+
+
+def assert_same(path: Path, label: str) -> int:
+    expected = openpyxl_rows(path)
+    actual = stream_rows(path)
+    assert len(actual) == len(expected), f"{label}: 行数不同 {len(actual)} != {len(expected)}"
+    for number, (got, want) in enumerate(zip(actual, expected), start=2):
+        assert got == want, f"{label}: 第 {number} 行不同\n  流式:     {got}\n  openpyxl: {want}"
+    return len(expected)
+
+
+def test_random_workbooks(folder: Path):
+    """随机生成的工作簿（1900 / 1904 日期系统）"""
+    print("\n" + "=" * 50)
+    print("测试 1: 随机工作簿与 openpyxl 一致")
+    print("=" * 50)
+    
+    total = 0
+    for seed in range(12):
+        rng = random.Random(seed)
+        strings = SharedStrings(rng)
+        sheet = build_sheet(rng, strings, row_count=rng.choice([0, 1, 30, 250]), column_count=rng.randint(1, 8))
+        path = folder / f"random_{seed}.xlsx"
+        write_workbook(path, sheet, strings, date1904=seed % 3 == 0)
+        total += assert_same(path, f"随机工作簿 {seed}")
+    
+    print(f"✅ 12 个随机工作簿、共 {total} 行数据一致")
+
+
+def test_large_workbook(folder: Path):
+    """较大的工作簿（共享字符串按需解析、跨多个块）"""
+    print("\n" + "=" * 50)
+    print("测试 2: 3000 条数据行的工作簿与 openpyxl 一致")
+    print("=" * 50)
+    
+    rng = random.Random(2024)
+    strings = SharedStrings(rng)
+    path = folder / "large.xlsx"
+    write_workbook(path, build_sheet(rng, strings, row_count=3000, column_count=6), strings)
+    rows = assert_same(path, "3000 条数据行的工作簿")
+    
+    print(f"✅ 含空行共 {rows} 行一致")
+
+
+def test_header_only(folder: Path):
+    """只有表头的工作表返回一个 0 行、列数等于表头的块；空工作表不返回块"""
+    print("\n" + "=" * 50)
+    print("测试 3: 只有表头 / 空工作表")
+    print("=" * 50)
+    
+    rng = random.Random(0)
+    strings = SharedStrings(rng)
+    path = folder / "header_only.xlsx"
+    write_workbook(path, build_sheet(rng, strings, row_count=0, column_count=4), strings)
+    chunks = list(iter_excel_chunks(str(path)))
+    assert [(len(chunk.columns), chunk.row_count) for chunk in chunks] == [(4, 0)], "只有表头时应返回 4 列 0 行"
+    
+    empty = folder / "empty.xlsx"
+    write_workbook(empty, f'<worksheet xmlns="{MAIN_NS}"><sheetData/></worksheet>', SharedStrings(rng))
+    assert list(iter_excel_chunks(str(empty))) == [], "空工作表不应返回数据块"
+    
+    print("✅ 只有表头时保留列数，空工作表没有数据块")
+
+
+def main():
+    """主测试流程"""
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    
+    with tempfile.TemporaryDirectory() as folder:
+        test_random_workbooks(Path(folder))
+        test_large_workbook(Path(folder))
+        test_header_only(Path(folder))
+    print("\n✅ 所有 Excel 流式读取测试通过")
+
+
+if __name__ == "__main__":
+    main()
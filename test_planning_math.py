@@ -0,0 +1,189 @@
+"""
+组合规划基础函数快速测试脚本
+验证批量生成依赖的几个纯函数：
+- IndexPermutation 是 [0, N) 上的双射，各分片用同一种子得到同一排列
+- SpintaxTemplate.unrank / CombinationPlanner.unrank 不同编号得到不同结果
+- TextStats.total_words 按段累加的字数与对连接后全文计数一致
+"""
+
+import random
+import sys
+from pathlib import Path
+from loguru import logger
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from seo_workbench.config.settings import ProfileConfig, ShufflingStrategy
+from seo_workbench.core.combination_planner import CombinationPlanner
+from seo_workbench.core.quality_checker import CELL_SEPARATOR, QualityChecker, TextStats
+from seo_workbench.core.seeding import IndexPermutation, make_run_rng, parse_shard, shard_indices
+from seo_workbench.core.spintax_parser import SpintaxParser
+
+
+SEED = 20240601
+
+
+def test_permutation_bijective():
+    """各种长度的排列都恰好覆盖 [0, N) 一次，同一种子得到同一排列"""
+    print("\n" + "=" * 50)
+    print("测试 1: IndexPermutation 是双射")
+    print("=" * 50)
+    
+    sizes = [0, 1, 2, 3, 4, 5, 16, 17, 100, 255, 256, 1000, 4097]
+    for size in sizes:
+        for seed in range(5):
+            permutation = IndexPermutation(size, make_run_rng(seed, "plan"))
+            values = list(permutation)
+            assert sorted(values) == list(range(size)), f"长度 {size}、种子 {seed} 的排列不是双射"
+            assert values == list(IndexPermutation(size, make_run_rng(seed, "plan"))), f"长度 {size} 的排列不可复现"
+    
+    # 超大区间：不展开整个排列，只检查前若干个值在范围内且互不相同
+    size = 2 ** 70 + 12345
+    permutation = IndexPermutation(size, make_run_rng(SEED, "plan"))
+    head = [permutation[i] for i in range(2000)]
+    assert all(0 <= value < size for value in head), "超大排列的值超出范围"
+    assert len(set(head)) == len(head), "超大排列出现重复值"
+    
+    for index in (-1, size):
+        try:
+            permutation[index]
+        except IndexError:
+            continue
+        raise AssertionError(f"位置 {index} 超出范围却没有报错")
+    
+    print(f"✅ {len(sizes)} 种长度 × 5 个种子的排列都是双射")
+
+
+def test_shards_agree():
+    """各分片的文档序号互不相交、并集为全部序号，且每篇文档取到的组合编号与单机一致"""
+    print("\n" + "=" * 50)
+    print("测试 2: 分片与单机一致")
+    print("=" * 50)
+    
+    count, size = 103, 500
+    single = IndexPermutation(size, make_run_rng(SEED, "plan"))
+    expected = {index: single[index] for index in shard_indices(count)}
+    
+    for total in range(1, 6):
+        seen = {}
+        for shard_number in range(1, total + 1):
+            shard = parse_shard(f"{shard_number}/{total}")
+            # 每个分片是独立进程：重新按运行种子构造排列
+            permutation = IndexPermutation(size, make_run_rng(SEED, "plan"))
+            for index in shard_indices(count, shard):
+                assert index not in seen, f"文档 {index} 同时属于两个分片"
+                seen[index] = permutation[index]
+        assert seen == expected, f"{total} 个分片的结果与单机不同"
+    
+    for text in ("0/4", "5/4", "1/0", "a/b", "1-4"):
+        try:
+            parse_shard(text)
+        except ValueError:
+            continue
+        raise AssertionError(f"分片参数 '{text}' 应当报错")
+    
+    print("✅ 1 ~ 5 个分片的并集与单机的文档序号、组合编号完全一致")
+
+
+def test_spintax_unrank_distinct():
+    """模板的每个变体编号得到不同的文本"""
+    print("\n" + "=" * 50)
+    print("测试 3: SpintaxTemplate.unrank 结果互不相同")
+    print("=" * 50)
+    
+    templates = [
+        "没有选项组",
+        "{吸力|续航|噪音}表现{很好|一般}",
+        "{希喂|美的{A1|A2|A3}|小米}吸尘器{，|。}",
+        "{{大|小}户型|{木|瓷砖}地板}适用{，价格{实惠|适中}|}",
+    ]
+    for text in templates:
+        template = SpintaxParser.compile(text)
+        variants = [template.unrank(rank) for rank in range(template.variations)]
+        assert len(set(variants)) == template.variations, f"'{text}' 的变体有重复: {variants}"
+        
+        try:
+            template.unrank(template.variations)
+        except IndexError:
+            pass
+        else:
+            raise AssertionError(f"'{text}' 的变体编号超出范围却没有报错")
+    
+    print(f"✅ {len(templates)} 个模板的全部变体互不相同")
+
+
+def test_planner_unrank_distinct():
+    """组合空间中的每个编号得到不同的文档规划"""
+    print("\n" + "=" * 50)
+    print("测试 4: CombinationPlanner.unrank 结果互不相同")
+    print("=" * 50)
+    
+    columns_data = [
+        ["标题A", "标题B", "标题{一|二}"],
+        ["正文1", "正文2"],
+        ["卖点1", "卖点{甲|乙|丙}"],
+        ["卖点3"],
+        ["卖点4", "卖点5"],
+        ["结尾1", "结尾2", "结尾1"],
+    ]
+    configs = {
+        "无策略": ProfileConfig(),
+        "单列保留 2 个": ProfileConfig(shuffling_strategies=[
+            ShufflingStrategy(name="卖点", columns=[2, 3, 4], group_size=1, keep_count=2),
+        ]),
+        "两列一组保留 1 组": ProfileConfig(shuffling_strategies=[
+            ShufflingStrategy(name="卖点组", columns=[1, 2, 3, 4], group_size=2, keep_count=1),
+        ]),
+    }
+    
+    for name, config in configs.items():
+        planner = CombinationPlanner(config, columns_data)
+        assert planner.supported, f"{name}: 组合规划不可用"
+        plans = set()
+        for rank in range(planner.size):
+            plan = planner.unrank(rank)
+            plans.add((tuple(plan.cells), tuple(sorted(plan.spintax_ranks.items()))))
+        assert len(plans) == planner.size, f"{name}: {planner.size} 个编号只得到 {len(plans)} 种规划"
+        print(f"  {name}: {planner.size} 种组合互不相同")
+    
+    print("✅ 组合规划的编号与文档规划一一对应")
+
+
+def test_total_words_matches_joined_text():
+    """按段累加的字数与 count_chinese_words 对连接后全文的结果一致"""
+    print("\n" + "=" * 50)
+    print("测试 5: TextStats.total_words 与全文计数一致")
+    print("=" * 50)
+    
+    alphabet = ["吸", "尘", "器", "a", "B", "z", "1", "9", " ", "，", "。", "!", "-", "\n", "\t", "…"]
+    rng = random.Random(SEED)
+    samples = 20000
+    for _ in range(samples):
+        cells = [
+            "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 8)))
+            for _ in range(rng.randint(1, 5))
+        ]
+        expected = QualityChecker.count_chinese_words(CELL_SEPARATOR.join(cells))
+        actual = TextStats.total_words([TextStats(cell) for cell in cells])
+        assert actual == expected, f"{cells!r}: 按段累加 {actual}，全文 {expected}"
+    
+    print(f"✅ {samples} 组随机单元格的字数一致")
+
+
+def main():
+    """主测试流程"""
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    
+    test_permutation_bijective()
+    test_shards_agree()
+    test_spintax_unrank_distinct()
+    test_planner_unrank_distinct()
+    test_total_words_matches_joined_text()
+    print("\n✅ 所有组合规划测试通过")
+
+
+if __name__ == "__main__":
+    main()
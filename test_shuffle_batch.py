@@ -0,0 +1,117 @@
+"""
+批量混排快速测试脚本
+验证 ShuffleEngine.execute_batch 与逐篇执行的 execute 结果一致：
+保留结果满足同样的约束、可能的结果与出现频率相同，且第 i 篇文档的结果不随批次大小变化
+"""
+
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+from loguru import logger
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from seo_workbench.config.settings import ShufflingStrategy
+from seo_workbench.core.shuffle_engine import ShuffleEngine
+
+
+TOTAL_COLUMNS = 12
+SAMPLES = 20000
+
+
+def create_engine() -> ShuffleEngine:
+    """两个策略：2 列一组保留 1 组（含不完整的最后一组），单列保留 2 个"""
+    return ShuffleEngine([
+        ShufflingStrategy(name="品牌词组", columns=[2, 3, 4, 5, 6], group_size=2, keep_count=1, shuffle_order=True),
+        ShufflingStrategy(name="竞品对比组", columns=[8, 9, 10], group_size=1, keep_count=2, shuffle_order=False),
+    ])
+
+
+def kept_pattern(engine: ShuffleEngine, keep_map) -> tuple:
+    """把保留映射转换为各策略保留的组，同时检查约束（整组保留、保留组数、策略外的列总是保留）"""
+    strategy_columns = set()
+    pattern = []
+    for strategy in engine.strategies:
+        groups = engine._split_groups(strategy)
+        kept = []
+        for group_idx, group in enumerate(groups):
+            flags = {keep_map[col] for col in group}
+            assert len(flags) == 1, f"组 {group} 只保留了一部分列"
+            if flags.pop():
+                kept.append(group_idx)
+        assert len(kept) == min(strategy.keep_count, len(groups)), f"策略 '{strategy.name}' 保留组数错误: {kept}"
+        pattern.append(tuple(kept))
+        strategy_columns.update(strategy.columns)
+    
+    for col in range(TOTAL_COLUMNS):
+        if col not in strategy_columns:
+            assert keep_map[col], f"策略外的列 {col} 被删除"
+    return tuple(pattern)
+
+
+def test_keep_mask_matches_execute():
+    """批量结果与逐篇 execute 的可能结果相同、出现频率一致"""
+    print("\n" + "=" * 50)
+    print("测试 1: 批量保留结果与 execute 一致")
+    print("=" * 50)
+    
+    engine = create_engine()
+    rng = random.Random(1)
+    single = Counter(kept_pattern(engine, engine.execute(TOTAL_COLUMNS, rng)) for _ in range(SAMPLES))
+    
+    batch = engine.execute_batch(TOTAL_COLUMNS, SAMPLES, seed=1)
+    assert len(batch) == SAMPLES
+    batched = Counter(kept_pattern(engine, batch.keep_map(i)) for i in range(SAMPLES))
+    
+    assert set(single) == set(batched), f"可能的结果不同: {set(single) ^ set(batched)}"
+    expected = SAMPLES / len(single)
+    for pattern in single:
+        # 每种结果均匀出现（允许 15% 的抽样误差）
+        assert abs(single[pattern] - expected) < expected * 0.15, f"execute 分布不均: {pattern}"
+        assert abs(batched[pattern] - expected) < expected * 0.15, f"execute_batch 分布不均: {pattern}"
+    
+    for i in range(100):
+        assert batch.kept_columns(i) == [col for col, keep in batch.keep_map(i).items() if keep]
+    
+    print(f"✅ {len(single)} 种保留结果，{SAMPLES} 篇文档的分布一致")
+
+
+def test_rows_independent_of_batch_size():
+    """第 i 篇文档的保留结果与组顺序只取决于 (seed, i)，与批次大小无关"""
+    print("\n" + "=" * 50)
+    print("测试 2: 结果不随批次大小变化")
+    print("=" * 50)
+    
+    engine = create_engine()
+    large = engine.execute_batch(TOTAL_COLUMNS, 5000, seed=42)
+    for count in (1, 7, 100, 4999):
+        small = engine.execute_batch(TOTAL_COLUMNS, count, seed=42)
+        assert (small.keep_mask == large.keep_mask[:count]).all(), f"批次大小 {count} 时保留结果不同"
+        for small_order, large_order in zip(small.group_orders, large.group_orders):
+            if large_order is None:
+                assert small_order is None
+            else:
+                assert (small_order == large_order[:count]).all(), f"批次大小 {count} 时组顺序不同"
+    
+    other = engine.execute_batch(TOTAL_COLUMNS, 100, seed=43)
+    assert not (other.keep_mask == large.keep_mask[:100]).all(), "不同种子得到了相同的结果"
+    
+    print("✅ 批次大小 1 / 7 / 100 / 4999 与 5000 的前缀一致")
+
+
+def main():
+    """主测试流程"""
+    # execute 每次调用都输出 DEBUG 日志，测试时只保留警告
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    
+    test_keep_mask_matches_execute()
+    test_rows_independent_of_batch_size()
+    print("\n✅ 所有批量混排测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -275,11 +275,15 @@ class ComparisonTableWidget(QWidget):
             for row in sheet.iter_rows(values_only=True):
                 data.append([str(cell) if cell is not None else "" for cell in row])
             
-            # 导入数据库
-            if self.db_manager.import_from_excel_data(self.current_category_id, data):
+            # 导入数据库（一个事务批量写入）
+            report = self.db_manager.import_from_excel_data(self.current_category_id, data)
+            if report:
                 InfoBar.success(
                     title="成功",
-                    content="Excel 数据导入成功",
+                    content=(
+                        f"Excel 数据导入成功：新增品牌 {len(report.added_brands)} 个、"
+                        f"参数 {len(report.added_parameters)} 个，更新 {len(report.changes)} 个单元格"
+                    ),
                     parent=self,
                     position=InfoBarPosition.TOP
                 )
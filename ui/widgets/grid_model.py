@@ -0,0 +1,396 @@
+"""
+工作区网格数据模型
+单元格按列存储在 Python 列表中（GridStore），表格视图通过 GridTableModel 只读取可见区域，
+不再为每个单元格创建 QTableWidgetItem。
+
+每列的非空内容（去除首尾空白）和所在行号按列缓存，编辑某列只让该列的缓存失效；
+生成时取快照（GridSnapshot）直接引用这些列表，之后的编辑按列写时复制，不影响正在生成的批次。
+"""
+
+from typing import Iterable, List, Optional, Sequence, Tuple
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QMimeData
+
+
+class GridRows(Sequence):
+    """按行访问快照中的非空行（每次取行时才从列中拼出，不复制整个网格）"""
+    
+    def __init__(self, columns: Sequence[List[str]], row_indices: List[int]):
+        """
+        Args:
+            columns: 各列的完整单元格列表
+            row_indices: 至少有一个非空单元格的行号（升序）
+        """
+        self._columns = columns
+        self._row_indices = row_indices
+    
+    def __len__(self) -> int:
+        return len(self._row_indices)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        row = self._row_indices[index]
+        return [column[row] for column in self._columns]
+
+
+class GridSnapshot:
+    """网格的只读快照（交给生成线程；列列表与 GridStore 共享，GridStore 写入前会先复制该列）"""
+    
+    def __init__(self, columns: Tuple[List[str], ...], column_values: Tuple[List[str], ...], row_indices: List[int]):
+        """
+        Args:
+            columns: 各列的完整单元格列表
+            column_values: 各列的非空内容（去除首尾空白）
+            row_indices: 非空行的行号
+        """
+        self.columns = columns
+        self.column_values = column_values
+        self.rows = GridRows(columns, row_indices)
+    
+    @property
+    def columns_data(self) -> List[List[str]]:
+        """按列组织的有效内容 [[col1_data...], ...]（与 SmartGrid.get_column_data 格式一致）"""
+        return list(self.column_values)
+
+
+class GridStore:
+    """
+    按列存储的网格数据
+    空单元格为 ""；所有列长度相同（等于行数）。
+    """
+    
+    def __init__(self, row_count: int = 0, column_count: int = 0):
+        self._row_count = row_count
+        self._columns: List[List[str]] = [[""] * row_count for _ in range(column_count)]
+        # 被快照引用的列（写入前先复制）
+        self._shared: List[bool] = [False] * column_count
+        # 每列的 (非空行号, 非空内容) 缓存，None 表示需要重新计算
+        self._views: List[Optional[Tuple[List[int], List[str]]]] = [None] * column_count
+        self._row_indices: Optional[List[int]] = None
+        # 非空单元格数（None 表示需要重新计算）
+        self._filled: Optional[int] = 0
+    
+    @property
+    def row_count(self) -> int:
+        return self._row_count
+    
+    @property
+    def column_count(self) -> int:
+        return len(self._columns)
+    
+    def cell(self, row: int, col: int) -> str:
+        """单元格文本（越界返回空字符串）"""
+        if 0 <= col < len(self._columns) and 0 <= row < self._row_count:
+            return self._columns[col][row]
+        return ""
+    
+    def column(self, col: int) -> List[str]:
+        """一列的完整单元格列表（只读，不要修改返回值）"""
+        return self._columns[col]
+    
+    # ==================== 写入 ====================
+    
+    def set_cell(self, row: int, col: int, text: str) -> bool:
+        """
+        设置单元格文本
+        
+        Returns:
+            内容是否变化
+        """
+        column = self._columns[col]
+        old = column[row]
+        if old == text:
+            return False
+        
+        column = self._writable(col)
+        column[row] = text
+        if self._filled is not None:
+            self._filled += bool(text.strip()) - bool(old.strip())
+        self._invalidate(col)
+        return True
+    
+    def resize(self, row_count: int, column_count: int):
+        """调整行数和列数（扩大时补空单元格，缩小时丢弃多出的单元格）"""
+        if row_count != self._row_count:
+            for col in range(len(self._columns)):
+                column = self._writable(col)
+                if row_count > self._row_count:
+                    # 只补空单元格，非空内容缓存仍然有效
+                    column.extend([""] * (row_count - self._row_count))
+                else:
+                    del column[row_count:]
+                    self._invalidate(col)
+            if row_count < self._row_count:
+                self._filled = None
+            self._row_count = row_count
+        
+        if column_count > len(self._columns):
+            added = column_count - len(self._columns)
+            self._columns.extend([""] * self._row_count for _ in range(added))
+            self._shared.extend([False] * added)
+            self._views.extend([None] * added)
+        elif column_count < len(self._columns):
+            del self._columns[column_count:]
+            del self._shared[column_count:]
+            del self._views[column_count:]
+            self._filled = None
+            self._row_indices = None
+    
+    def load_columns(self, columns: List[List[str]], row_count: int):
+        """
+        整体替换数据（列表直接接管，不复制）
+        
+        Args:
+            columns: 各列单元格，短于 row_count 的列会补空单元格
+            row_count: 行数
+        """
+        for column in columns:
+            if len(column) < row_count:
+                column.extend([""] * (row_count - len(column)))
+        self._columns = columns
+        self._row_count = row_count
+        self._shared = [False] * len(columns)
+        self._views = [None] * len(columns)
+        self._row_indices = None
+        self._filled = None
+    
+    def load_rows(self, rows: Iterable[Sequence], column_count: Optional[int] = None):
+        """
+        按行整体替换数据
+        
+        Args:
+            rows: 行数据（单元格会转换为字符串，None 视为空）
+            column_count: 列数（默认取最长行的长度）
+        """
+        rows = list(rows)
+        if column_count is None:
+            column_count = max((len(row) for row in rows), default=0)
+        columns = [
+            ["" if col >= len(row) or row[col] is None else str(row[col]) for row in rows]
+            for col in range(column_count)
+        ]
+        self.load_columns(columns, len(rows))
+    
+    def append_columns(self, columns: Sequence[List[str]], row_count: int):
+        """
+        在底部追加若干行（按列给出，如流式导入的一块数据）
+        
+        Args:
+            columns: 各列新增的单元格（长度均为 row_count；少于现有列数的列补空单元格，多出的列自动添加）
+            row_count: 新增行数
+        """
+        if len(columns) > len(self._columns):
+            self.resize(self._row_count, len(columns))
+        
+        filled = 0
+        for col in range(len(self._columns)):
+            column = self._writable(col)
+            if col < len(columns):
+                added = columns[col]
+                column.extend(added)
+                filled += sum(1 for text in added if text and not text.isspace())
+            else:
+                column.extend([""] * row_count)
+            self._views[col] = None
+        self._row_indices = None
+        self._row_count += row_count
+        if self._filled is not None:
+            self._filled += filled
+    
+    def clear(self):
+        """清空所有单元格（保留行数和列数）"""
+        self.load_columns([[""] * self._row_count for _ in self._columns], self._row_count)
+    
+    def _writable(self, col: int) -> List[str]:
+        """返回可以原地修改的列（被快照引用时先复制）"""
+        if self._shared[col]:
+            self._columns[col] = list(self._columns[col])
+            self._shared[col] = False
+        return self._columns[col]
+    
+    def _invalidate(self, col: int):
+        self._views[col] = None
+        self._row_indices = None
+    
+    # ==================== 读取（缓存） ====================
+    
+    def _view(self, col: int) -> Tuple[List[int], List[str]]:
+        view = self._views[col]
+        if view is None:
+            column = self._columns[col]
+            rows = [row for row, text in enumerate(column) if text and not text.isspace()]
+            view = (rows, [column[row].strip() for row in rows])
+            self._views[col] = view
+        return view
+    
+    def column_values(self, col: int) -> List[str]:
+        """一列的非空内容（去除首尾空白，缓存；不要修改返回值）"""
+        return self._view(col)[1]
+    
+    def last_filled_row(self, col: int) -> int:
+        """一列最后一个非空单元格的行号（列为空时返回 -1）"""
+        rows = self._view(col)[0]
+        return rows[-1] if rows else -1
+    
+    def filled_rows(self) -> List[int]:
+        """至少有一个非空单元格的行号（升序，缓存；不要修改返回值）"""
+        if self._row_indices is None:
+            views = [self._view(col)[0] for col in range(len(self._columns))]
+            non_empty = [rows for rows in views if rows]
+            if len(non_empty) == 1:
+                self._row_indices = non_empty[0]
+            elif any(len(rows) == self._row_count for rows in non_empty):
+                # 有一列没有空单元格：所有行都非空
+                self._row_indices = list(range(self._row_count))
+            else:
+                self._row_indices = sorted(set().union(*non_empty))
+        return self._row_indices
+    
+    def has_data(self) -> bool:
+        """是否有任何非空单元格"""
+        if self._filled is None:
+            self._filled = sum(len(self._view(col)[0]) for col in range(len(self._columns)))
+        return self._filled > 0
+    
+    def snapshot(self) -> GridSnapshot:
+        """
+        生成用的只读快照（列已缓存时为 O(列数)，不复制单元格）
+        
+        Returns:
+            GridSnapshot
+        """
+        column_values = tuple(self.column_values(col) for col in range(len(self._columns)))
+        row_indices = self.filled_rows()
+        self._shared = [True] * len(self._columns)
+        return GridSnapshot(tuple(self._columns), column_values, row_indices)
+
+
+class GridTableModel(QAbstractTableModel):
+    """GridStore 的表格模型（视图只请求可见单元格）"""
+    
+    def __init__(self, store: GridStore = None, parent=None):
+        super().__init__(parent)
+        self.store = store or GridStore()
+    
+    # ==================== 整体修改 ====================
+    
+    def resize(self, row_count: int, column_count: int):
+        """调整行数和列数"""
+        self.beginResetModel()
+        self.store.resize(row_count, column_count)
+        self.endResetModel()
+    
+    def ensure_size(self, row_count: int, column_count: int):
+        """行数或列数不足时扩大（不缩小）"""
+        store = self.store
+        if row_count > store.row_count or column_count > store.column_count:
+            self.resize(max(row_count, store.row_count), max(column_count, store.column_count))
+    
+    def load_rows(self, rows: Iterable[Sequence], column_count: Optional[int] = None):
+        """按行整体替换数据"""
+        self.beginResetModel()
+        self.store.load_rows(rows, column_count)
+        self.endResetModel()
+    
+    def load_columns(self, columns: List[List[str]], row_count: int):
+        """按列整体替换数据（列表直接接管）"""
+        self.beginResetModel()
+        self.store.load_columns(columns, row_count)
+        self.endResetModel()
+    
+    def clear(self):
+        """清空所有单元格"""
+        self.beginResetModel()
+        self.store.clear()
+        self.endResetModel()
+    
+    def append_columns(self, columns: Sequence[List[str]], row_count: int):
+        """在底部追加若干行（按列给出；视图只插入新行，不重置）"""
+        if row_count <= 0:
+            return
+        store = self.store
+        if len(columns) > store.column_count:
+            self.beginInsertColumns(QModelIndex(), store.column_count, len(columns) - 1)
+            store.resize(store.row_count, len(columns))
+            self.endInsertColumns()
+        
+        first = store.row_count
+        self.beginInsertRows(QModelIndex(), first, first + row_count - 1)
+        store.append_columns(columns, row_count)
+        self.endInsertRows()
+    
+    def set_column_values(self, col: int, values: Sequence[str], start_row: int = 0):
+        """
+        从 start_row 开始依次写入一列（行数/列数不足时自动扩大）
+        
+        Args:
+            col: 列索引
+            values: 要写入的内容
+            start_row: 起始行号
+        """
+        if not values:
+            return
+        self.ensure_size(start_row + len(values), col + 1)
+        for offset, text in enumerate(values):
+            self.store.set_cell(start_row + offset, col, text)
+        self.dataChanged.emit(
+            self.index(start_row, col), self.index(start_row + len(values) - 1, col),
+            [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole]
+        )
+    
+    # ==================== QAbstractTableModel 接口 ====================
+    
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self.store.row_count
+    
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self.store.column_count
+    
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return self.store.cell(index.row(), index.column())
+        return None
+    
+    def setData(self, index: QModelIndex, value, role: int = Qt.ItemDataRole.EditRole) -> bool:
+        if role != Qt.ItemDataRole.EditRole or not index.isValid():
+            return False
+        if self.store.set_cell(index.row(), index.column(), "" if value is None else str(value)):
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole])
+        return True
+    
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        # 水平表头由 SmartGrid 的列控制控件覆盖
+        if role == Qt.ItemDataRole.DisplayRole:
+            return "" if orientation == Qt.Orientation.Horizontal else str(section + 1)
+        return None
+    
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        return (Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEditable
+                | Qt.ItemFlag.ItemIsDragEnabled | Qt.ItemFlag.ItemIsDropEnabled)
+    
+    def mimeTypes(self) -> List[str]:
+        return ["text/plain"]
+    
+    def mimeData(self, indexes) -> QMimeData:
+        mime_data = QMimeData()
+        mime_data.setText("\n".join(
+            self.store.cell(index.row(), index.column()) for index in indexes if index.isValid()
+        ))
+        return mime_data
+    
+    def canDropMimeData(self, data: QMimeData, action, row: int, column: int, parent: QModelIndex) -> bool:
+        return data.hasText() and parent.isValid()
+    
+    def dropMimeData(self, data: QMimeData, action, row: int, column: int, parent: QModelIndex) -> bool:
+        """拖入文本（如素材库中的素材）时替换目标单元格的内容"""
+        if not self.canDropMimeData(data, action, row, column, parent):
+            return False
+        return self.setData(parent, data.text())
+    
+    def supportedDropActions(self) -> Qt.DropAction:
+        return Qt.DropAction.CopyAction | Qt.DropAction.MoveAction
+    
+    def supportedDragActions(self) -> Qt.DropAction:
+        return Qt.DropAction.CopyAction
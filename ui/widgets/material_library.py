@@ -3,44 +3,121 @@
 采用 Fluent Design 侧边导航栏风格
 """
 
+import threading
+from typing import List, Optional, Tuple
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QTreeWidgetItem, 
-    QInputDialog, QDialog, QTextEdit, QDialogButtonBox, QLabel
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, 
+    QInputDialog, QDialog, QTextEdit, QDialogButtonBox, QLabel, QFileDialog
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QMimeData, QSize
-from PyQt6.QtGui import QIcon, QDrag
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal, QModelIndex, QPoint, QSize
+from PyQt6.QtGui import QIcon
 from qfluentwidgets import (
-    TreeWidget, SearchLineEdit, PushButton, ToolButton, TransparentToolButton,
+    TreeView, SearchLineEdit, PushButton, ToolButton, TransparentToolButton,
     FluentIcon as FIF, RoundMenu, Action, MessageBox, InfoBar, InfoBarPosition
 )
 from loguru import logger
 
+from ...core.material_importer import ImportResult, MaterialImporter
 from ...database.db_manager import DatabaseManager
+from ...database.material_search import MaterialSearchHit, SearchCancelled
+from .material_tree_model import MaterialTreeModel
 
 
-class MaterialTreeWidget(TreeWidget):
-    """自定义树形控件，支持拖拽素材内容"""
+class MaterialSearchWorker(QThread):
+    """
+    素材搜索工作线程
     
-    def startDrag(self, supportedActions):
-        """重写拖拽开始方法"""
-        item = self.currentItem()
-        if not item:
-            return
-        
-        data = item.data(0, Qt.ItemDataRole.UserRole)
-        if not data or data.get("type") != "material":
+    只执行最新的请求：排队中的旧请求直接被覆盖，正在执行的旧请求通过 SQLite 进度回调中断，
+    结果只在请求仍是最新时发出。
+    """
+    
+    results_ready = pyqtSignal(int, list)  # 请求序号, MaterialSearchHit 列表
+    
+    def __init__(self, db_manager: DatabaseManager, limit: int, start_mark: str, end_mark: str):
+        super().__init__()
+        self.db_manager = db_manager
+        self.limit = limit
+        self.start_mark = start_mark
+        self.end_mark = end_mark
+        self._condition = threading.Condition()
+        self._pending: Optional[Tuple[int, str]] = None
+        self._latest = 0
+        self._stopped = False
+    
+    def submit(self, request_id: int, keyword: str):
+        """提交搜索请求（覆盖尚未开始的旧请求，并中断正在执行的旧请求）"""
+        with self._condition:
+            self._pending = (request_id, keyword)
+            self._latest = request_id
+            self._condition.notify()
+    
+    def cancel(self, request_id: int):
+        """取消序号小于 request_id 的所有请求"""
+        with self._condition:
+            self._pending = None
+            self._latest = request_id
+    
+    def stop(self):
+        """停止线程（等待当前查询中断后返回，可重复调用）"""
+        with self._condition:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._pending = None
+            self._condition.notify()
+        self.wait()
+    
+    def run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                request_id, keyword = self._pending
+                self._pending = None
+            
+            def cancelled() -> bool:
+                return self._stopped or self._latest != request_id
+            
+            try:
+                hits = self.db_manager.search_material_hits(
+                    keyword, self.limit, self.start_mark, self.end_mark, cancelled
+                )
+            except SearchCancelled:
+                continue
+            if not cancelled():
+                self.results_ready.emit(request_id, hits)
+
+
+class MaterialImportWorker(QThread):
+    """素材批量导入工作线程（读取、查重、写入都在线程中完成，界面只接收进度）"""
+    
+    progress = pyqtSignal(int, str)  # 已处理条数, 说明
+    import_finished = pyqtSignal(object)  # ImportResult
+    import_failed = pyqtSignal(str)  # 错误信息
+    
+    def __init__(self, db_manager: DatabaseManager, path: str):
+        super().__init__()
+        self.db_manager = db_manager
+        self.path = path
+        self._cancelled = False
+    
+    def cancel(self):
+        """请求取消（当前批次写入完成后停止）并等待线程结束"""
+        self._cancelled = True
+        self.wait()
+    
+    def run(self):
+        try:
+            result = MaterialImporter(self.db_manager).import_path(
+                self.path, progress=self.progress.emit, cancelled=lambda: self._cancelled
+            )
+        except Exception as e:
+            logger.error(f"批量导入素材失败: {e}")
+            self.import_failed.emit(str(e))
             return
-        
-        # 创建 MIME 数据，包含素材内容
-        mime_data = QMimeData()
-        mime_data.setText(data.get("content", ""))
-        
-        # 创建拖拽对象
-        drag = QDrag(self)
-        drag.setMimeData(mime_data)
-        
-        # 执行拖拽
-        drag.exec(Qt.DropAction.CopyAction)
+        self.import_finished.emit(result)
 
 
 class MultiLineInputDialog(QDialog):
@@ -83,10 +160,30 @@ class MaterialLibrary(QWidget):
     clear_grid_clicked = pyqtSignal()    # 清空工作区
     bold_tool_clicked = pyqtSignal()     # 批量加粗设置
     
+    # 搜索结果最多显示条数
+    SEARCH_LIMIT = 200
+    # 输入停止多久后才开始搜索（毫秒）
+    SEARCH_DEBOUNCE_MS = 150
+    # 搜索结果每次插入树的条数（分批插入，插入期间界面保持响应）
+    SEARCH_PAGE_SIZE = 50
+    
     def __init__(self, db_manager: DatabaseManager):
         super().__init__()
         self.db_manager = db_manager
         self.current_category = None
+        
+        # 搜索状态：每次输入变化序号加一，旧序号的结果和未插入完的分页全部作废
+        self._search_generation = 0
+        self._search_worker: Optional[MaterialSearchWorker] = None
+        self._search_hits: List[MaterialSearchHit] = []
+        self._search_offset = 0
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(self.SEARCH_DEBOUNCE_MS)
+        self._search_timer.timeout.connect(self._start_search)
+        
+        self._import_worker: Optional[MaterialImportWorker] = None
+        
         self._init_ui()
         self._load_categories()
     
@@ -102,17 +199,22 @@ class MaterialLibrary(QWidget):
         self.search_input.textChanged.connect(self._on_search)
         layout.addWidget(self.search_input)
         
-        # 树形列表 (整合分类和素材) - 使用自定义 TreeWidget
-        self.tree = MaterialTreeWidget()
+        # 树形列表 (整合分类和素材) - 模型按需分页加载素材
+        self.model = MaterialTreeModel(self.db_manager, self)
+        self.tree = TreeView()
+        self.tree.setModel(self.model)
         self.tree.setHeaderHidden(True)
-        self.tree.itemClicked.connect(self._on_item_clicked)
-        self.tree.itemDoubleClicked.connect(self._on_item_double_clicked)
+        self.tree.setUniformRowHeights(True)
+        self.tree.clicked.connect(self._on_item_clicked)
+        self.tree.doubleClicked.connect(self._on_item_double_clicked)
         self.tree.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.tree.customContextMenuRequested.connect(self._show_context_menu)
+        # QTreeView 只会为树的最后一项自动加载下一页，中间展开的分类滚动到底部时由这里加载
+        self.tree.verticalScrollBar().valueChanged.connect(self._fetch_visible_pages)
         
-        # 启用拖拽
+        # 启用拖拽（拖拽内容由模型按 ID 读取）
         self.tree.setDragEnabled(True)
-        self.tree.setDragDropMode(MaterialTreeWidget.DragDropMode.DragOnly)
+        self.tree.setDragDropMode(TreeView.DragDropMode.DragOnly)
         
         layout.addWidget(self.tree)
         
@@ -127,56 +229,40 @@ class MaterialLibrary(QWidget):
         self.add_btn.clicked.connect(self._on_add_material)
         btn_layout.addWidget(self.add_btn)
         
+        self.import_btn = PushButton(FIF.DOWNLOAD, "批量导入")
+        self.import_btn.clicked.connect(self._show_import_menu)
+        btn_layout.addWidget(self.import_btn)
+        
         layout.addLayout(btn_layout)
     
     def _load_categories(self):
-        """加载分类和素材"""
-        self.tree.clear()
-        categories = self.db_manager.get_all_categories()
-        
-        # 分组处理
-        groups = {}
-        for cat in categories:
-            prefix = cat.split('-')[0] if '-' in cat else '其他'
-            if prefix not in groups:
-                groups[prefix] = []
-            groups[prefix].append(cat)
-        
-        for group_name, cats in sorted(groups.items()):
-            # 创建一级分类（组）
-            group_item = QTreeWidgetItem([f"📁 {group_name}"])
-            group_item.setExpanded(True)
-            group_item.setData(0, Qt.ItemDataRole.UserRole, {"type": "group", "name": group_name})
-            self.tree.addTopLevelItem(group_item)
-            
-            for cat in sorted(cats):
-                # 创建二级分类
-                cat_item = QTreeWidgetItem([f"  📂 {cat}"])
-                cat_item.setData(0, Qt.ItemDataRole.UserRole, {"type": "category", "name": cat})
-                group_item.addChild(cat_item)
-                
-                # 加载该分类下的素材
-                self._load_materials_for_item(cat_item, cat)
-    
-    def _load_materials_for_item(self, parent_item: QTreeWidgetItem, category: str):
-        """加载指定分类的素材到树节点"""
-        materials = self.db_manager.get_materials_by_category(category)
-        for mat in materials:
-            # 显示前 30 个字符
-            preview = mat.content[:30].replace('\n', ' ') + "..."
-            item = QTreeWidgetItem([f"    📄 {preview}"])
-            item.setData(0, Qt.ItemDataRole.UserRole, {
-                "type": "material",
-                "id": mat.id,
-                "content": mat.content,
-                "category": category
-            })
-            item.setToolTip(0, mat.content)
-            parent_item.addChild(item)
-    
-    def _on_item_clicked(self, item: QTreeWidgetItem, column: int):
+        """加载分类（分类下的素材在展开时分页加载）"""
+        self.model.load_categories()
+        
+        # 大类默认展开，分类默认折叠
+        for row in range(self.model.rowCount()):
+            self.tree.expand(self.model.index(row, 0))
+    
+    def _fetch_visible_pages(self):
+        """可见区域内出现某个分类已加载的最后一条素材时，加载该分类的下一页"""
+        viewport_height = self.tree.viewport().height()
+        index = self.tree.indexAt(QPoint(0, 0))
+        while index.isValid() and self.tree.visualRect(index).top() < viewport_height:
+            parent = index.parent()
+            if index.row() == self.model.rowCount(parent) - 1 and self.model.canFetchMore(parent):
+                self.model.fetchMore(parent)
+            index = self.tree.indexBelow(index)
+    
+    def _current_data(self) -> Optional[dict]:
+        """当前选中项的数据"""
+        index = self.tree.currentIndex()
+        if not index.isValid():
+            return None
+        return index.data(Qt.ItemDataRole.UserRole)
+    
+    def _on_item_clicked(self, index: QModelIndex):
         """项被点击"""
-        data = item.data(0, Qt.ItemDataRole.UserRole)
+        data = index.data(Qt.ItemDataRole.UserRole)
         if not data:
             return
             
@@ -186,50 +272,75 @@ class MaterialLibrary(QWidget):
             self.current_category = data["category"]
             self.material_selected.emit(data["id"])
     
-    def _on_item_double_clicked(self, item: QTreeWidgetItem, column: int):
+    def _on_item_double_clicked(self, index: QModelIndex):
         """双击事件 - 编辑"""
-        data = item.data(0, Qt.ItemDataRole.UserRole)
+        data = index.data(Qt.ItemDataRole.UserRole)
         if data and data["type"] == "material":
             self._on_edit_material()
     
     def _on_search(self, text: str):
-        """搜索过滤"""
-        if not text:
+        """搜索过滤（输入停止 SEARCH_DEBOUNCE_MS 后才在工作线程中搜索）"""
+        self._search_generation += 1
+        if not text.strip():
+            self._search_timer.stop()
+            if self._search_worker is not None:
+                self._search_worker.cancel(self._search_generation)
             self._load_categories()
             return
         
-        # 搜索素材
-        self.tree.clear()
-        materials = self.db_manager.search_materials(text)
+        self._search_timer.start()
+    
+    def _start_search(self):
+        """防抖结束，提交搜索（全文索引，按相关度排序，片段中用【】标出关键词）"""
+        if self._search_worker is None:
+            self._search_worker = MaterialSearchWorker(
+                self.db_manager, self.SEARCH_LIMIT, start_mark="【", end_mark="】"
+            )
+            self._search_worker.results_ready.connect(self._on_search_results)
+            # 退出前停止线程（线程对象不能在运行中被销毁）
+            worker = self._search_worker
+            QApplication.instance().aboutToQuit.connect(worker.stop)
+            self.destroyed.connect(lambda: worker.stop())
+            self._search_worker.start()
         
-        if materials:
-            search_item = QTreeWidgetItem([f"🔍 搜索结果 ({len(materials)} 条)"])
-            search_item.setExpanded(True)
-            self.tree.addTopLevelItem(search_item)
-            
-            for mat in materials:
-                preview = mat.content[:40].replace('\n', ' ') + "..."
-                item = QTreeWidgetItem([f"  [{mat.category}] {preview}"])
-                item.setData(0, Qt.ItemDataRole.UserRole, {
-                    "type": "material",
-                    "id": mat.id,
-                    "content": mat.content,
-                    "category": mat.category
-                })
-                item.setToolTip(0, mat.content)
-                search_item.addChild(item)
+        self._search_worker.submit(self._search_generation, self.search_input.text())
+    
+    def _on_search_results(self, request_id: int, hits: List[MaterialSearchHit]):
+        """收到搜索结果：替换搜索结果节点的子项，分批插入"""
+        if request_id != self._search_generation:
+            return
+        
+        more = "+" if len(hits) >= self.SEARCH_LIMIT else ""
+        self.model.show_search(f"🔍 搜索结果 ({len(hits)}{more} 条)")
+        self.tree.expand(self.model.search_index())
+        
+        self._search_hits = hits
+        self._search_offset = 0
+        self._insert_search_page(request_id)
+    
+    def _insert_search_page(self, request_id: int):
+        """插入一页搜索结果，剩余部分在下一轮事件循环中继续"""
+        if request_id != self._search_generation or not self.model.search_index().isValid():
+            return
+        
+        page = self._search_hits[self._search_offset:self._search_offset + self.SEARCH_PAGE_SIZE]
+        self.model.append_search_results(page)
+        self._search_offset += len(page)
+        
+        if self._search_offset < len(self._search_hits):
+            QTimer.singleShot(0, lambda: self._insert_search_page(request_id))
     
     def _show_context_menu(self, pos):
         """右键菜单"""
-        item = self.tree.itemAt(pos)
-        if not item:
+        index = self.tree.indexAt(pos)
+        if not index.isValid():
             # 空白处点击：新增分类
             menu = RoundMenu(parent=self)
             menu.addAction(Action(FIF.ADD, "新增分类", triggered=self._on_add_category))
             menu.exec(self.tree.mapToGlobal(pos))
             return
             
-        data = item.data(0, Qt.ItemDataRole.UserRole)
+        data = index.data(Qt.ItemDataRole.UserRole)
         if not data:
             return
             
@@ -246,6 +357,96 @@ class MaterialLibrary(QWidget):
             
         menu.exec(self.tree.mapToGlobal(pos))
     
+    def _show_import_menu(self):
+        """批量导入菜单"""
+        menu = RoundMenu(parent=self)
+        menu.addAction(Action(FIF.DOCUMENT, "从 Excel / CSV 导入...", triggered=self._on_import_file))
+        menu.addAction(Action(FIF.FOLDER, "从文件夹导入 (.docx / .txt)...", triggered=self._on_import_folder))
+        menu.exec(self.import_btn.mapToGlobal(QPoint(0, self.import_btn.height())))
+    
+    def _on_import_file(self):
+        """选择 Excel / CSV 文件批量导入"""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "批量导入素材", "", "表格文件 (*.xlsx *.xlsm *.csv)"
+        )
+        if file_path:
+            self._start_import(file_path)
+    
+    def _on_import_folder(self):
+        """选择文件夹批量导入（子文件夹名作为分类）"""
+        folder = QFileDialog.getExistingDirectory(self, "批量导入素材（文件夹名作为分类）")
+        if folder:
+            self._start_import(folder)
+    
+    def _start_import(self, path: str):
+        """
+        在工作线程中批量导入
+        
+        Args:
+            path: Excel / CSV 文件或文件夹路径
+        """
+        if self._import_worker is not None:
+            return
+        
+        self.import_btn.setEnabled(False)
+        self.import_btn.setText("导入中...")
+        
+        self._import_worker = MaterialImportWorker(self.db_manager, path)
+        self._import_worker.progress.connect(self._on_import_progress)
+        self._import_worker.import_finished.connect(self._on_import_finished)
+        self._import_worker.import_failed.connect(self._on_import_failed)
+        # 退出前停止线程（线程对象不能在运行中被销毁）
+        worker = self._import_worker
+        QApplication.instance().aboutToQuit.connect(worker.cancel)
+        self._import_worker.start()
+    
+    def _on_import_progress(self, processed: int, message: str):
+        """导入进度"""
+        self.import_btn.setText(f"导入中 {processed} 条")
+        self.import_btn.setToolTip(message)
+    
+    def _reset_import(self):
+        """导入结束，恢复按钮"""
+        self._import_worker.wait()
+        self._import_worker.deleteLater()
+        self._import_worker = None
+        self.import_btn.setEnabled(True)
+        self.import_btn.setText("批量导入")
+        self.import_btn.setToolTip("")
+    
+    def _on_import_finished(self, result: ImportResult):
+        """导入完成：刷新素材树并显示统计"""
+        self._reset_import()
+        if not self.search_input.text().strip():
+            self._load_categories()
+        
+        content = result.summary()
+        if result.near_duplicate_count:
+            content += "；近似重复的素材已打上「近似重复」标签，可搜索该标签复核"
+        InfoBar.success(
+            title='批量导入完成',
+            content=content,
+            orient=Qt.Orientation.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.BOTTOM_RIGHT,
+            duration=8000,
+            parent=self.window()
+        )
+    
+    def _on_import_failed(self, message: str):
+        """导入失败"""
+        self._reset_import()
+        self._load_categories()
+        InfoBar.error(
+            title='批量导入失败',
+            content=message,
+            orient=Qt.Orientation.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.BOTTOM_RIGHT,
+            duration=5000,
+            parent=self.window()
+        )
+    
     def _on_add_category(self):
         """新增大类"""
         text, ok = QInputDialog.getText(self, "新增大类", "请输入大类名称（如：通用、洗地机）:")
@@ -320,15 +521,12 @@ class MaterialLibrary(QWidget):
     
     def _on_edit_material(self):
         """编辑素材"""
-        item = self.tree.currentItem()
-        if not item: 
-            return
-        
-        data = item.data(0, Qt.ItemDataRole.UserRole)
+        data = self._current_data()
         if not data or data["type"] != "material": 
             return
         
-        dialog = MultiLineInputDialog("编辑素材", "内容:", data["content"], self)
+        content = self.model.material_content(data["id"])
+        dialog = MultiLineInputDialog("编辑素材", "内容:", content, self)
         if dialog.exec():
             text = dialog.get_text()
             if text:
@@ -347,11 +545,7 @@ class MaterialLibrary(QWidget):
     
     def _on_delete_category(self):
         """删除分类"""
-        item = self.tree.currentItem()
-        if not item:
-            return
-        
-        data = item.data(0, Qt.ItemDataRole.UserRole)
+        data = self._current_data()
         if not data or data["type"] != "category":
             return
         
@@ -386,14 +580,10 @@ class MaterialLibrary(QWidget):
                     duration=3000,
                     parent=self.window()
                 )
-
+    
     def _on_delete_material(self):
         """删除素材"""
-        item = self.tree.currentItem()
-        if not item:
-            return
-        
-        data = item.data(0, Qt.ItemDataRole.UserRole)
+        data = self._current_data()
         if not data or data["type"] != "material":
             return
         
@@ -0,0 +1,265 @@
+"""
+素材树数据模型
+启动时只查询分类及其素材数量，展开分类时才分页加载该分类的素材（canFetchMore / fetchMore），
+每条素材只保存 ID 和 30 字预览；完整内容（提示、拖拽、编辑）按 ID 从数据库读取。
+"""
+
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+from PyQt6.QtCore import Qt, QAbstractItemModel, QModelIndex, QMimeData
+
+from ...database.db_manager import DatabaseManager
+from ...database.material_search import MaterialSearchHit
+
+
+class MaterialNode:
+    """树节点：group（大类）/ category（分类）/ material（素材）/ search（搜索结果）"""
+    
+    __slots__ = ("kind", "name", "material_id", "category", "preview", "total", "parent", "children")
+    
+    def __init__(self, kind: str, name: str = "", parent: "MaterialNode" = None,
+                 material_id: int = None, category: str = None, preview: str = "", total: int = 0):
+        self.kind = kind
+        self.name = name
+        self.material_id = material_id
+        self.category = category
+        self.preview = preview
+        self.total = total  # 分类下的素材总数（已加载的是 children）
+        self.parent = parent
+        self.children: List["MaterialNode"] = []
+    
+    def row(self) -> int:
+        """在父节点中的行号"""
+        return self.parent.children.index(self) if self.parent is not None else 0
+    
+    def item_data(self) -> Dict:
+        """与原 QTreeWidgetItem 的 UserRole 数据格式一致（素材不再携带完整内容）"""
+        if self.kind == "material":
+            return {"type": "material", "id": self.material_id, "category": self.category}
+        return {"type": self.kind, "name": self.name}
+
+
+class MaterialTreeModel(QAbstractItemModel):
+    """按需分页加载的素材树模型"""
+    
+    # 展开分类时每次加载的素材数（滚动到底部时继续加载下一页）
+    PAGE_SIZE = 100
+    # 素材预览字符数
+    PREVIEW_LENGTH = 30
+    # 最近读取的完整内容缓存条数（悬停提示、拖拽）
+    CONTENT_CACHE_SIZE = 64
+    
+    def __init__(self, db_manager: DatabaseManager, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self._root = MaterialNode("root")
+        self._search_node: Optional[MaterialNode] = None
+        self._content_cache: "OrderedDict[int, str]" = OrderedDict()
+    
+    # ==================== 数据加载 ====================
+    
+    def load_categories(self):
+        """重新加载分类（素材在分类展开时再加载）"""
+        self.beginResetModel()
+        self._root.children = []
+        self._search_node = None
+        self._content_cache.clear()
+        
+        # 按 "大类-子类" 分组
+        groups: Dict[str, List[str]] = {}
+        counts = self.db_manager.get_category_counts()
+        for cat in counts:
+            prefix = cat.split('-')[0] if '-' in cat else '其他'
+            groups.setdefault(prefix, []).append(cat)
+        
+        for group_name, cats in sorted(groups.items()):
+            group_node = MaterialNode("group", group_name, self._root)
+            group_node.children = [
+                MaterialNode("category", cat, group_node, total=counts[cat])
+                for cat in sorted(cats)
+            ]
+            self._root.children.append(group_node)
+        
+        self.endResetModel()
+    
+    def show_search(self, title: str):
+        """
+        切换到搜索视图（只有一个搜索结果节点），或清空已有的搜索结果
+        
+        Args:
+            title: 搜索结果节点的标题
+        """
+        if self._search_node is None:
+            self.beginResetModel()
+            self._root.children = []
+            self._search_node = MaterialNode("search", title, self._root)
+            self._root.children.append(self._search_node)
+            self.endResetModel()
+            return
+        
+        search_index = self.createIndex(0, 0, self._search_node)
+        if self._search_node.children:
+            self.beginRemoveRows(search_index, 0, len(self._search_node.children) - 1)
+            self._search_node.children = []
+            self.endRemoveRows()
+        self._search_node.name = title
+        self.dataChanged.emit(search_index, search_index)
+    
+    def append_search_results(self, hits: Iterable[MaterialSearchHit]):
+        """
+        向搜索结果节点追加一批结果
+        
+        Args:
+            hits: 检索结果（只保留 ID、分类和高亮片段）
+        """
+        if self._search_node is None:
+            return
+        nodes = [
+            MaterialNode(
+                "material", parent=self._search_node, material_id=hit.id, category=hit.category,
+                preview=f"[{hit.category}] {hit.snippet.replace(chr(10), ' ')}"
+            )
+            for hit in hits
+        ]
+        if not nodes:
+            return
+        first = len(self._search_node.children)
+        self.beginInsertRows(self.createIndex(0, 0, self._search_node), first, first + len(nodes) - 1)
+        self._search_node.children.extend(nodes)
+        self.endInsertRows()
+    
+    def search_index(self) -> QModelIndex:
+        """搜索结果节点的索引（不在搜索视图时无效）"""
+        if self._search_node is None:
+            return QModelIndex()
+        return self.createIndex(0, 0, self._search_node)
+    
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        node = self.node(parent)
+        return node.kind == "category" and len(node.children) < node.total
+    
+    def fetchMore(self, parent: QModelIndex):
+        node = self.node(parent)
+        if node.kind != "category":
+            return
+        
+        previews = self.db_manager.get_material_previews(
+            node.name, offset=len(node.children), limit=self.PAGE_SIZE, length=self.PREVIEW_LENGTH
+        )
+        if not previews:
+            # 素材在别处被删除，按实际数量修正
+            node.total = len(node.children)
+            return
+        
+        first = len(node.children)
+        self.beginInsertRows(parent, first, first + len(previews) - 1)
+        node.children.extend(
+            MaterialNode("material", parent=node, material_id=material_id, category=node.name,
+                         preview=preview.replace('\n', ' ') + "...")
+            for material_id, preview in previews
+        )
+        self.endInsertRows()
+    
+    def material_content(self, material_id: int) -> str:
+        """
+        按 ID 读取素材完整内容（带少量缓存）
+        
+        Args:
+            material_id: 素材 ID
+        
+        Returns:
+            素材内容（素材不存在时为空字符串）
+        """
+        content = self._content_cache.get(material_id)
+        if content is not None:
+            self._content_cache.move_to_end(material_id)
+            return content
+        
+        material = self.db_manager.get_material_by_id(material_id)
+        content = material.content if material else ""
+        self._content_cache[material_id] = content
+        if len(self._content_cache) > self.CONTENT_CACHE_SIZE:
+            self._content_cache.popitem(last=False)
+        return content
+    
+    # ==================== QAbstractItemModel 接口 ====================
+    
+    def node(self, index: QModelIndex) -> MaterialNode:
+        """索引对应的节点（无效索引为根节点）"""
+        if index.isValid():
+            return index.internalPointer()
+        return self._root
+    
+    def index(self, row: int, column: int, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        parent_node = self.node(parent)
+        if column != 0 or not 0 <= row < len(parent_node.children):
+            return QModelIndex()
+        return self.createIndex(row, 0, parent_node.children[row])
+    
+    def parent(self, index: QModelIndex) -> QModelIndex:
+        if not index.isValid():
+            return QModelIndex()
+        parent_node = index.internalPointer().parent
+        if parent_node is None or parent_node is self._root:
+            return QModelIndex()
+        return self.createIndex(parent_node.row(), 0, parent_node)
+    
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.column() > 0:
+            return 0
+        return len(self.node(parent).children)
+    
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 1
+    
+    def hasChildren(self, parent: QModelIndex = QModelIndex()) -> bool:
+        node = self.node(parent)
+        if node.kind == "category":
+            return node.total > 0
+        return bool(node.children)
+    
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        node: MaterialNode = index.internalPointer()
+        
+        if role == Qt.ItemDataRole.DisplayRole:
+            if node.kind == "group":
+                return f"📁 {node.name}"
+            if node.kind == "category":
+                return f"  📂 {node.name}"
+            if node.kind == "search":
+                return node.name
+            if node.parent.kind == "search":
+                return f"  {node.preview}"
+            return f"    📄 {node.preview}"
+        if role == Qt.ItemDataRole.ToolTipRole and node.kind == "material":
+            return self.material_content(node.material_id)
+        if role == Qt.ItemDataRole.UserRole:
+            return node.item_data()
+        return None
+    
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if index.internalPointer().kind == "material":
+            flags |= Qt.ItemFlag.ItemIsDragEnabled
+        return flags
+    
+    def mimeTypes(self) -> List[str]:
+        return ["text/plain"]
+    
+    def mimeData(self, indexes) -> QMimeData:
+        """拖拽素材时读取完整内容"""
+        mime_data = QMimeData()
+        contents = [
+            self.material_content(index.internalPointer().material_id)
+            for index in indexes
+            if index.isValid() and index.internalPointer().kind == "material"
+        ]
+        mime_data.setText("\n".join(contents))
+        return mime_data
+    
+    def supportedDragActions(self) -> Qt.DropAction:
+        return Qt.DropAction.CopyAction
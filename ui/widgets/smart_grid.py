@@ -1,34 +1,75 @@
 """
 智能网格编辑器
 采用 Fluent Design 风格
+
+表格是 TableView + GridTableModel（按列存储，见 grid_model），视图只绘制可见单元格，
+10 万行的工作区也能流畅滚动；生成时通过 snapshot() 取得不复制单元格的只读快照。
 """
 
+from typing import List, Optional, Sequence
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QHeaderView, QTableWidgetItem, 
-    QFileDialog, QLabel
+    QWidget, QVBoxLayout, QHBoxLayout, QHeaderView, 
+    QFileDialog, QLabel, QAbstractItemView, QApplication
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QSize
-from PyQt6.QtGui import QColor, QBrush
+from PyQt6.QtCore import Qt, pyqtSignal, QSize, QThread
 from qfluentwidgets import (
-    TableWidget, InfoBar, InfoBarPosition, MessageBox, ComboBox, 
-    PushButton, FluentIcon as FIF, TransparentToolButton
+    TableView, InfoBar, InfoBarPosition, MessageBox, ComboBox, 
+    PushButton, FluentIcon as FIF, TransparentToolButton, StateToolTip
 )
 from loguru import logger
 import pandas as pd
 import ast
 
+from .grid_model import GridRows, GridSnapshot, GridStore, GridTableModel
 from ...config.settings import ProfileConfig
 from ...utils.file_handler import FileHandler
+from ...utils.excel_stream import ExcelChunk, iter_excel_chunks
 from ..dialogs.image_selector import ImageSelectorDialog
 
 
+class GridImportWorker(QThread):
+    """Excel 流式导入工作线程（逐块读取并转换为列式数据，界面逐块追加到网格）"""
+    
+    chunk_ready = pyqtSignal(object)  # ExcelChunk
+    import_finished = pyqtSignal(int, bool)  # 导入行数, 是否被取消
+    import_failed = pyqtSignal(str)  # 错误信息
+    
+    def __init__(self, file_path: str, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self._cancelled = False
+    
+    def cancel(self):
+        """请求取消（当前块读取完成后停止，不等待线程结束）"""
+        self._cancelled = True
+    
+    def stop(self):
+        """取消并等待线程结束（程序退出前调用）"""
+        self.cancel()
+        self.wait()
+    
+    def run(self):
+        rows_read = 0
+        try:
+            for chunk in iter_excel_chunks(self.file_path):
+                if self._cancelled:
+                    break
+                self.chunk_ready.emit(chunk)
+                rows_read = chunk.rows_read
+        except Exception as e:
+            logger.error(f"读取 Excel 失败: {e}")
+            self.import_failed.emit(str(e))
+            return
+        self.import_finished.emit(rows_read, self._cancelled)
+
+
 class SmartGrid(QWidget):
     """智能网格组件 (Fluent 风格)"""
     
     data_changed = pyqtSignal()
     import_clicked = pyqtSignal()
     bold_tool_clicked = pyqtSignal()
-
+    
     COLUMN_TYPES = ['标题一', '标题二', '标题三', '标题四', '正文', '列表', '忽略']
     
     # 中英文映射
@@ -48,6 +89,11 @@ class SmartGrid(QWidget):
     def __init__(self, config: ProfileConfig):
         super().__init__()
         self.config = config
+        # 正在进行的 Excel 导入
+        self._import_worker: Optional[GridImportWorker] = None
+        self._import_state: Optional[StateToolTip] = None
+        self._import_rows = 0
+        self._import_loaded = False  # 是否已收到第一块（第一块替换原有数据）
         self._init_ui()
     
     def _init_ui(self):
@@ -70,39 +116,42 @@ class SmartGrid(QWidget):
         """)
         layout.addWidget(self.empty_hint)
         
+        # 网格数据模型（按列存储）
+        self.model = GridTableModel(GridStore(20, 10), self)
+        
         # Fluent 表格组件
-        self.table = TableWidget(self)
+        self.table = TableView(self)
+        self.table.setModel(self.model)
         self.table.setBorderVisible(True)
         self.table.setBorderRadius(16)
         self.table.setWordWrap(False)
-        self.table.setRowCount(20)
-        self.table.setColumnCount(10)
         
         # 开启斑马纹
         self.table.setAlternatingRowColors(True)
         
-        # 启用拖拽接收
+        # 启用拖拽接收（素材库拖入的文本由模型写入目标单元格）
         self.table.setAcceptDrops(True)
         self.table.setDragEnabled(True)
         self.table.setDropIndicatorShown(True)
+        self.table.setDragDropMode(QAbstractItemView.DragDropMode.DragDrop)
+        self.table.setDefaultDropAction(Qt.DropAction.CopyAction)
         
-        # 性能优化设置
-        self.table.setUpdatesEnabled(True)
         # 使用滚动模式而非逐项模式，提高大数据量性能
         self.table.setVerticalScrollMode(self.table.ScrollMode.ScrollPerPixel)
         self.table.setHorizontalScrollMode(self.table.ScrollMode.ScrollPerPixel)
         
-        # 设置表头
-        self._setup_headers()
-        
         # 表格属性
         header = self.table.horizontalHeader()
         header.setStretchLastSection(False)
         header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
         header.setDefaultSectionSize(120)
         header.setFixedHeight(80)
+        # 固定行高：视图不必逐行计算高度
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         self.table.verticalHeader().hide()
-        self.table.itemChanged.connect(self._on_item_changed)
+        self.model.dataChanged.connect(self._on_cells_changed)
+        self.model.modelReset.connect(self._sync_column_controls)
+        self.model.columnsInserted.connect(self._sync_column_controls)
         header.sectionResized.connect(self._on_column_resized)
         header.sectionMoved.connect(lambda *_: self._update_column_control_positions())
         self.table.horizontalScrollBar().valueChanged.connect(lambda _: self._update_column_control_positions())
@@ -118,12 +167,6 @@ class SmartGrid(QWidget):
         # 初始隐藏表格，显示空状态
         self.table.hide()
     
-    def _setup_headers(self):
-        """设置表头"""
-        for col in range(self.table.columnCount()):
-            item = QTableWidgetItem("")
-            self.table.setHorizontalHeaderItem(col, item)
-    
     def _setup_column_controls(self):
         """创建/刷新列控制控件"""
         header = self.table.horizontalHeader()
@@ -131,7 +174,7 @@ class SmartGrid(QWidget):
             ctrl["widget"].deleteLater()
         self.column_controls.clear()
         
-        for col in range(self.table.columnCount()):
+        for col in range(self.model.columnCount()):
             widget = QWidget(header.viewport())
             layout = QVBoxLayout(widget)
             layout.setContentsMargins(4, 2, 4, 2)
@@ -315,27 +358,28 @@ class SmartGrid(QWidget):
                 parent=self.window()
             )
     
-    def _on_item_changed(self, item: QTableWidgetItem):
+    def _on_cells_changed(self, *_):
+        """单元格被编辑（或拖入内容）"""
         self.data_changed.emit()
         # 有数据时隐藏空状态提示（仅在空状态可见时检查）
         if self.empty_hint.isVisible():
-            if self._has_data():
+            if self.has_data():
                 self.empty_hint.hide()
                 self.table.show()
     
-    def _has_data(self) -> bool:
-        """检查是否有数据（优化：只检查前几行）"""
-        # 只检查前10行，提高性能
-        max_check_rows = min(10, self.table.rowCount())
-        for row in range(max_check_rows):
-            for col in range(self.table.columnCount()):
-                item = self.table.item(row, col)
-                if item and item.text().strip():
-                    return True
-        return False
+    def _sync_column_controls(self, *_):
+        """整体替换数据或新增列后：列数变化时重建列控制控件"""
+        if len(self.column_controls) != self.model.columnCount():
+            self._setup_column_controls()
+        else:
+            self._update_column_control_positions()
+    
+    def has_data(self) -> bool:
+        """是否有任何非空单元格（O(1)，非空单元格数随编辑增量维护）"""
+        return self.model.store.has_data()
     
     def import_from_excel(self):
-        """从 Excel 导入数据"""
+        """从 Excel 导入数据（后台线程流式读取，数据逐块追加到网格，可随时取消）"""
         file_path, _ = QFileDialog.getOpenFileName(
             self,
             "选择 Excel 文件",
@@ -346,80 +390,120 @@ class SmartGrid(QWidget):
         if not file_path:
             return
         
-        try:
-            # 显示加载状态
-            from PyQt6.QtWidgets import QApplication
-            QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
-            
-            df = FileHandler.read_excel(file_path)
-            if df is None:
-                QApplication.restoreOverrideCursor()
-                InfoBar.error(
-                    title='导入失败',
-                    content='无法读取 Excel 文件',
-                    orient=Qt.Orientation.Horizontal,
-                    isClosable=True,
-                    position=InfoBarPosition.BOTTOM_RIGHT,
-                    duration=3000,
-                    parent=self.window()
-                )
-                return
-            
-            # 暂停更新以提高性能
-            self.table.setUpdatesEnabled(False)
-            
-            # 调整表格大小
-            self.table.setRowCount(len(df))
-            self.table.setColumnCount(len(df.columns))
-            
-            # 设置表头
-            self._setup_headers()
-            
-            # 重新创建列格式下拉框
-            self._setup_column_format_combos()
-            
-            # 填充数据（批量操作）
-            for row_idx, row in df.iterrows():
-                for col_idx, value in enumerate(row):
-                    item = QTableWidgetItem(str(value) if pd.notna(value) else "")
-                    self.table.setItem(row_idx, col_idx, item)
-            
-            # 恢复更新
-            self.table.setUpdatesEnabled(True)
-            
-            # 恢复光标
-            QApplication.restoreOverrideCursor()
-            
-            # 隐藏空状态，显示表格
+        self._cancel_import()
+        
+        # 进度提示（右上角，点击关闭即取消导入）
+        self._import_state = StateToolTip('正在导入 Excel', '正在打开工作簿...', self.window())
+        self._import_state.move(self.window().width() - self._import_state.width() - 30, 30)
+        self._import_state.closedSignal.connect(self._on_import_state_closed)
+        self._import_state.show()
+        
+        self._import_rows = 0
+        self._import_loaded = False
+        # 线程以网格为父对象：取消后不再引用它，线程结束前也不会被回收
+        self._import_worker = GridImportWorker(file_path, self)
+        self._import_worker.chunk_ready.connect(self._on_import_chunk)
+        self._import_worker.import_finished.connect(self._on_import_finished)
+        self._import_worker.import_failed.connect(self._on_import_failed)
+        self._import_worker.finished.connect(self._on_import_thread_finished)
+        # 退出前停止线程（线程对象不能在运行中被销毁）
+        QApplication.instance().aboutToQuit.connect(self._import_worker.stop)
+        self._import_worker.start()
+    
+    def _on_import_chunk(self, chunk: ExcelChunk):
+        """收到一块导入数据：第一块替换原有数据，之后的追加到底部"""
+        if self.sender() is not self._import_worker:
+            # 已取消的导入在取消前发出、尚未处理的数据块
+            return
+        
+        if not self._import_loaded:
+            # 只有表头的工作表返回 0 行的块：保留表头的列数
+            self.model.load_columns(chunk.columns, chunk.row_count)
             self.empty_hint.hide()
             self.table.show()
-            
-            logger.info(f"从 Excel 导入: {len(df)} 行, {len(df.columns)} 列")
-            
-            # Toast 提示
-            InfoBar.success(
-                title='导入成功',
-                content=f'已导入 {len(df)} 行数据',
-                orient=Qt.Orientation.Horizontal,
-                isClosable=False,
-                position=InfoBarPosition.BOTTOM_RIGHT,
-                duration=2000,
-                parent=self.window()
-            )
-            
-        except Exception as e:
-            from PyQt6.QtWidgets import QApplication
-            QApplication.restoreOverrideCursor()
-            logger.error(f"导入 Excel 失败: {e}")
-            InfoBar.error(
-                title='导入失败',
-                content=str(e),
-                orient=Qt.Orientation.Horizontal,
-                isClosable=True,
-                position=InfoBarPosition.BOTTOM_RIGHT,
-                duration=3000,
-                parent=self.window()
-            )
+            self._import_loaded = True
+        else:
+            self.model.append_columns(chunk.columns, chunk.row_count)
+        self._import_rows = chunk.rows_read
+        self.data_changed.emit()
+        
+        if self._import_state is not None:
+            total = f" / {chunk.total_rows}" if chunk.total_rows else ""
+            self._import_state.setContent(f"已读取 {chunk.rows_read}{total} 行")
+    
+    def _on_import_finished(self, row_count: int, cancelled: bool):
+        """导入结束（读完或被取消）"""
+        if self.sender() is not self._import_worker:
+            return
+        self._finish_import('导入完成' if not cancelled else '导入已取消')
+        
+        if not self._import_loaded and not cancelled:
+            # 工作表完全为空（没有表头）：清空原有数据，显示空状态提示
+            self.model.load_columns([], 0)
+            self.table.hide()
+            self.empty_hint.show()
+            self.data_changed.emit()
+        
+        logger.info(f"从 Excel 导入: {row_count} 行, {self.model.columnCount()} 列" + ("（已取消）" if cancelled else ""))
+        
+        # Toast 提示
+        InfoBar.success(
+            title='导入成功' if not cancelled else '导入已取消',
+            content=f'已导入 {row_count} 行数据',
+            orient=Qt.Orientation.Horizontal,
+            isClosable=False,
+            position=InfoBarPosition.BOTTOM_RIGHT,
+            duration=2000,
+            parent=self.window()
+        )
+    
+    def _on_import_failed(self, message: str):
+        """导入失败（已导入的数据块保留）"""
+        if self.sender() is not self._import_worker:
+            return
+        self._finish_import('导入失败')
+        logger.error(f"导入 Excel 失败: {message}")
+        InfoBar.error(
+            title='导入失败',
+            content=message,
+            orient=Qt.Orientation.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.BOTTOM_RIGHT,
+            duration=3000,
+            parent=self.window()
+        )
+    
+    def _finish_import(self, message: str):
+        """
+        结束当前导入：不再接收它的数据块，进度提示显示结果后淡出
+        
+        不等待线程结束（取消时线程会在当前块读完后退出），线程对象在 finished 时回收。
+        """
+        self._import_worker = None
+        if self._import_state is not None:
+            self._import_state.setTitle(message)
+            self._import_state.setState(True)
+            self._import_state = None
+    
+    def _on_import_thread_finished(self):
+        """导入线程已退出：回收线程对象"""
+        worker = self.sender()
+        QApplication.instance().aboutToQuit.disconnect(worker.stop)
+        worker.deleteLater()
+    
+    def _on_import_state_closed(self):
+        """用户关闭了进度提示：取消导入"""
+        self._import_state = None
+        self._cancel_import()
+    
+    def _cancel_import(self):
+        """取消正在进行的导入（已导入的行保留）"""
+        worker = self._import_worker
+        if worker is None:
+            return
+        worker.cancel()
+        self._finish_import('导入已取消')
+        logger.info(f"Excel 导入已取消: 已导入 {self._import_rows} 行")
     
     def export_to_excel(self):
         """导出到 Excel"""
@@ -437,17 +521,9 @@ class SmartGrid(QWidget):
             from PyQt6.QtWidgets import QApplication
             QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
             
-            # 收集数据
-            data = []
-            for row in range(self.table.rowCount()):
-                row_data = []
-                for col in range(self.table.columnCount()):
-                    item = self.table.item(row, col)
-                    row_data.append(item.text() if item else "")
-                data.append(row_data)
-            
-            # 创建 DataFrame
-            df = pd.DataFrame(data)
+            # 按列创建 DataFrame
+            store = self.model.store
+            df = pd.DataFrame({col: store.column(col) for col in range(store.column_count)})
             
             # 写入 Excel
             if FileHandler.write_excel(df, file_path):
@@ -487,105 +563,90 @@ class SmartGrid(QWidget):
                 parent=self.window()
             )
     
-    def get_grid_data(self) -> list:
-        """获取网格数据（按行）"""
-        data = []
-        for row in range(self.table.rowCount()):
-            row_data = []
-            for col in range(self.table.columnCount()):
-                item = self.table.item(row, col)
-                row_data.append(item.text() if item else "")
-            # 只添加非空行
-            if any(cell.strip() for cell in row_data):
-                data.append(row_data)
-        return data
-    
-    def get_column_data(self) -> list:
+    def snapshot(self) -> GridSnapshot:
         """
-        按列获取数据（直接返回列数据，避免转置）
+        生成用的只读快照（不复制单元格，之后的编辑不影响快照）
         
         Returns:
-            列数据列表，每个元素是一列的所有有效内容
-            [[col1_data...], [col2_data...], ...]
+            GridSnapshot：rows 为非空行（按行），columns_data 为每列的有效内容
         """
-        columns_data = []
-        
-        for col in range(self.table.columnCount()):
-            column = []
-            for row in range(self.table.rowCount()):
-                item = self.table.item(row, col)
-                if item and item.text().strip():
-                    column.append(item.text().strip())
-            columns_data.append(column)
+        return self.model.store.snapshot()
+    
+    def get_grid_data(self) -> GridRows:
+        """获取网格数据（按行，只含非空行；只读序列，按需从列中取行）"""
+        return self.snapshot().rows
+    
+    def get_column_data(self) -> List[List[str]]:
+        """
+        按列获取数据（直接返回各列缓存的有效内容，O(列数)）
         
-        return columns_data
+        Returns:
+            列数据列表，每个元素是一列的所有有效内容（只读，不要修改）
+            [[col1_data...], [col2_data...], ...]
+        """
+        store = self.model.store
+        return [store.column_values(col) for col in range(store.column_count)]
     
     def set_grid_data(self, data: list):
         """设置网格数据"""
         if not data:
             return
         
-        self.table.setRowCount(len(data))
-        self.table.setColumnCount(len(data[0]) if data else 10)
-        
-        for row_idx, row_data in enumerate(data):
-            for col_idx, cell_value in enumerate(row_data):
-                item = QTableWidgetItem(str(cell_value))
-                self.table.setItem(row_idx, col_idx, item)
+        self._cancel_import()
+        self.model.load_rows(data, len(data[0]) if data else 10)
         
         # 隐藏空状态
         self.empty_hint.hide()
         self.table.show()
+        self.data_changed.emit()
+    
+    def set_column_values(self, col: int, values: Sequence[str], start_row: int = 0):
+        """
+        从 start_row 开始依次写入一列（行数/列数不足时自动扩大）
+        
+        Args:
+            col: 列索引
+            values: 要写入的内容
+            start_row: 起始行号
+        """
+        self.model.set_column_values(col, values, start_row)
+        if values:
+            self.empty_hint.hide()
+            self.table.show()
+            self._update_column_control_positions()
+    
+    def append_to_column(self, col: int, values: Sequence[str]) -> int:
+        """
+        追加内容到指定列的底部（紧接该列最后一个非空单元格）
+        
+        Args:
+            col: 列索引
+            values: 要追加的内容
+            
+        Returns:
+            起始行号
+        """
+        start_row = self.last_filled_row(col) + 1
+        self.set_column_values(col, values, start_row)
+        return start_row
+    
+    def last_filled_row(self, col: int) -> int:
+        """指定列最后一个非空单元格的行号（列为空或不存在时返回 -1）"""
+        store = self.model.store
+        if col >= store.column_count:
+            return -1
+        return store.last_filled_row(col)
     
     def get_active_row_count(self) -> int:
         """返回包含内容的行数"""
-        active_rows = 0
-        for row in range(self.table.rowCount()):
-            for col in range(self.table.columnCount()):
-                item = self.table.item(row, col)
-                if item and item.text().strip():
-                    active_rows += 1
-                    break
-        return active_rows
-    
-    def dragEnterEvent(self, event):
-        """拖拽进入事件"""
-        if event.mimeData().hasText():
-            event.acceptProposedAction()
-    
-    def dragMoveEvent(self, event):
-        """拖拽移动事件 - 高亮目标单元格"""
-        if event.mimeData().hasText():
-            # 获取鼠标位置对应的单元格
-            pos = event.position().toPoint()
-            item = self.table.itemAt(pos)
-            if item:
-                # 高亮显示目标单元格
-                item.setBackground(QBrush(QColor(0, 159, 170, 50)))  # 半透明蓝色
-            event.acceptProposedAction()
-    
-    def dropEvent(self, event):
-        """拖拽放下事件"""
-        if event.mimeData().hasText():
-            pos = event.position().toPoint()
-            item = self.table.itemAt(pos)
-            if item:
-                # 恢复背景色
-                item.setBackground(QBrush(Qt.GlobalColor.white))
-                # 设置文本
-                item.setText(event.mimeData().text())
-                
-                # 隐藏空状态
-                self.empty_hint.hide()
-                self.table.show()
-                
-            event.acceptProposedAction()
+        return len(self.model.store.filled_rows())
     
     def clear_all(self):
         """清空所有数据"""
         w = MessageBox("确认清空", "确定要清空工作区的所有内容吗？此操作不可撤销！", self.window())
         if w.exec():
-            self.table.clearContents()
+            self._cancel_import()
+            self.model.clear()
             self.empty_hint.show()
             self.table.hide()
             logger.info("工作区已清空")
@@ -0,0 +1,374 @@
+"""
+Excel 流式读取
+逐行读取工作簿的第一个工作表，按块转换为列式数据（每列一个字符串列表），
+供工作区网格在后台导入时逐块追加，而不是先读成 DataFrame 再逐格填充。
+
+.xlsx / .xlsm 直接按 XML 流解析工作表：共享字符串表按需解析（只解析到当前行引用到的位置），
+第一块数据不必等整张字符串表读完。openpyxl 的只读模式在打开时就要解析完整张共享字符串表，
+几十 MB 的工作簿要等几十秒才能拿到第一行；数字格式、日期换算仍使用 openpyxl 的工具函数。
+.xls 需要安装 python-calamine。
+与原来的 pd.read_excel 一致，第一行是表头，不导入。
+工作区导入和命令行批处理（FileHandler.read_grid）都通过这里读取 Excel，
+单元格统一按 cell_text 转换为文本，同一个工作簿得到的网格数据相同。
+"""
+
+import posixpath
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import chain, islice, zip_longest
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+from xml.etree.ElementTree import iterparse, parse
+from loguru import logger
+
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+
+# 第一块的行数较少，让网格尽快可以浏览；之后每块的行数
+FIRST_CHUNK_ROWS = 500
+CHUNK_ROWS = 5000
+
+_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_DOC_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_OFFICE_DOCUMENT = "/officeDocument"
+
+
+@dataclass
+class ExcelChunk:
+    """一块数据（列式）"""
+    
+    columns: List[List[str]]  # 每列的单元格文本，长度均为 row_count
+    row_count: int
+    rows_read: int  # 累计已读取的数据行数（含本块）
+    total_rows: Optional[int]  # 工作表声明的数据行数（未知时为 None）
+
+
+def cell_text(value) -> str:
+    """
+    单元格值转换为文本
+    
+    规则：空单元格为空字符串；整数值的数字按整数显示（1 而不是 1.0，与 Excel 中看到的一致，
+    不随同列是否有空单元格变化）；日期时间为 YYYY-MM-DD HH:MM:SS；其它值取 str()（布尔为 True/False）。
+    """
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        # calamine 把所有数字读成 float，整数按整数显示
+        return str(int(value))
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return str(value)
+
+
+def _namespace(tag: str) -> str:
+    """XML 标签的命名空间前缀（'{...}'，无命名空间时为空字符串）"""
+    return tag[:tag.index("}") + 1] if tag.startswith("{") else ""
+
+
+def _column_index(reference: str) -> int:
+    """单元格坐标（如 'AB12'）的列号，从 0 开始"""
+    index = 0
+    for char in reference:
+        if char.isdigit():
+            break
+        index = index * 26 + ord(char) - 64
+    return index - 1
+
+
+class _SharedStrings:
+    """按需解析的共享字符串表（Excel 按首次出现的顺序写入，前面的行只引用前面的字符串）"""
+    
+    def __init__(self, source):
+        """
+        Args:
+            source: sharedStrings.xml 的文件对象
+        """
+        self._events = iterparse(source, events=("start", "end"))
+        self._strings: List[str] = []
+        self._root = None
+        self._si = self._t = self._r = None
+    
+    def __getitem__(self, index: int) -> str:
+        strings = self._strings
+        while index >= len(strings):
+            if not self._parse_next():
+                raise IndexError(f"共享字符串索引超出范围: {index}")
+        return strings[index]
+    
+    def _parse_next(self) -> bool:
+        """继续解析到下一个字符串，没有更多字符串时返回 False"""
+        for event, element in self._events:
+            if self._root is None:
+                # 第一个事件是根元素 <sst> 的开始
+                self._root = element
+                ns = _namespace(element.tag)
+                self._si, self._t, self._r = ns + "si", ns + "t", ns + "r"
+            elif event == "end" and element.tag == self._si:
+                self._strings.append(_rich_text(element, self._t, self._r))
+                self._root.clear()
+                return True
+        return False
+
+
+def _rich_text(element, t_tag: str, r_tag: str) -> str:
+    """<si> / <is> 元素的文本（拼接富文本各段，不含拼音注音 <rPh>）"""
+    parts = []
+    for child in element:
+        if child.tag == t_tag:
+            parts.append(child.text or "")
+        elif child.tag == r_tag:
+            parts.extend(t.text or "" for t in child.iter(t_tag))
+    return "".join(parts)
+
+
+def _date_styles(archive: zipfile.ZipFile, path: Optional[str]) -> Set[int]:
+    """styles.xml 中数字格式为日期的单元格样式序号"""
+    if path is None or path not in archive.namelist():
+        return set()
+    with archive.open(path) as source:
+        root = parse(source).getroot()
+    ns = _namespace(root.tag)
+    
+    formats: Dict[int, str] = dict(BUILTIN_FORMATS)
+    for num_fmt in root.iter(ns + "numFmt"):
+        formats[int(num_fmt.get("numFmtId"))] = num_fmt.get("formatCode", "")
+    
+    cell_xfs = root.find(ns + "cellXfs")
+    if cell_xfs is None:
+        return set()
+    return {
+        index for index, xf in enumerate(cell_xfs.iter(ns + "xf"))
+        if is_date_format(formats.get(int(xf.get("numFmtId", 0)), ""))
+    }
+
+
+def _relationships(archive: zipfile.ZipFile, part: str) -> Dict[str, Tuple[str, str]]:
+    """
+    读取部件的关系表
+    
+    Returns:
+        {关系 ID: (类型, 目标部件路径)}
+    """
+    folder, name = posixpath.split(part)
+    rels_path = posixpath.join(folder, "_rels", name + ".rels")
+    if rels_path not in archive.namelist():
+        return {}
+    with archive.open(rels_path) as source:
+        root = parse(source).getroot()
+    
+    relationships = {}
+    for rel in root.iter(_REL_NS + "Relationship"):
+        target = rel.get("Target", "")
+        if target.startswith("/"):
+            target = target.lstrip("/")
+        else:
+            target = posixpath.normpath(posixpath.join(folder, target))
+        relationships[rel.get("Id")] = (rel.get("Type", ""), target)
+    return relationships
+
+
+def _iter_sheet_rows(events, first_row, ns: str, shared_strings, date_styles: Set[int],
+                     epoch: datetime) -> Iterator[Tuple]:
+    """
+    解析 <sheetData> 的行（中间缺失的空行补为空行，缺失的单元格为 None）
+    
+    Args:
+        events: 工作表 XML 的 iterparse 事件迭代器（已解析到第一行结束）
+        first_row: 第一行 <row> 元素（None 表示工作表没有数据）
+        ns: 命名空间前缀
+        shared_strings: 共享字符串表
+        date_styles: 日期格式的样式序号
+        epoch: 日期起点（1900 / 1904 日期系统）
+    """
+    row_tag, c_tag, v_tag, is_tag = ns + "row", ns + "c", ns + "v", ns + "is"
+    t_tag, r_tag = ns + "t", ns + "r"
+    
+    def convert(cell):
+        cell_type = cell.get("t", "n")
+        if cell_type == "inlineStr":
+            inline = cell.find(is_tag)
+            return _rich_text(inline, t_tag, r_tag) if inline is not None else None
+        value = cell.findtext(v_tag)
+        if value is None or value == "":
+            return None
+        if cell_type == "n":
+            number = int(value) if value.isdigit() else float(value)
+            style = cell.get("s")
+            if style and int(style) in date_styles:
+                return from_excel(number, epoch=epoch)
+            return number
+        if cell_type == "s":
+            return shared_strings[int(value)]
+        if cell_type == "b":
+            return value == "1"
+        return value  # str（公式字符串结果）/ e（错误值）/ d（ISO 日期文本）
+    
+    def parse_row(row):
+        values = []
+        for cell in row.iter(c_tag):
+            reference = cell.get("r")
+            if reference:
+                column = _column_index(reference)
+                if column > len(values):
+                    values.extend([None] * (column - len(values)))
+            values.append(convert(cell))
+        while values and values[-1] is None:
+            values.pop()
+        return tuple(values)
+    
+    if first_row is None:
+        return
+    
+    row_elements = chain(
+        [first_row],
+        (element for event, element in events if event == "end" and element.tag == row_tag),
+    )
+    row_number = 0
+    for row in row_elements:
+        number = int(row.get("r") or row_number + 1)
+        for _ in range(number - row_number - 1):
+            yield ()
+        row_number = number
+        yield parse_row(row)
+
+
+def _open_xlsx(file_path: str) -> Tuple[Iterator[Sequence], Optional[int], Callable[[], None]]:
+    """流式打开 .xlsx 第一个工作表，返回 (行迭代器, 总行数, 关闭函数)"""
+    archive = zipfile.ZipFile(file_path)
+    try:
+        workbook_path = next(
+            (target for rel_type, target in _relationships(archive, "").values()
+             if rel_type.endswith(_OFFICE_DOCUMENT)),
+            "xl/workbook.xml",
+        )
+        with archive.open(workbook_path) as source:
+            workbook = parse(source).getroot()
+        ns = _namespace(workbook.tag)
+        
+        workbook_pr = workbook.find(ns + "workbookPr")
+        date1904 = workbook_pr is not None and workbook_pr.get("date1904") in ("1", "true")
+        epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+        
+        relationships = _relationships(archive, workbook_path)
+        sheet = next(iter(workbook.iter(ns + "sheet")), None)
+        if sheet is None:
+            raise ValueError("工作簿中没有工作表")
+        sheet_path = relationships[sheet.get(_DOC_REL_NS + "id")][1]
+        
+        by_type = {rel_type.rsplit("/", 1)[-1]: target for rel_type, target in relationships.values()}
+        strings_path = by_type.get("sharedStrings")
+        strings_source = archive.open(strings_path) if strings_path in archive.namelist() else None
+        shared_strings = _SharedStrings(strings_source) if strings_source is not None else []
+        date_styles = _date_styles(archive, by_type.get("styles"))
+        
+        sheet_source = archive.open(sheet_path)
+    except Exception:
+        archive.close()
+        raise
+    
+    def close():
+        sheet_source.close()
+        if strings_source is not None:
+            strings_source.close()
+        archive.close()
+    
+    # 解析到第一行为止：拿到 <dimension> 声明的总行数
+    events = iterparse(sheet_source, events=("start", "end"))
+    total = None
+    first_row = sheet_data = None
+    sheet_ns = None
+    for event, element in events:
+        if sheet_ns is None:
+            # 第一个事件是根元素 <worksheet> 的开始
+            sheet_ns = _namespace(element.tag)
+        if event == "start":
+            if element.tag == sheet_ns + "sheetData":
+                sheet_data = element
+        elif element.tag == sheet_ns + "dimension":
+            last_cell = element.get("ref", "").rpartition(":")[2]
+            digits = "".join(char for char in last_cell if char.isdigit())
+            total = int(digits) if digits else None
+        elif element.tag == sheet_ns + "row":
+            first_row = element
+            break
+    
+    def rows():
+        for values in _iter_sheet_rows(events, first_row, sheet_ns, shared_strings, date_styles, epoch):
+            yield values
+            # 已处理的行从 <sheetData> 中移除，内存不随行数增长
+            sheet_data.clear()
+    
+    return rows(), total, close
+
+
+def _open_calamine(file_path: str) -> Tuple[Iterator[Sequence], Optional[int], Callable[[], None]]:
+    """calamine 打开第一个工作表，返回 (行迭代器, 总行数, 关闭函数)"""
+    workbook = CalamineWorkbook.from_path(file_path)
+    sheet = workbook.get_sheet_by_index(0)
+    rows = sheet.iter_rows() if hasattr(sheet, "iter_rows") else iter(sheet.to_python())
+    total = getattr(sheet, "height", None)
+    return rows, total, getattr(workbook, "close", lambda: None)
+
+
+def iter_excel_chunks(file_path: str, first_chunk_rows: int = FIRST_CHUNK_ROWS,
+                      chunk_rows: int = CHUNK_ROWS) -> Iterator[ExcelChunk]:
+    """
+    流式读取 Excel 第一个工作表的数据行（跳过表头），按块返回列式数据
+    
+    Args:
+        file_path: .xlsx / .xlsm（安装 python-calamine 时也支持 .xls）
+        first_chunk_rows: 第一块的行数
+        chunk_rows: 之后每块的行数
+    
+    Yields:
+        ExcelChunk（列数至少为表头的列数，数据行更宽时以该块最长的行为准；
+        只有表头没有数据行时返回一个 0 行的块，工作表完全为空时不返回任何块）
+    """
+    if Path(file_path).suffix.lower() != ".xls":
+        rows, total, close = _open_xlsx(file_path)
+    elif CalamineWorkbook is not None:
+        rows, total, close = _open_calamine(file_path)
+    else:
+        raise ValueError("读取 .xls 需要安装 python-calamine，或先另存为 .xlsx")
+    
+    try:
+        # 第一行是表头（只用来确定列数，末尾的空单元格不计）
+        header = next(rows, None)
+        if header is None:
+            logger.info(f"流式读取 Excel: {file_path}, 工作表为空")
+            return
+        header_texts = [cell_text(value) for value in header]
+        while header_texts and not header_texts[-1]:
+            header_texts.pop()
+        width = len(header_texts)
+        total = total - 1 if total else None
+        
+        rows_read = 0
+        size = first_chunk_rows
+        while True:
+            block = list(islice(rows, size))
+            if not block:
+                break
+            columns = [
+                [cell_text(value) for value in column]
+                for column in zip_longest(*block)
+            ]
+            columns.extend([""] * len(block) for _ in range(width - len(columns)))
+            rows_read += len(block)
+            yield ExcelChunk(columns, len(block), rows_read, total)
+            size = chunk_rows
+        
+        if rows_read == 0 and width:
+            # 只有表头：按表头的列数返回空列
+            yield ExcelChunk([[] for _ in range(width)], 0, 0, total)
+        
+        logger.info(f"流式读取 Excel: {file_path}, {rows_read} 行")
+    finally:
+        close()
@@ -10,6 +10,8 @@ import pandas as pd
 from docx import Document
 from loguru import logger
 
+from .excel_stream import iter_excel_chunks
+
 
 class FileHandler:
     """文件处理工具类"""
@@ -64,6 +66,65 @@ class FileHandler:
             logger.error(f"写入 Excel 失败: {e}")
             return False
     
+    @staticmethod
+    def read_csv(file_path: str) -> Optional[pd.DataFrame]:
+        """
+        读取 CSV 文件（兼容带 BOM 的 UTF-8）
+        
+        Args:
+            file_path: CSV 文件路径
+        
+        Returns:
+            DataFrame 对象，失败返回 None
+        """
+        try:
+            if not os.path.exists(file_path):
+                logger.error(f"文件不存在: {file_path}")
+                return None
+            
+            df = pd.read_csv(file_path, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+            logger.info(f"成功读取 CSV: {file_path}, 行数: {len(df)}, 列数: {len(df.columns)}")
+            return df
+        
+        except Exception as e:
+            logger.error(f"读取 CSV 失败: {e}")
+            return None
+    
+    @staticmethod
+    def read_grid(file_path: str) -> Optional[List[List[str]]]:
+        """
+        读取表格文件为网格数据（与工作区导入 Excel 的规则一致）
+        
+        首行作为表头，空单元格转为空字符串，全空的行被忽略。
+        Excel 与工作区导入同样通过 iter_excel_chunks 读取（单元格文本规则见 excel_stream.cell_text）。
+        
+        Args:
+            file_path: .xlsx/.xls/.csv 文件路径
+        
+        Returns:
+            网格数据（按行），失败返回 None
+        """
+        if Path(file_path).suffix.lower() == '.csv':
+            df = FileHandler.read_csv(file_path)
+            if df is None:
+                return None
+            rows = [[str(value) if pd.notna(value) else "" for value in row] for _, row in df.iterrows()]
+        else:
+            try:
+                chunks = list(iter_excel_chunks(file_path))
+            except Exception as e:
+                logger.error(f"读取 Excel 失败: {e}")
+                return None
+            # 各块的列数可能不同，按最宽的一块补齐
+            width = max((len(chunk.columns) for chunk in chunks), default=0)
+            rows = []
+            for chunk in chunks:
+                padding = [""] * (width - len(chunk.columns))
+                rows.extend([*row, *padding] for row in zip(*chunk.columns))
+        
+        # 只保留非空行
+        return [row for row in rows if any(cell.strip() for cell in row)]
+    
     @staticmethod
     def read_word(file_path: str) -> Optional[Document]:
         """
@@ -5,26 +5,46 @@
 
 import sys
 from pathlib import Path
+from typing import Dict, Optional
 from loguru import logger
 
+from .tracing import ModuleLevelFilter
 
-def setup_logger(log_dir: str = "logs", log_level: str = "INFO"):
+
+# 当前生效的模块级别过滤器（UI 日志捕获器复用）
+_level_filter: Optional[ModuleLevelFilter] = None
+
+
+def setup_logger(
+    log_dir: str = "logs",
+    log_level: str = "INFO",
+    console=None,
+    module_levels: Optional[Dict[str, str]] = None
+):
     """
     配置 loguru 日志系统
     
     Args:
         log_dir: 日志文件目录
         log_level: 日志级别 (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+        console: 控制台输出流（默认 stdout；命令行批处理时用 stderr，stdout 留给进度输出）
+        module_levels: 按模块单独设置级别，如 {"core.smart_numbering": "DEBUG"}
     """
+    global _level_filter
+    
     # 移除默认的 handler
     logger.remove()
     
-    # 添加控制台输出（彩色）
+    _level_filter = ModuleLevelFilter(log_level, module_levels)
+    sink_level = _level_filter.min_level
+    
+    # 添加控制台输出（终端下彩色，重定向到文件或管道时不输出颜色代码）
     logger.add(
-        sys.stdout,
+        console or sys.stdout,
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-        level=log_level,
-        colorize=True
+        level=sink_level,
+        filter=_level_filter,
+        colorize=None
     )
     
     # 创建日志目录
@@ -35,11 +55,13 @@ def setup_logger(log_dir: str = "logs", log_level: str = "INFO"):
     logger.add(
         log_path / "seo_workbench_{time:YYYY-MM-DD}.log",
         format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-        level=log_level,
+        level=sink_level,
+        filter=_level_filter,
         rotation="00:00",  # 每天午夜轮转
         retention="30 days",  # 保留 30 天
         compression="zip",  # 压缩旧日志
-        encoding="utf-8"
+        encoding="utf-8",
+        enqueue=True  # 后台线程写文件，不阻塞生成线程
     )
     
     # 添加错误日志文件（仅记录 ERROR 及以上级别）
@@ -50,7 +72,8 @@ def setup_logger(log_dir: str = "logs", log_level: str = "INFO"):
         rotation="00:00",
         retention="90 days",  # 错误日志保留更久
         compression="zip",
-        encoding="utf-8"
+        encoding="utf-8",
+        enqueue=True
     )
     
     logger.info(f"日志系统初始化完成 - 日志目录: {log_path.absolute()}, 级别: {log_level}")
@@ -112,6 +135,11 @@ class LogCapture:
 _log_capture = LogCapture()
 
 
+def _ui_filter(record) -> bool:
+    """界面日志面板同样遵循按模块设置的级别"""
+    return _level_filter is None or _level_filter(record)
+
+
 def setup_ui_logger():
     """
     为 UI 添加日志捕获器
@@ -122,7 +150,8 @@ def setup_ui_logger():
     logger.add(
         _log_capture.write,
         format="{time:HH:mm:ss} | {level: <8} | {message}",
-        level="INFO"
+        level="INFO",
+        filter=_ui_filter
     )
     return _log_capture
 
@@ -0,0 +1,198 @@
+"""
+轻量级运行追踪
+热路径（逐段落、逐回答）不再逐条写 INFO 日志，而是：
+- 计数：事件次数累加到 trace_counters，运行结束时汇总输出一行
+- 采样：需要看样例时，每 N 次只输出一次（trace_counters.sampled，计数的同时判断）
+- 延迟格式化：详细日志用 DEBUG/TRACE 级别 + loguru 占位符，级别未开启时不做任何字符串拼接
+- 按模块设置日志级别：可单独打开某个模块的详细日志，其余模块保持安静
+"""
+
+import threading
+from collections import Counter
+from typing import Dict, Optional
+from loguru import logger
+
+
+# 本包的顶层模块名（如 "seo_workbench"），用于补全相对模块名
+PACKAGE_NAME = __name__.split('.')[0]
+
+# 热路径样例日志的默认采样间隔
+SAMPLE_EVERY = 100
+
+
+def _qualify(module: str) -> str:
+    """把 "core.smart_numbering" 这类相对模块名补全为完整模块名"""
+    if not module or module == PACKAGE_NAME or module.startswith(PACKAGE_NAME + "."):
+        return module
+    return f"{PACKAGE_NAME}.{module}"
+
+
+class ModuleLevelFilter:
+    """
+    按模块过滤日志级别（可作为 loguru sink 的 filter）
+    
+    模块名按前缀匹配，取最长的匹配项；未配置的模块使用默认级别。
+    解析结果按模块名缓存，级别变更时清空缓存。
+    """
+    
+    def __init__(self, default_level: str = "INFO", module_levels: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            default_level: 默认级别
+            module_levels: {模块名: 级别}，如 {"core.smart_numbering": "DEBUG"}
+        """
+        self.default_level = default_level
+        self._default_no = logger.level(default_level.upper()).no
+        self._levels: Dict[str, int] = {}
+        self._cache: Dict[Optional[str], int] = {}
+        for module, level in (module_levels or {}).items():
+            self.set_level(module, level)
+    
+    @property
+    def min_level(self) -> int:
+        """所有配置中最低的级别编号（sink 的 level 需设为此值，否则细粒度设置不生效）"""
+        return min([self._default_no, *self._levels.values()])
+    
+    def set_level(self, module: str, level: str):
+        """
+        设置某个模块（及其子模块）的日志级别
+        
+        Args:
+            module: 模块名（可省略包名前缀）
+            level: 级别名称
+        """
+        self._levels[_qualify(module)] = logger.level(level.upper()).no
+        self._cache.clear()
+    
+    def _resolve(self, name: Optional[str]) -> int:
+        """按最长前缀解析模块的级别编号"""
+        candidate = name or ""
+        while candidate:
+            if candidate in self._levels:
+                return self._levels[candidate]
+            candidate = candidate.rpartition('.')[0]
+        return self._default_no
+    
+    def __call__(self, record) -> bool:
+        name = record["name"]
+        level_no = self._cache.get(name)
+        if level_no is None:
+            level_no = self._cache[name] = self._resolve(name)
+        return record["level"].no >= level_no
+
+
+class TraceCounters:
+    """
+    线程安全的事件计数器
+    
+    事件名约定为 "模块.事件"（如 "numbering.renumbered"），汇总时按名称排序输出。
+    """
+    
+    def __init__(self):
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+    
+    def count(self, event: str, n: int = 1) -> int:
+        """
+        累加事件次数
+        
+        Args:
+            event: 事件名
+            n: 增量
+        
+        Returns:
+            累加后的次数
+        """
+        with self._lock:
+            self._counts[event] += n
+            return self._counts[event]
+    
+    def sampled(self, event: str, every: int = SAMPLE_EVERY) -> bool:
+        """
+        累加事件次数，并判断本次是否需要输出样例日志（第 1 次及之后每 every 次）
+        
+        Args:
+            event: 事件名
+            every: 采样间隔（默认 SAMPLE_EVERY）
+        
+        Returns:
+            是否输出
+        """
+        return (self.count(event) - 1) % max(1, every) == 0
+    
+    def snapshot(self) -> Dict[str, int]:
+        """返回当前计数的副本"""
+        with self._lock:
+            return dict(self._counts)
+    
+    def since(self, snapshot: Dict[str, int], prefix: str = "") -> Dict[str, int]:
+        """
+        计算自某个快照以来的增量
+        
+        Args:
+            snapshot: snapshot() 的返回值
+            prefix: 只统计以该前缀开头的事件
+        
+        Returns:
+            {事件名: 增量}（省略为 0 的事件）
+        """
+        current = self.snapshot()
+        delta = {}
+        for event, value in current.items():
+            if prefix and not event.startswith(prefix):
+                continue
+            diff = value - snapshot.get(event, 0)
+            if diff:
+                delta[event] = diff
+        return delta
+    
+    def log_summary(self, title: str, snapshot: Optional[Dict[str, int]] = None, prefix: str = ""):
+        """
+        输出一行事件计数汇总
+        
+        Args:
+            title: 汇总标题
+            snapshot: 起始快照（默认汇总全部累计值）
+            prefix: 只汇总以该前缀开头的事件
+        """
+        counts = self.since(snapshot or {}, prefix)
+        if not counts:
+            return
+        details = ", ".join(f"{event}={value}" for event, value in sorted(counts.items()))
+        logger.info(f"{title}: {details}")
+    
+    def reset(self):
+        """清空所有计数"""
+        with self._lock:
+            self._counts.clear()
+
+
+# 全局计数器（热路径中直接使用）
+trace_counters = TraceCounters()
+
+
+def parse_module_levels(specs) -> Dict[str, str]:
+    """
+    解析 "模块=级别" 形式的配置（命令行参数使用）
+    
+    Args:
+        specs: 字符串列表，如 ["core.smart_numbering=DEBUG"]
+    
+    Returns:
+        {模块名: 级别}
+    
+    Raises:
+        ValueError: 格式错误或级别不存在
+    """
+    levels = {}
+    for spec in specs or []:
+        module, sep, level = spec.partition('=')
+        module, level = module.strip(), level.strip().upper()
+        if not sep or not module or not level:
+            raise ValueError(f"模块日志级别格式应为 模块=级别: {spec!r}")
+        try:
+            logger.level(level)
+        except ValueError:
+            raise ValueError(f"未知的日志级别: {level}")
+        levels[module] = level
+    return levels